@@ -1,612 +1,6031 @@
 import tkinter as tk
 from tkinter import messagebox, ttk
+import base64
+import gc
+import hashlib
+import heapq
+import hmac
+import importlib
+import io
 import json
+import marshal
 import os
+import queue
 import re
-from datetime import datetime
+import sys
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from array import array
+from collections import Counter, deque
+from itertools import chain, islice
+from contextlib import contextmanager
+from datetime import date, datetime
+from functools import lru_cache
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+class LazyModule:
+    """
+    Stands in for a module that is imported on first attribute access.
+    Used for the modules the login screen doesn't need (the server's
+    asyncio and sockets, SQLite, CSV, profiling, the KDF thread pool),
+    which are most of the import time.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.module = None
+
+    def __getattr__(self, attr):
+        if self.module is None:
+            self.module = importlib.import_module(self.name)
+        return getattr(self.module, attr)
+
+asyncio = LazyModule("asyncio")
+cProfile = LazyModule("cProfile")
+csv = LazyModule("csv")
+futures = LazyModule("concurrent.futures")
+pstats = LazyModule("pstats")
+socket = LazyModule("socket")
+sqlite3 = LazyModule("sqlite3")
+
+###############################################################################
+# Utility: Instrumentation
+###############################################################################
+# Opt-in latency recording (TMC_INSTRUMENT=1 or --instrument). Each timed()
+# block on a hot path adds its duration, plus fields such as bytes written,
+# to a ring buffer per name. The diagnostics window (Ctrl+Shift+D) shows
+# percentiles, toggles a cProfile capture and exports the samples as a
+# JSONL trace for bug reports. While off, timed() only checks a flag.
+TRACE_SAMPLES = 1000
+
+def percentile(sorted_values, fraction):
+    """
+    Nearest-rank percentile of an ascending list (0.0 if empty).
+    """
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+class Instrumentation:
+    """
+    Ring buffers of (wall-clock time, milliseconds, fields) samples, one per
+    timed name, holding the last TRACE_SAMPLES of each. Safe to record
+    from the writer and KDF threads as well as the UI thread.
+    """
+    def __init__(self, enabled=False, samples=TRACE_SAMPLES):
+        self.enabled = enabled
+        self.samples = samples
+        self.lock = threading.Lock()
+        self.timings = {}
+        self.profiler = None
+
+    def record(self, name, ms, fields=None):
+        with self.lock:
+            ring = self.timings.get(name)
+            if ring is None:
+                ring = self.timings[name] = deque(maxlen=self.samples)
+            ring.append((time.time(), ms, fields or {}))
+
+    def clear(self):
+        with self.lock:
+            self.timings = {}
+
+    def summary(self):
+        """
+        {name: {"count", "p50", "p90", "p99", "max", "bytes"}} over the
+        samples each ring holds; bytes is the mean of the samples' "bytes"
+        fields, or None if they have none.
+        """
+        with self.lock:
+            rings = {name: list(ring) for name, ring in self.timings.items()}
+        result = {}
+        for name, samples in sorted(rings.items()):
+            times = sorted(ms for _, ms, _ in samples)
+            sizes = [fields["bytes"] for _, _, fields in samples if "bytes" in fields]
+            result[name] = {
+                "count": len(times),
+                "p50": percentile(times, 0.5),
+                "p90": percentile(times, 0.9),
+                "p99": percentile(times, 0.99),
+                "max": times[-1],
+                "bytes": sum(sizes) / len(sizes) if sizes else None
+            }
+        return result
+
+    def export_trace(self, filename):
+        """
+        Writes every sample, oldest first, as one JSON object per line
+        ({"name", "time", "ms", ...fields}). Returns the number written.
+        """
+        with self.lock:
+            samples = [(t, name, ms, fields) for name, ring in self.timings.items()
+                       for t, ms, fields in ring]
+        samples.sort(key=lambda sample: sample[0])
+        with open(filename, "w", encoding="utf-8") as f:
+            for t, name, ms, fields in samples:
+                f.write(json.dumps(dict(fields, name=name, time=t, ms=round(ms, 3))) + "\n")
+        return len(samples)
+
+    def start_profile(self):
+        """
+        Starts a cProfile capture of the calling (UI) thread.
+        """
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+
+    def stop_profile(self, filename, limit=25):
+        """
+        Stops the capture, saves it for pstats/snakeviz at filename and
+        returns the top functions by cumulative time as text.
+        """
+        profiler, self.profiler = self.profiler, None
+        profiler.disable()
+        profiler.dump_stats(filename)
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+INSTRUMENTS = Instrumentation(os.environ.get("TMC_INSTRUMENT", "0") != "0")
+
+@contextmanager
+def timed(name, **fields):
+    """
+    Records how long the with-block takes under name while instrumentation
+    is on. The block can add fields (e.g. "bytes") to the yielded dict.
+    """
+    if not INSTRUMENTS.enabled:
+        yield fields
+        return
+    start = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        INSTRUMENTS.record(name, (time.perf_counter() - start) * 1000, fields)
+
+def record_when_ready(widget, name, start):
+    """
+    Records the time from start (a perf_counter() reading taken as a window
+    began to open) until the event loop is next idle, by which point the
+    window has been laid out and drawn.
+    """
+    if INSTRUMENTS.enabled:
+        widget.after_idle(lambda: INSTRUMENTS.record(name, (time.perf_counter() - start) * 1000))
 
 ###############################################################################
 # Utility: Data Persistence
 ###############################################################################
-def load_data(filename="users_and_tasks.json"):
+# Every change is appended to "<filename>.journal" as one JSON line instead of
+# rewriting the whole file. load_data() replays the journal on top of the
+# snapshot, and the journal is folded back into the snapshot once it grows
+# past JOURNAL_COMPACT_BYTES. Set TMC_STORAGE=json to always rewrite in full.
+JOURNAL_SUFFIX = ".journal"
+JOURNAL_COMPACT_BYTES = 1024 * 1024
+USE_JOURNAL = os.environ.get("TMC_STORAGE", "journal") != "json"
+
+class DataFileError(Exception):
+    """
+    Raised when a data file exists but can't be read. The file is left
+    alone: saving over it would replace the user's data with whatever
+    little was loaded.
+    """
+
+def load_data(filename="users_and_tasks.json", lazy=False):
+    """
+    Loads user data (accounts and tasks) from a local JSON file.
+    If the file doesn't exist or is empty, returns a default structure; if
+    it can't be parsed, raises DataFileError.
+    Any changes recorded in the journal are replayed on top of the snapshot.
+    A .db/.sqlite filename opens the SQLite store instead, and a directory
+    (or a name ending in ".d") the sharded store.
+    With lazy=True and an up-to-date snapshot index, only the user directory
+    is read; each user's tasks are parsed on first access (see LazyUser).
+    """
+    if is_sqlite_filename(filename):
+        with timed("load_data", engine="sqlite"):
+            return load_sqlite(filename)
+    if is_shard_directory(filename):
+        with timed("load_data", engine="shards"):
+            return load_sharded(filename)
+    with timed("load_data", engine="json", lazy=lazy) as info:
+        data = load_lazy(filename) if lazy else None
+        if data is not None:
+            replay_journal(data, filename + JOURNAL_SUFFIX)
+            return data
+        data = {"users": []}
+        try:
+            with open(filename, "r", encoding="utf-8") as f:
+                text = f.read()
+                info["bytes"] = f.tell()
+            if text.strip():
+                data = json.loads(text)
+                for user in data["users"]:
+                    tasks_from_dicts(user)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            # The journal only makes sense on top of its snapshot, so it
+            # isn't replayed either
+            raise DataFileError(f"{filename} could not be read ({e}). "
+                                f"It has been left as it is; restore it from a backup.") from e
+        replay_journal(data, filename + JOURNAL_SUFFIX)
+        return data
+
+def save_data(data, filename="users_and_tasks.json", change=None):
+    """
+    Saves user data (accounts and tasks) to a local JSON file.
+    If a change record is given (see add_user_change / put_task_change), only
+    that record is appended to the journal; otherwise the whole file is
+    rewritten atomically. SQLite-backed data is written as it is edited,
+    so saving it only commits the pending transaction. Sharded data writes
+    only the shard the change touches.
+    """
+    if isinstance(data["users"], SqliteUserList):
+        data["users"].conn.commit()
+        return
+    if isinstance(data["users"], ShardedUserList):
+        data["users"].save(None if change is None else [change])
+        return
+    if change is not None and USE_JOURNAL:
+        if append_journal([journal_entry(data, change)], filename + JOURNAL_SUFFIX) < JOURNAL_COMPACT_BYTES:
+            return
+    compact_data(data, filename)
+
+def save_changes(data, filename, changes):
+    """
+    Saves a batch of change records with one write: a single journal
+    append (or one snapshot rewrite if that would push the journal past
+    JOURNAL_COMPACT_BYTES), one SQLite commit, or one write per touched
+    shard.
+    """
+    if isinstance(data["users"], SqliteUserList):
+        data["users"].conn.commit()
+        return
+    if isinstance(data["users"], ShardedUserList):
+        data["users"].save(changes)
+        return
+    if USE_JOURNAL:
+        journal = filename + JOURNAL_SUFFIX
+        lines = [journal_entry(data, change) for change in changes]
+        size = os.path.getsize(journal) if os.path.exists(journal) else 0
+        if size + sum(map(len, lines)) < JOURNAL_COMPACT_BYTES:
+            append_journal(lines, journal)
+            return
+    compact_data(data, filename)
+
+def compact_data(data, filename="users_and_tasks.json"):
+    """
+    Writes the full snapshot atomically, then discards the journal.
+    """
+    with timed("snapshot_serialize"):
+        text, directory = snapshot_text(data)
+    write_snapshot(text, filename, directory, data)
+
+def write_snapshot(text, filename, directory, data):
+    """
+    Atomically replaces the data file with a snapshot serialized by
+    snapshot_text(), writes its user-directory index, points any unloaded
+    LazyUser in data at the new file, and discards the journal the
+    snapshot supersedes.
+    """
+    with timed("snapshot_write", bytes=len(text)), LAZY_LOAD_LOCK:
+        write_atomic(filename, text)
+        stat = os.stat(filename)
+        signature = [stat.st_size, stat.st_mtime_ns]
+        write_atomic(filename + INDEX_SUFFIX, INDEX_MAGIC + marshal.dumps({
+            "snapshot": signature,
+            "seq": data.get("seq", 0),
+            "fields": [fields for fields, _ in directory],
+            "spans": [span for _, span in directory]
+        }))
+        for user, (_, span) in zip(data["users"], directory):
+            if isinstance(user, LazyUser) and not user.loaded:
+                user.span, user.signature = span, signature
+    journal = filename + JOURNAL_SUFFIX
+    if os.path.exists(journal):
+        os.remove(journal)
+
+def write_atomic(filename, text):
+    """
+    Writes text (str or bytes) to a temporary file, fsyncs it and renames
+    it over filename, so a crash mid-write never leaves a truncated file
+    behind.
+    """
+    tmp_name = filename + ".tmp"
+    binary = isinstance(text, bytes)
+    with open(tmp_name, "wb" if binary else "w", encoding=None if binary else "utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_name, filename)
+    # Persist the rename itself (not supported on Windows)
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(os.path.dirname(os.path.abspath(filename)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+def journal_line(change):
+    return json.dumps(change, separators=(",", ":"), default=encode_task) + "\n"
+
+def journal_entry(data, change):
+    """
+    Serializes change for the journal, stamped with the next sequence
+    number. data["seq"] counts the records applied to data and is written
+    into every snapshot, so replay_journal can skip the records a snapshot
+    already includes. Call it in the same lock hold as the edit itself, so
+    a snapshot never has one without the other.
+    """
+    data["seq"] = data.get("seq", 0) + 1
+    return journal_line(dict(change, seq=data["seq"]))
+
+def append_journal(lines, journal):
+    """
+    Appends serialized change records (see journal_line) with a single
+    fsync and returns the journal's new size in bytes.
+    """
+    with timed("journal_append", bytes=sum(map(len, lines))), \
+            open(journal, "a", encoding="utf-8") as f:
+        f.writelines(lines)
+        f.flush()
+        os.fsync(f.fileno())
+        return f.tell()
+
+def replay_journal(data, journal):
+    """
+    Applies every complete record in the journal to data, in order.
+    A torn last line (crash during append) is ignored, and so are records
+    the snapshot already includes (a crash after a snapshot replaced the
+    data file but before the old journal was removed).
+    """
+    if not os.path.exists(journal):
+        return
+    with open(journal, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                change = json.loads(line)
+            except ValueError:
+                break
+            seq = change.get("seq")
+            if seq is not None:
+                if seq <= data.get("seq", 0):
+                    continue
+                data["seq"] = seq
+            apply_change(data, change)
+
+def add_user_change(user_index, user):
+    """
+    Journal record for a newly created user account.
+    """
+    return {"op": "add_user", "user_index": user_index, "user": user}
+
+def set_password_change(user_index, password):
+    """
+    Journal record for a user's new password record (see set_user_password).
+    """
+    return {"op": "set_password", "user_index": user_index, "password": password}
+
+def set_views_change(user_index, views):
+    """
+    Journal record for a user's new list of saved filter views.
+    """
+    return {"op": "set_views", "user_index": user_index, "views": views}
+
+def put_task_change(user_index, task_index, task):
+    """
+    Journal record for a created (task_index == len(tasks)) or edited task.
+    """
+    return {"op": "put_task", "user_index": user_index, "task_index": task_index, "task": task}
+
+def delete_tasks_change(user_index, task_indexes, task_count):
+    """
+    Journal record for deleting tasks; task_count is the number of tasks
+    before the delete, which lets a client check its copy is in step.
+    """
+    return {"op": "delete_tasks", "user_index": user_index,
+            "task_indexes": sorted(task_indexes), "task_count": task_count}
+
+def apply_change(data, change):
+    """
+    Applies one journal record to data. Records for a user that doesn't
+    exist are ignored.
+    """
+    users = data["users"]
+    op = change.get("op")
+    if op == "add_user":
+        if change["user_index"] == len(users):
+            users.append(tasks_from_dicts(change["user"]))
+    elif not 0 <= change.get("user_index", -1) < len(users):
+        return
+    elif op == "set_password":
+        users[change["user_index"]]["password"] = change["password"]
+    elif op == "set_views":
+        users[change["user_index"]]["views"] = change["views"]
+    else:
+        user = users[change["user_index"]]
+        if isinstance(user, LazyUser) and not user.loaded:
+            # Applied when the user's tasks are first parsed
+            user.deferred.append(change)
+        else:
+            apply_task_change(user["tasks"], change)
+
+def apply_task_change(tasks, change):
+    """
+    Applies a task-level journal record to one user's task list.
+    """
+    if change["op"] == "put_task":
+        task_index = change["task_index"]
+        task = Task.from_dict(change["task"])
+        if task_index < len(tasks):
+            tasks[task_index] = task
+        elif task_index == len(tasks):
+            tasks.append(task)
+    elif change["op"] == "delete_tasks":
+        delete_tasks(tasks, change["task_indexes"])
+
+def delete_tasks(tasks, task_indexes):
+    """
+    Removes the tasks at task_indexes; later tasks move up, and so do the
+    dependencies on them (dependencies on deleted tasks are dropped).
+    """
+    if hasattr(tasks, "delete_many"):
+        tasks.delete_many(task_indexes)
+        return
+    deleted = set(task_indexes)
+    order = sorted(deleted)
+    tasks[:] = [
+        task if not task.depends_on else task.with_dependencies(renumber_dependencies(task.depends_on, order))
+        for i, task in enumerate(tasks) if i not in deleted
+    ]
+
+def renumber_dependencies(depends_on, deleted):
+    """
+    depends_on after the tasks at deleted (ascending indexes) are removed.
+    """
+    renumbered = []
+    for task_index in depends_on:
+        shift = bisect_left(deleted, task_index)
+        if shift == len(deleted) or deleted[shift] != task_index:
+            renumbered.append(task_index - shift)
+    return tuple(renumbered)
+
+@lru_cache(maxsize=4096)
+def date_ordinal(date_str):
+    """
+    Returns the proleptic ordinal of a YYYY-MM-DD date, or None if invalid.
+    """
+    try:
+        return datetime.strptime(date_str, "%Y-%m-%d").toordinal()
+    except (TypeError, ValueError):
+        return None
+
+###############################################################################
+# Utility: Lazy Loading
+###############################################################################
+# Every snapshot gets a "<filename>.idx" sidecar holding each user's fields
+# (everything but tasks) and the byte span of their tasks array in the
+# snapshot, plus the snapshot's size and mtime. Startup reads only that
+# directory, so its cost doesn't grow with the number of tasks. The sidecar
+# is marshal data, which loads several times faster than the same JSON;
+# an older JSON sidecar just counts as missing and is rewritten.
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = b"TMC-IDX 2\n"
+LAZY_LOAD = os.environ.get("TMC_LAZY_LOAD", "1") != "0"
+# Held while task spans are read from, or re-pointed at, the snapshot
+LAZY_LOAD_LOCK = threading.RLock()
+
+def snapshot_signature(filename):
+    stat = os.stat(filename)
+    return [stat.st_size, stat.st_mtime_ns]
+
+def load_lazy(filename):
+    """
+    Builds data from the snapshot index, with a LazyUser per account.
+    Returns None if there is no index or it is out of date.
+    """
+    try:
+        with open(filename + INDEX_SUFFIX, "rb") as f:
+            raw = f.read()
+        if not raw.startswith(INDEX_MAGIC):
+            return None
+        with gc_paused():
+            index = marshal.loads(memoryview(raw)[len(INDEX_MAGIC):])
+        if index["snapshot"] != snapshot_signature(filename):
+            return None
+    except (OSError, ValueError, EOFError, TypeError, KeyError):
+        return None
+    signature = index["snapshot"]
+    with gc_paused():
+        users = [
+            LazyUser(fields, filename, i, span, signature)
+            for i, (fields, span) in enumerate(zip(index["fields"], index["spans"]))
+        ]
+    return {"users": users, "seq": index["seq"]}
+
+@contextmanager
+def gc_paused():
+    """
+    Suspends the cyclic garbage collector while a block allocates many
+    long-lived, acyclic objects (the user directory), so it doesn't rescan
+    them over and over as they pile up.
+    """
+    if not gc.isenabled():
+        yield
+        return
+    gc.disable()
+    try:
+        yield
+    finally:
+        gc.enable()
+
+class LazyUser(dict):
+    """
+    A user record whose "tasks" are parsed from the snapshot on first
+    access (dict.__missing__). Journal records for the user that arrive
+    before that are kept in deferred and applied right after parsing.
+    """
+    # One per account is built at startup; slots make that much cheaper
+    __slots__ = ("filename", "user_index", "span", "signature", "deferred")
+
+    def __init__(self, fields, filename, user_index, span, signature):
+        dict.__init__(self, fields)
+        self.filename = filename
+        self.user_index = user_index
+        self.span = span
+        self.signature = signature
+        self.deferred = []
+
+    @property
+    def loaded(self):
+        return dict.__contains__(self, "tasks")
+
+    def raw_tasks(self):
+        """
+        The user's tasks array exactly as it appears in the snapshot.
+        """
+        with LAZY_LOAD_LOCK:
+            if snapshot_signature(self.filename) == self.signature:
+                with open(self.filename, "rb") as f:
+                    f.seek(self.span[0])
+                    return f.read(self.span[1] - self.span[0]).decode("ascii")
+            # Rewritten by someone else since the index was read: fall back
+            # to a full parse to find this user's tasks
+            with open(self.filename, "r", encoding="utf-8") as f:
+                tasks = json.load(f)["users"][self.user_index]["tasks"]
+            return json.dumps(tasks, indent=4)
+
+    def __missing__(self, key):
+        if key != "tasks":
+            raise KeyError(key)
+        with LAZY_LOAD_LOCK:
+            if not self.loaded:
+                tasks = [Task.from_dict(t) for t in json.loads(self.raw_tasks())]
+                for change in self.deferred:
+                    apply_task_change(tasks, change)
+                self.deferred = []
+                dict.__setitem__(self, "tasks", tasks)
+            return dict.__getitem__(self, "tasks")
+
+def snapshot_text(data):
+    """
+    Serializes data exactly like json.dumps(data, indent=4), with "tasks"
+    as each user's last key and the journal sequence number after "users".
+    Returns the text and, per user, the fields other than tasks plus the
+    (start, end) offsets of the tasks array.
+    Unloaded LazyUser tasks are copied from the snapshot without parsing.
+    The output is ASCII, so offsets are byte offsets.
+    """
+    parts = []
+    directory = []
+    pos = len('{\n    "users": [\n        ')
+    for user in data["users"]:
+        fields = {k: v for k, v in user.items() if k != "tasks"}
+        head = json.dumps(fields, indent=4, default=encode_task)
+        head = head[:-2].replace("\n", "\n        ") + ",\n            " if fields else "{\n            "
+        head += '"tasks": '
+        if isinstance(user, LazyUser) and not user.loaded and not user.deferred:
+            tasks_text = user.raw_tasks()
+        else:
+            tasks_text = json.dumps(user["tasks"], indent=4, default=encode_task).replace("\n", "\n            ")
+        start = pos + len(head)
+        directory.append((fields, [start, start + len(tasks_text)]))
+        user_text = head + tasks_text + "\n        }"
+        parts.append(user_text)
+        pos += len(user_text) + len(",\n        ")
+    tail = f',\n    "seq": {data.get("seq", 0)}\n}}'
+    if not parts:
+        return '{\n    "users": []' + tail, directory
+    return '{\n    "users": [\n        ' + ",\n        ".join(parts) + "\n    ]" + tail, directory
+
+###############################################################################
+# Utility: Task History
+###############################################################################
+# Task edits made in the app, and by --set/--delete, are logged as field-level
+# diffs in "<data file>.history", one JSON object per line:
+#   {"user": email, "time": ..., "kind": "create" or "edit", "task_index": i,
+#    "before": {field: old value} (null for a creation), "after": {field: new value}}
+#   {"user": email, "time": ..., "kind": "delete", "task_indexes": [...], "tasks": [...]}
+# plus "via": "undo"/"redo" on entries made by undo and redo. A field missing
+# from a task (a non-recurring task's "recurrence") diffs as null. The file
+# is appended by the same writer as the journal but is not part of the
+# snapshot, so it survives compaction without the data file being rewritten;
+# past HISTORY_FILE_MAX_BYTES it is cut back to its newest half.
+HISTORY_SUFFIX = ".history"
+HISTORY_FILE_MAX_BYTES = 1024 * 1024
+# Memory bounds of one user's OperationLog; the oldest entries go first
+HISTORY_MAX_ENTRIES = 500
+HISTORY_MAX_BYTES = 256 * 1024
+
+def task_diff(old, new):
+    """
+    (before, after) dicts of the fields that differ between two Tasks;
+    before is None and after has every field if old is None.
+    """
+    after = new.to_dict()
+    if old is None:
+        return None, after
+    before = old.to_dict()
+    keys = [key for key in dict.fromkeys(chain(before, after)) if before.get(key) != after.get(key)]
+    return {key: before.get(key) for key in keys}, {key: after.get(key) for key in keys}
+
+def apply_fields(task, fields):
+    """
+    A copy of task with the fields of a diff (see task_diff) applied.
+    """
+    d = task.to_dict()
+    for key, value in fields.items():
+        if value is None:
+            d.pop(key, None)
+        else:
+            d[key] = value
+    return Task.from_dict(d)
+
+def put_history_entry(email, task_index, old, new, via=None):
+    """
+    History entry for creating (old is None) or editing the task at
+    task_index, or None if nothing changed.
+    """
+    before, after = task_diff(old, new)
+    if before == {}:
+        return None
+    entry = {"user": email, "time": round(time.time(), 3), "kind": "create" if old is None else "edit",
+             "task_index": task_index, "before": before, "after": after}
+    if via is not None:
+        entry["via"] = via
+    return entry
+
+def delete_history_entry(email, task_indexes, deleted, via=None):
+    """
+    History entry for deleting the tasks at task_indexes (ascending);
+    deleted are the Task objects removed, in the same order.
+    """
+    entry = {"user": email, "time": round(time.time(), 3), "kind": "delete",
+             "task_indexes": list(task_indexes), "tasks": [task.to_dict() for task in deleted]}
+    if via is not None:
+        entry["via"] = via
+    return entry
+
+def history_line(entry):
+    return json.dumps(entry, separators=(",", ":")) + "\n"
+
+def append_history(lines, path):
+    """
+    Appends serialized history entries (see history_line) with one fsync,
+    then cuts the file back to its newest half if it grew too large.
+    """
+    with open(path, "a", encoding="utf-8") as f:
+        f.writelines(lines)
+        f.flush()
+        os.fsync(f.fileno())
+        size = f.tell()
+    if size > HISTORY_FILE_MAX_BYTES:
+        with open(path, "r", encoding="utf-8") as f:
+            f.seek(size - HISTORY_FILE_MAX_BYTES // 2)
+            f.readline()
+            write_atomic(path, f.read())
+
+def read_history(path, email):
+    """
+    The user's history entries in the file at path, oldest first. A torn
+    line (crash during append) is skipped.
+    """
+    prefix = '{"user":' + json.dumps(email) + ","
+    entries = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith(prefix):
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        pass
+    except FileNotFoundError:
+        pass
+    return entries
+
+class OperationLog:
+    """
+    A user's recent task history in memory, at most max_entries entries
+    and max_bytes of their serialized size (the oldest are evicted), with
+    undo and redo stacks of entries recorded this session. Entries refer to
+    tasks by index at the time; current_index() follows an entry's task
+    through the deletes logged after it.
+    """
+    def __init__(self, email, entries=(), max_entries=HISTORY_MAX_ENTRIES, max_bytes=HISTORY_MAX_BYTES):
+        self.email = email
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = deque()
+        self.sizes = deque()
+        self.bytes = 0
+        # Oldest first; both only hold entries still in entries
+        self.undo_stack = deque()
+        self.redo_stack = deque()
+        # id(entry) -> (entry, create entry) for undone edits of a task whose
+        # creation was undone too: they follow the task created on redo
+        self.anchors = {}
+        for entry in entries:
+            self.add(entry)
+
+    def add(self, entry):
+        """
+        Logs an entry and returns it serialized (see history_line).
+        """
+        line = history_line(entry)
+        self.entries.append(entry)
+        self.sizes.append(len(line))
+        self.bytes += len(line)
+        while len(self.entries) > self.max_entries or (self.bytes > self.max_bytes and len(self.entries) > 1):
+            evicted = self.entries.popleft()
+            self.bytes -= self.sizes.popleft()
+            if self.undo_stack and self.undo_stack[0] is evicted:
+                self.undo_stack.popleft()
+            if self.redo_stack and self.redo_stack[0] is evicted:
+                self.redo_stack.popleft()
+        return line
+
+    def record(self, entry, action="edit"):
+        """
+        Logs an entry made by a new edit (undoable; clears the redo stack),
+        by "undo", or by "redo" (undoable again).
+        """
+        line = self.add(entry)
+        if action != "undo" and entry["kind"] != "delete":
+            self.undo_stack.append(entry)
+            if action == "edit":
+                self.redo_stack.clear()
+                self.anchors.clear()
+        return line
+
+    def pop_undo(self):
+        """
+        The entry to undo next, moved to the redo stack, or None.
+        """
+        if not self.undo_stack:
+            return None
+        entry = self.undo_stack.pop()
+        self.redo_stack.append(entry)
+        return entry
+
+    def pop_redo(self):
+        return self.redo_stack.pop() if self.redo_stack else None
+
+    def forget_stacks(self):
+        """
+        Drops undo and redo, e.g. after tasks were renumbered by a change
+        this log didn't see.
+        """
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.anchors.clear()
+
+    def anchor_redo(self, create, task_index):
+        """
+        Call before deleting the task at task_index to undo its creation
+        (create): the undone edits of it will follow the task redo creates.
+        """
+        for entry in self.redo_stack:
+            if entry is not create and self.current_index(entry) == task_index:
+                self.anchors[id(entry)] = (entry, create)
+
+    def reanchor(self, create, recreate):
+        """
+        Call after redoing create as the entry recreate.
+        """
+        for key, (entry, anchor) in self.anchors.items():
+            if anchor is create:
+                self.anchors[key] = (entry, recreate)
+
+    def position(self, entry):
+        return next((i for i, e in enumerate(self.entries) if e is entry), None)
+
+    def current_index(self, entry):
+        """
+        Where entry's task is now, or None if it was deleted since (or the
+        entry was evicted).
+        """
+        entry = self.anchors.get(id(entry), (entry, entry))[1]
+        position = self.position(entry)
+        if position is None:
+            return None
+        task_index = entry["task_index"]
+        for later in islice(self.entries, position + 1, None):
+            if later["kind"] == "delete":
+                deleted = later["task_indexes"]
+                shift = bisect_left(deleted, task_index)
+                if shift < len(deleted) and deleted[shift] == task_index:
+                    return None
+                task_index -= shift
+        return task_index
+
+    def versions(self, task_index, task):
+        """
+        Past versions of the task now at task_index, newest first, rebuilt
+        by undoing the logged diffs one by one: (entry, Task) pairs, each
+        the task as that entry left it. If its creation is no longer logged,
+        the oldest version known comes last, with entry None.
+        """
+        versions = []
+        for entry in reversed(self.entries):
+            if entry["kind"] == "delete":
+                # Before this delete, the task sat further down
+                for deleted in entry["task_indexes"]:
+                    if deleted <= task_index:
+                        task_index += 1
+                continue
+            if entry["task_index"] != task_index:
+                continue
+            versions.append((entry, task))
+            if entry["kind"] == "create":
+                return versions
+            task = apply_fields(task, entry["before"])
+        versions.append((None, task))
+        return versions
+
+###############################################################################
+# Utility: Background Writer
+###############################################################################
+SAVE_DEBOUNCE_SECONDS = 0.25
+
+class PersistenceWorker(threading.Thread):
+    """
+    Writes saves on a background thread so disk latency never becomes UI
+    latency. The UI calls submit() after changing data; the record is
+    serialized right away (it is small) and everything submitted within
+    SAVE_DEBOUNCE_SECONDS of the previous submit goes out as one journal
+    append with a single fsync, or as one snapshot rewrite when journaling
+    is off. Failed writes are kept for the next attempt and queued for the
+    UI to pick up from an after() callback (see MainApp.poll_persistence).
+    History lines submitted with a change are appended to the history file
+    in the same write.
+
+    SQLite data is saved synchronously: its connection belongs to the UI
+    thread and a commit is only a WAL append. So is sharded data, whose
+    saves may merge other instances' edits into data.
+    """
+    def __init__(self, data, filename, debounce=SAVE_DEBOUNCE_SECONDS):
+        super().__init__(name="persistence", daemon=True)
+        self.data = data
+        self.filename = filename
+        self.debounce = debounce
+        # Held by the UI while it mutates data, and here while serializing
+        # a full snapshot, so a snapshot never sees a half-applied edit
+        self.lock = threading.RLock()
+        self.cond = threading.Condition()
+        self.pending_lines = []
+        self.pending_history = []
+        self.full_save = False
+        self.last_submit = 0.0
+        self.busy = False
+        self.failed = False
+        self.flushing = False
+        self.stopping = False
+        self.errors = queue.Queue()
+        # Milliseconds spent per save on the UI thread and on the writer
+        self.ui_times = deque(maxlen=200)
+        self.write_times = deque(maxlen=200)
+        self.synchronous = isinstance(data["users"], (SqliteUserList, ShardedUserList))
+        if not self.synchronous:
+            self.start()
+
+    def submit(self, change=None, history=()):
+        """
+        Schedules a save of data; change is the journal record describing
+        the edit, or None to rewrite the whole file, and history the edit's
+        serialized history entries (see OperationLog). Call it while still
+        holding lock from the edit, so the writer can't snapshot the edit
+        before its record is numbered.
+        """
+        start = time.perf_counter()
+        if self.synchronous:
+            try:
+                save_data(self.data, self.filename, change)
+                if history:
+                    append_history(history, self.filename + HISTORY_SUFFIX)
+            except Exception as e:
+                self.errors.put(e)
+        else:
+            with self.lock:
+                line = journal_entry(self.data, change) if change is not None and USE_JOURNAL else None
+            with self.cond:
+                if line is None:
+                    self.full_save = True
+                else:
+                    self.pending_lines.append(line)
+                self.pending_history.extend(history)
+                self.failed = False
+                self.last_submit = time.monotonic()
+                self.cond.notify_all()
+        self.ui_times.append((time.perf_counter() - start) * 1000)
+        if INSTRUMENTS.enabled:
+            INSTRUMENTS.record("save_submit", self.ui_times[-1])
+
+    def has_work(self):
+        return bool(self.pending_lines or self.full_save or self.pending_history)
+
+    def run(self):
+        while True:
+            with self.cond:
+                while (not self.has_work() or self.failed) and not self.stopping:
+                    self.cond.wait()
+                if not self.has_work() or (self.failed and self.stopping):
+                    return
+                # Debounce: let a burst of edits finish before writing
+                while not (self.stopping or self.flushing):
+                    remaining = self.last_submit + self.debounce - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.cond.wait(remaining)
+                lines, full, history = self.pending_lines, self.full_save, self.pending_history
+                self.pending_lines, self.full_save, self.pending_history = [], False, []
+                self.busy = True
+            start = time.perf_counter()
+            try:
+                self.write(lines, full)
+                # After the data, which matters more; a failure here only
+                # retries the history
+                lines, full = [], False
+                if history:
+                    append_history(history, self.filename + HISTORY_SUFFIX)
+                self.write_times.append((time.perf_counter() - start) * 1000)
+            except Exception as e:
+                with self.cond:
+                    self.pending_history[:0] = history
+                    self.pending_lines[:0] = lines
+                    self.full_save = self.full_save or full
+                    self.failed = True
+                self.errors.put(e)
+            finally:
+                with self.cond:
+                    self.busy = False
+                    self.cond.notify_all()
+
+    def write(self, lines, full):
+        if lines and not full:
+            if append_journal(lines, self.filename + JOURNAL_SUFFIX) < JOURNAL_COMPACT_BYTES:
+                return
+        with self.lock, timed("snapshot_serialize"):
+            text, directory = snapshot_text(self.data)
+        write_snapshot(text, self.filename, directory, self.data)
+
+    def flush(self, timeout=None):
+        """
+        Writes anything pending now and waits for it. Returns False if the
+        write failed or didn't finish within timeout.
+        """
+        if self.synchronous:
+            return self.errors.empty()
+        with self.cond:
+            self.failed = False
+            self.flushing = True
+            self.cond.notify_all()
+            done = self.cond.wait_for(
+                lambda: self.failed or not (self.has_work() or self.busy), timeout
+            )
+            self.flushing = False
+            return done and not self.failed
+
+    def stop(self):
+        """
+        Flushes and ends the writer thread.
+        """
+        ok = self.flush()
+        if not self.synchronous:
+            with self.cond:
+                self.stopping = True
+                self.cond.notify_all()
+            self.join()
+        return ok
+
+    def stats(self):
+        """
+        Mean and worst UI-thread and writer milliseconds per save.
+        """
+        def summary(times):
+            times = list(times)
+            return {"count": len(times),
+                    "mean_ms": sum(times) / len(times) if times else 0.0,
+                    "max_ms": max(times, default=0.0)}
+        return {"ui_thread": summary(self.ui_times), "writer": summary(self.write_times)}
+
+###############################################################################
+# Utility: SQLite Storage
+###############################################################################
+# Optional engine: a .db/.sqlite data file keeps users and tasks in normalized
+# tables. Task lists are proxies that read rows on demand, so the JSON document
+# never has to be held in memory, and filters run as indexed queries.
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id       INTEGER PRIMARY KEY,
+    email    TEXT NOT NULL,
+    password TEXT NOT NULL,
+    views    TEXT
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id       INTEGER PRIMARY KEY,
+    user_id  INTEGER NOT NULL REFERENCES users(id),
+    position INTEGER NOT NULL,
+    name     TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    end_ord  INTEGER,
+    status   TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    progress INTEGER NOT NULL,
+    recurrence TEXT,
+    overrides  TEXT,
+    depends_on TEXT,
+    UNIQUE (user_id, position)
+);
+CREATE TABLE IF NOT EXISTS task_assignees (
+    task_id    INTEGER NOT NULL REFERENCES tasks(id) ON DELETE CASCADE,
+    position   INTEGER NOT NULL,
+    name       TEXT NOT NULL,
+    name_lower TEXT NOT NULL,
+    PRIMARY KEY (task_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_user_end_date ON tasks(user_id, end_ord);
+CREATE INDEX IF NOT EXISTS idx_tasks_user_status ON tasks(user_id, status);
+CREATE INDEX IF NOT EXISTS idx_tasks_user_priority ON tasks(user_id, priority);
+"""
+
+# (table, column) added after the first release; older databases get them
+# on open
+SQLITE_ADDED_COLUMNS = (("tasks", "recurrence"), ("tasks", "overrides"), ("users", "views"),
+                        ("tasks", "depends_on"))
+
+# Assignees come back as one string joined with the ASCII unit separator;
+# recurrence and overrides are their to_dict() JSON, NULL if not recurring,
+# and depends_on a JSON list of positions, NULL if there are none
+SQLITE_TASK_COLUMNS = """
+    t.name, t.end_date, t.status, t.priority, t.progress,
+    (SELECT group_concat(name, char(31)) FROM
+        (SELECT name FROM task_assignees a WHERE a.task_id = t.id ORDER BY a.position)),
+    t.recurrence, t.overrides, t.depends_on
+"""
+
+# ORDER BY terms matching the in-memory SORT_KEYS
+SQLITE_ORDER_BY = {
+    "name": "lower(t.name)",
+    "end_date": "t.end_ord IS NULL, t.end_ord",
+    "status": "CASE t.status WHEN 'Not Started' THEN 0 WHEN 'In Progress' THEN 1 "
+              "WHEN 'Completed' THEN 2 ELSE 3 END",
+    "priority": "t.priority",
+    "progress": "t.progress",
+    "assignees": "lower((SELECT group_concat(name, char(31)) FROM "
+                 "(SELECT name FROM task_assignees a WHERE a.task_id = t.id ORDER BY a.position)))"
+}
+
+def is_sqlite_filename(filename):
+    return filename.lower().endswith(SQLITE_EXTENSIONS)
+
+def open_sqlite(filename):
+    conn = sqlite3.connect(filename)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.executescript(SQLITE_SCHEMA)
+    for table, column in SQLITE_ADDED_COLUMNS:
+        if column not in {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_user_recurring "
+                 "ON tasks(user_id, end_ord) WHERE recurrence IS NOT NULL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_user_depends "
+                 "ON tasks(user_id, position) WHERE depends_on IS NOT NULL")
+    return conn
+
+def load_sqlite(filename):
+    """
+    Loads the user directory from a SQLite store. Tasks stay in the database.
+    """
+    conn = open_sqlite(filename)
+    users = SqliteUserList(conn)
+    for user_id, email, password, views in conn.execute(
+            "SELECT id, email, password, views FROM users ORDER BY id"):
+        user = {"email": email, "password": password}
+        if views is not None:
+            user["views"] = json.loads(views)
+        user["tasks"] = SqliteTaskList(conn, user_id)
+        list.append(users, user)
+    return {"users": users}
+
+def sqlite_row_to_task(row):
+    name, end_date, status, priority, progress, assignees, recurrence, overrides, depends_on = row
+    task = Task(name, end_date, status, priority, progress, assignees.split("\x1f") if assignees else [])
+    if recurrence is not None:
+        task.recurrence = Recurrence.from_dict(json.loads(recurrence))
+        task.overrides = overrides_from_dict(json.loads(overrides)) if overrides else None
+    if depends_on is not None:
+        task.depends_on = tuple(json.loads(depends_on))
+    return task
+
+def migrate_json_to_sqlite(json_filename, db_filename):
+    """
+    One-shot migration of a JSON data file (plus its journal) into SQLite.
+    """
+    data = load_data(json_filename)
+    conn = open_sqlite(db_filename)
+    with conn:
+        if conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]:
+            raise ValueError(f"{db_filename} already contains users.")
+        for user_id, user in enumerate(data["users"]):
+            conn.execute(
+                "INSERT INTO users (id, email, password, views) VALUES (?, ?, ?, ?)",
+                (user_id, user["email"], user["password"],
+                 json.dumps(user["views"]) if "views" in user else None)
+            )
+            for position, task in enumerate(user["tasks"]):
+                sqlite_write_task(conn, user_id, position, task)
+    conn.close()
+    return len(data["users"])
+
+def sqlite_write_task(conn, user_id, position, task):
+    """
+    Inserts or replaces the task stored at (user_id, position).
+    """
+    recurrence = overrides = None
+    if task.recurrence is not None:
+        d = task.to_dict()
+        recurrence = json.dumps(d["recurrence"])
+        overrides = json.dumps(d["overrides"]) if "overrides" in d else None
+    depends_on = json.dumps(list(task.depends_on)) if task.depends_on else None
+    conn.execute(
+        "INSERT INTO tasks (user_id, position, name, end_date, end_ord, status, priority, progress, "
+        "recurrence, overrides, depends_on) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (user_id, position) DO UPDATE SET "
+        "name = excluded.name, end_date = excluded.end_date, end_ord = excluded.end_ord, "
+        "status = excluded.status, priority = excluded.priority, progress = excluded.progress, "
+        "recurrence = excluded.recurrence, overrides = excluded.overrides, depends_on = excluded.depends_on",
+        (user_id, position, task.name, task.end_date, task.end_ord,
+         task.status, task.priority, task.progress, recurrence, overrides, depends_on)
+    )
+    task_id = conn.execute(
+        "SELECT id FROM tasks WHERE user_id = ? AND position = ?", (user_id, position)
+    ).fetchone()[0]
+    conn.execute("DELETE FROM task_assignees WHERE task_id = ?", (task_id,))
+    conn.executemany(
+        "INSERT INTO task_assignees (task_id, position, name, name_lower) VALUES (?, ?, ?, ?)",
+        [(task_id, i, a, a.lower()) for i, a in enumerate(task.assignees)]
+    )
+
+class SqliteUserList(list):
+    """
+    The in-memory user directory of a SQLite store. Appending a user inserts
+    the row and swaps its task list for a database-backed one.
+    """
+    def __init__(self, conn):
+        super().__init__()
+        self.conn = conn
+
+    def append(self, user):
+        user_id = len(self)
+        self.conn.execute(
+            "INSERT INTO users (id, email, password) VALUES (?, ?, ?)",
+            (user_id, user["email"], user["password"])
+        )
+        tasks = SqliteTaskList(self.conn, user_id)
+        for task in user.get("tasks", []):
+            tasks.append(task)
+        user["tasks"] = tasks
+        super().append(user)
+
+    def set_password(self, user_index, password):
+        self[user_index]["password"] = password
+        self.conn.execute("UPDATE users SET password = ? WHERE id = ?", (password, user_index))
+
+    def set_views(self, user_index, views):
+        self[user_index]["views"] = views
+        self.conn.execute("UPDATE users SET views = ? WHERE id = ?", (json.dumps(views), user_index))
+
+class SqliteTaskList:
+    """
+    List-like view of one user's tasks. Reads and writes go straight to the
+    database (uncommitted until save_data), and query() runs filters on the
+    (user, end_date) / (user, status) / (user, priority) indexes.
+    """
+    def __init__(self, conn, user_id):
+        self.conn = conn
+        self.user_id = user_id
+
+    def __len__(self):
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM tasks WHERE user_id = ?", (self.user_id,)
+        ).fetchone()[0]
+
+    def __iter__(self):
+        rows = self.conn.execute(
+            f"SELECT {SQLITE_TASK_COLUMNS} FROM tasks t WHERE t.user_id = ? ORDER BY t.position",
+            (self.user_id,)
+        )
+        return (sqlite_row_to_task(row) for row in rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        if index < 0:
+            index += len(self)
+        row = self.conn.execute(
+            f"SELECT {SQLITE_TASK_COLUMNS} FROM tasks t WHERE t.user_id = ? AND t.position = ?",
+            (self.user_id, index)
+        ).fetchone()
+        if row is None:
+            raise IndexError("task index out of range")
+        return sqlite_row_to_task(row)
+
+    def __setitem__(self, index, task):
+        if not 0 <= index < len(self):
+            raise IndexError("task index out of range")
+        sqlite_write_task(self.conn, self.user_id, index, task)
+
+    def append(self, task):
+        sqlite_write_task(self.conn, self.user_id, len(self), task)
+
+    def extend(self, tasks):
+        """
+        Appends tasks, counting the existing rows once rather than per task.
+        """
+        position = len(self)
+        for position, task in enumerate(tasks, position):
+            sqlite_write_task(self.conn, self.user_id, position, task)
+
+    def delete_many(self, task_indexes):
+        """
+        Deletes the tasks at task_indexes and renumbers the rest so
+        positions stay contiguous.
+        """
+        self.conn.executemany(
+            "DELETE FROM tasks WHERE user_id = ? AND position = ?",
+            [(self.user_id, i) for i in task_indexes]
+        )
+        # Move positions out of the way first so UNIQUE(user_id, position)
+        # holds at every step of the renumbering
+        self.conn.execute("UPDATE tasks SET position = -1 - position WHERE user_id = ?", (self.user_id,))
+        self.conn.execute(
+            "WITH ranked AS (SELECT id, ROW_NUMBER() OVER (ORDER BY position DESC) - 1 AS rn "
+            "FROM tasks WHERE user_id = ?) "
+            "UPDATE tasks SET position = (SELECT rn FROM ranked WHERE ranked.id = tasks.id) "
+            "WHERE user_id = ?",
+            (self.user_id, self.user_id)
+        )
+        deleted = sorted(task_indexes)
+        updates = []
+        for position, depends_on in self.dependencies():
+            renumbered = renumber_dependencies(depends_on, deleted)
+            if renumbered != depends_on:
+                updates.append((json.dumps(list(renumbered)) if renumbered else None, self.user_id, position))
+        self.conn.executemany("UPDATE tasks SET depends_on = ? WHERE user_id = ? AND position = ?", updates)
+
+    def dependencies(self):
+        """
+        (task_index, depends_on) for the tasks that depend on others, read
+        from the partial index without building the tasks.
+        """
+        rows = self.conn.execute(
+            "SELECT position, depends_on FROM tasks WHERE user_id = ? AND depends_on IS NOT NULL "
+            "ORDER BY position", (self.user_id,)
+        )
+        return [(position, tuple(json.loads(depends_on))) for position, depends_on in rows]
+
+    def query(self, end_before=None, status=None, max_priority=None, min_progress=None,
+              assignee_tokens=(), order_by=()):
+        """
+        Returns (task_index, task) pairs for the tasks matching every given
+        criterion, ordered by the SORT_KEYS names in order_by. end_before is
+        an ordinal date (inclusive); assignee_tokens match as lowercase
+        substrings, any token being enough.
+        """
+        where = ["t.user_id = ?"]
+        params = [self.user_id]
+        if end_before is not None:
+            where.append("t.end_ord <= ?")
+            params.append(end_before)
+        if status:
+            where.append("t.status = ?")
+            params.append(status)
+        if max_priority is not None:
+            where.append("t.priority <= ?")
+            params.append(max_priority)
+        if min_progress is not None:
+            where.append("t.progress >= ?")
+            params.append(min_progress)
+        if assignee_tokens:
+            token_checks = " OR ".join("instr(a.name_lower, ?) > 0" for _ in assignee_tokens)
+            where.append(
+                f"EXISTS (SELECT 1 FROM task_assignees a WHERE a.task_id = t.id AND ({token_checks}))"
+            )
+            params.extend(assignee_tokens)
+        order = ", ".join([SQLITE_ORDER_BY[key] for key in order_by] + ["t.position"])
+        rows = self.conn.execute(
+            f"SELECT t.position, {SQLITE_TASK_COLUMNS} FROM tasks t "
+            f"WHERE {' AND '.join(where)} ORDER BY {order}",
+            params
+        )
+        return [(row[0], sqlite_row_to_task(row[1:])) for row in rows]
+
+    def pairs(self, task_indexes):
+        """
+        (task_index, task) pairs for the given task indexes, in task order,
+        read with one query.
+        """
+        rows = self.conn.execute(
+            f"SELECT t.position, {SQLITE_TASK_COLUMNS} FROM tasks t "
+            f"WHERE t.user_id = ? AND t.position IN (SELECT value FROM json_each(?)) "
+            f"ORDER BY t.position",
+            (self.user_id, json.dumps(sorted(task_indexes)))
+        )
+        return [(row[0], sqlite_row_to_task(row[1:])) for row in rows]
+
+    def between(self, start_ord, end_ord):
+        """
+        (task_index, task) pairs due from start_ord to end_ord (ordinal
+        days, inclusive), by date, via the (user, end_date) index, followed
+        by the recurring tasks that started earlier (expand them with
+        occurrences_between).
+        """
+        rows = chain(self.conn.execute(
+            f"SELECT t.position, {SQLITE_TASK_COLUMNS} FROM tasks t "
+            f"WHERE t.user_id = ? AND t.end_ord BETWEEN ? AND ? "
+            f"ORDER BY t.end_ord, t.priority, t.position",
+            (self.user_id, start_ord, end_ord)
+        ), self.conn.execute(
+            f"SELECT t.position, {SQLITE_TASK_COLUMNS} FROM tasks t "
+            f"WHERE t.user_id = ? AND t.recurrence IS NOT NULL AND t.end_ord < ?",
+            (self.user_id, start_ord)
+        ))
+        return [(row[0], sqlite_row_to_task(row[1:])) for row in rows]
+
+    def workload(self):
+        """
+        TaskAggregates entries (status, progress, open day, assignees) for
+        every task in order, read without building the tasks.
+        """
+        rows = self.conn.execute(
+            "SELECT t.status, t.progress, "
+            "CASE WHEN t.status = 'Completed' OR t.recurrence IS NOT NULL THEN NULL ELSE t.end_ord END, "
+            "(SELECT group_concat(name, char(31)) FROM "
+            "(SELECT name FROM task_assignees a WHERE a.task_id = t.id ORDER BY a.position)) "
+            "FROM tasks t WHERE t.user_id = ? ORDER BY t.position",
+            (self.user_id,)
+        )
+        return [(sys.intern(status), progress, day,
+                 tuple(sys.intern(a) for a in assignees.split("\x1f")) if assignees else ())
+                for status, progress, day, assignees in rows]
+
+    def open_tasks(self):
+        """
+        (task_index, task) pairs for the tasks not completed and with a
+        valid end date (those that can have reminders), in task order.
+        """
+        rows = self.conn.execute(
+            f"SELECT t.position, {SQLITE_TASK_COLUMNS} FROM tasks t "
+            f"WHERE t.user_id = ? AND t.status != 'Completed' AND t.end_ord IS NOT NULL "
+            f"ORDER BY t.position",
+            (self.user_id,)
+        )
+        return [(row[0], sqlite_row_to_task(row[1:])) for row in rows]
+
+    def positions(self, order_by=()):
+        """
+        All task indexes in the given SORT_KEYS order, without loading the
+        tasks themselves.
+        """
+        order = ", ".join([SQLITE_ORDER_BY[key] for key in order_by] + ["t.position"])
+        rows = self.conn.execute(
+            f"SELECT t.position FROM tasks t WHERE t.user_id = ? ORDER BY {order}", (self.user_id,)
+        )
+        return [row[0] for row in rows]
+
+###############################################################################
+# Utility: Sharded Storage
+###############################################################################
+# Optional layout for several instances sharing one data directory: a path
+# ending in ".d" (or an existing directory) holds a small user directory,
+# users.json, plus tasks/<shard>.json per user. Every file carries a version
+# number. Writers take an OS lock on the file, re-read its version and, if
+# another instance wrote in the meantime, merge with that version instead of
+# overwriting it. Saving a task edit only rewrites the editing user's shard.
+SHARD_DIR_SUFFIX = ".d"
+SHARD_DIRECTORY_FILE = "users.json"
+SHARD_TASKS_DIR = "tasks"
+# Change records saved to the directory rather than a task shard
+USER_OPS = ("add_user", "set_password", "set_views")
+
+class ShardConflictError(Exception):
+    """
+    Raised after a save in which some of our edits lost to edits another
+    instance had already written.
+    """
+
+def is_shard_directory(filename):
+    return filename.endswith(SHARD_DIR_SUFFIX) or os.path.isdir(filename)
+
+def shard_name(email):
+    """
+    Stable task-file name for an account, so instances never need to
+    agree on numbering.
+    """
+    return hashlib.sha1(email.casefold().encode("utf-8")).hexdigest()[:16] + ".json"
+
+@contextmanager
+def locked_file(path):
+    """
+    Holds an exclusive OS lock on "<path>.lock" (fcntl on POSIX, msvcrt on
+    Windows) for the duration of the block.
+    """
+    with open(path + ".lock", "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def read_versioned(path, key):
+    """
+    Returns (version, items) from a shard-layout file, or (0, []) if it
+    doesn't exist yet.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            content = json.load(f)
+    except FileNotFoundError:
+        return 0, []
+    return content["version"], content[key]
+
+def write_versioned(path, key, version, items, **extra):
+    write_atomic(path, json.dumps(dict({"version": version, key: items}, **extra),
+                                  indent=4, default=encode_task))
+
+def new_task_id():
+    return os.urandom(8).hex()
+
+def read_shard(path):
+    """
+    Returns (version, tasks, task ids) from a user's shard. Shards written
+    before tasks had ids get ids derived from version and position, so
+    every instance reading one agrees on them.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            content = json.load(f)
+    except FileNotFoundError:
+        return 0, [], []
+    version = content["version"]
+    tasks = [Task.from_dict(t) for t in content["tasks"]]
+    ids = content.get("ids") or [f"{version}.{i}" for i in range(len(tasks))]
+    return version, tasks, ids
+
+def load_sharded(root):
+    """
+    Loads the user directory of a sharded store; each user's tasks are read
+    from their shard on first access (see ShardUser).
+    """
+    os.makedirs(os.path.join(root, SHARD_TASKS_DIR), exist_ok=True)
+    users = ShardedUserList(root)
+    users.refresh_directory()
+    return {"users": users}
+
+def migrate_json_to_shards(json_filename, root):
+    """
+    One-shot migration of a JSON data file (plus its journal) into a
+    sharded directory.
+    """
+    data = load_data(json_filename)
+    target = load_sharded(root)
+    if target["users"]:
+        raise ValueError(f"{root} already contains users.")
+    for user in data["users"]:
+        target["users"].append(user)
+    save_data(target, root)
+    return len(data["users"])
+
+def merge_tasks(base, ours, theirs, dirty, deleted):
+    """
+    Three-way merge of one user's task list, matched by task id so either
+    side's deletes don't shift the other's edits onto the wrong task. base
+    maps each id to the task both sides started from; ours and theirs are
+    (id, task) lists; dirty holds the ids we created or edited and deleted
+    the ids we deleted. Our edits and deletes win where the other side left
+    the task alone, and tasks we created go after theirs. Where both sides
+    changed a task, or they deleted one we edited, theirs is kept. Returns
+    the merged (id, task) list and the names of our changes that were
+    dropped.
+    """
+    ours_by_id = dict(ours)
+    merged = []
+    rejected = []
+    for task_id, task in theirs:
+        unchanged = task_id in base and task == base[task_id]
+        if task_id in deleted:
+            if not unchanged:
+                rejected.append(f"{task.name} (deleted)")
+                merged.append((task_id, task))
+        elif task_id in dirty and task_id in ours_by_id:
+            ours_task = ours_by_id[task_id]
+            if unchanged or task == ours_task:
+                merged.append((task_id, ours_task))
+            else:
+                rejected.append(ours_task.name)
+                merged.append((task_id, task))
+        else:
+            merged.append((task_id, task))
+    their_ids = {task_id for task_id, _ in theirs}
+    for task_id, task in ours:
+        if task_id in their_ids:
+            continue
+        if task_id not in base:
+            merged.append((task_id, task))
+        elif task_id in dirty:
+            rejected.append(task.name)
+    return merged, rejected
+
+def relink_dependencies(tasks, ids, dependency_ids):
+    """
+    tasks (whose ids are ids) with their dependencies renumbered from
+    dependency_ids (id(task) -> ids of the tasks it depends on); ids that
+    are gone are dropped.
+    """
+    position = {task_id: i for i, task_id in enumerate(ids)}
+    relinked = []
+    for task in tasks:
+        if task.depends_on:
+            depends_on = tuple(sorted(position[task_id] for task_id in dependency_ids[id(task)]
+                                      if task_id in position))
+            if depends_on != task.depends_on:
+                task = task.with_dependencies(depends_on)
+        relinked.append(task)
+    return relinked
+
+class ShardUser(dict):
+    """
+    A user record of a sharded store. "tasks" is read from the user's shard
+    on first access, and ids holds each task's stable id alongside it.
+    version and base (id -> task) remember what the last read or write
+    saw; dirty and deleted the ids created, edited or deleted since.
+    on_disk is False for an account not yet in the on-disk directory.
+    """
+    def __init__(self, fields, root, shard, on_disk=True):
+        super().__init__(fields)
+        self.path = os.path.join(root, SHARD_TASKS_DIR, shard)
+        self.shard = shard
+        self.on_disk = on_disk
+        self.version = 0
+        self.ids = []
+        self.base = {}
+        self.dirty = set()
+        self.deleted = set()
+
+    @property
+    def loaded(self):
+        return dict.__contains__(self, "tasks")
+
+    def __missing__(self, key):
+        if key != "tasks":
+            raise KeyError(key)
+        self.version, tasks, self.ids = read_shard(self.path)
+        self.base = dict(zip(self.ids, tasks))
+        dict.__setitem__(self, "tasks", tasks)
+        return tasks
+
+    def track(self, change):
+        """
+        Notes which task ids a task record (already applied to tasks)
+        created, edited or deleted.
+        """
+        if change["op"] == "put_task":
+            task_index = change["task_index"]
+            if task_index == len(self.ids):
+                self.ids.append(new_task_id())
+            self.dirty.add(self.ids[task_index])
+        elif change["op"] == "delete_tasks":
+            for task_index in sorted(change["task_indexes"], reverse=True):
+                task_id = self.ids.pop(task_index)
+                self.dirty.discard(task_id)
+                if task_id in self.base:
+                    self.deleted.add(task_id)
+
+    def write(self):
+        """
+        Writes this user's shard, merging with whatever another instance
+        wrote since we read it. Returns True if the merge changed the
+        in-memory task list; raises ShardConflictError (after writing) if
+        some of our edits were dropped.
+        """
+        tasks = self["tasks"]
+        rejected = []
+        with locked_file(self.path):
+            version, their_tasks, their_ids = read_shard(self.path)
+            merged = version != self.version
+            if merged:
+                # Dependencies are positions, which the merge shuffles, so
+                # they go through the ids
+                dependency_ids = {}
+                for ids, side in ((self.ids, tasks), (their_ids, their_tasks)):
+                    for task in side:
+                        if task.depends_on:
+                            dependency_ids[id(task)] = [ids[i] for i in task.depends_on if i < len(ids)]
+                pairs, rejected = merge_tasks(self.base, list(zip(self.ids, tasks)),
+                                              list(zip(their_ids, their_tasks)),
+                                              self.dirty, self.deleted)
+                self.ids = [task_id for task_id, _ in pairs]
+                tasks[:] = relink_dependencies([task for _, task in pairs], self.ids, dependency_ids)
+            version += 1
+            write_versioned(self.path, "tasks", version, tasks, ids=self.ids)
+            self.version, self.base = version, dict(zip(self.ids, tasks))
+            self.dirty, self.deleted = set(), set()
+        if rejected:
+            raise ShardConflictError(
+                f"{self['email']}: another instance changed the same tasks first; "
+                f"kept its version of: {', '.join(rejected)}"
+            )
+        return merged
+
+class ShardedUserList(list):
+    """
+    The in-memory user directory of a sharded store. Saves are synchronous
+    (one small file each) because a merge may rewrite in-memory data, which
+    must happen on the UI thread. changed collects the user indexes whose
+    tasks a merge replaced (an empty set if only the directory changed) for
+    the UI to redraw; it is None while nothing changed.
+    """
+    def __init__(self, root):
+        super().__init__()
+        self.root = root
+        self.directory_path = os.path.join(root, SHARD_DIRECTORY_FILE)
+        self.version = 0
+        self.changed = None
+        # Shards of on-disk accounts whose directory fields we changed
+        self.updated = set()
+
+    def append(self, user):
+        fields = {k: v for k, v in user.items() if k != "tasks"}
+        shard_user = ShardUser(fields, self.root, shard_name(user["email"]), on_disk=False)
+        tasks = list(user.get("tasks", []))
+        dict.__setitem__(shard_user, "tasks", tasks)
+        shard_user.ids = [new_task_id() for _ in tasks]
+        shard_user.dirty = set(shard_user.ids)
+        super().append(shard_user)
+
+    def set_password(self, user_index, password):
+        self.set_field(user_index, "password", password)
+
+    def set_views(self, user_index, views):
+        self.set_field(user_index, "views", views)
+
+    def set_field(self, user_index, key, value):
+        user = self[user_index]
+        user[key] = value
+        if user.on_disk:
+            self.updated.add(user.shard)
+
+    def save(self, changes=None):
+        """
+        Writes what the change records touch: the directory for new
+        accounts, changed passwords and saved views, and each edited user's
+        shard once;
+        None writes the directory and every loaded shard.
+        """
+        if changes is None or any(change["op"] in USER_OPS for change in changes):
+            if self.write_directory():
+                self.mark_changed(())
+        if changes is None:
+            user_indexes = [i for i, user in enumerate(self) if user.loaded]
+            for i in user_indexes:
+                user = self[i]
+                # Tasks appended without a record get fresh ids
+                user.ids += [new_task_id() for _ in range(len(user["tasks"]) - len(user.ids))]
+                user.dirty.update(user.ids)
+        else:
+            user_indexes = []
+            for change in changes:
+                if change["op"] in USER_OPS:
+                    continue
+                self[change["user_index"]].track(change)
+                if change["user_index"] not in user_indexes:
+                    user_indexes.append(change["user_index"])
+        conflicts = []
+        for i in user_indexes:
+            try:
+                if self[i].write():
+                    self.mark_changed([i])
+            except ShardConflictError as e:
+                self.mark_changed([i])
+                conflicts.append(str(e))
+        if conflicts:
+            raise ShardConflictError("\n".join(conflicts))
+
+    def mark_changed(self, user_indexes):
+        self.changed = (self.changed or set()) | set(user_indexes)
+
+    def refresh_directory(self):
+        """
+        Picks up accounts other instances created since the directory was
+        last read. Returns True if any were added.
+        """
+        return self.adopt_directory(*read_versioned(self.directory_path, "users"))
+
+    def adopt_directory(self, version, entries):
+        if version == self.version:
+            return False
+        known = {user.shard for user in self}
+        added = [entry for entry in entries if entry["shard"] not in known]
+        for entry in added:
+            fields = {k: v for k, v in entry.items() if k != "shard"}
+            list.append(self, ShardUser(fields, self.root, entry["shard"]))
+        self.version = version
+        return bool(added)
+
+    def write_directory(self):
+        """
+        Adds our new accounts and changed passwords and views to the
+        on-disk directory under its lock and picks up the accounts other instances
+        added. An account whose email
+        another instance registered first is dropped from memory and
+        reported with ShardConflictError. Returns True if user indexes
+        changed.
+        """
+        with locked_file(self.directory_path):
+            version, entries = read_versioned(self.directory_path, "users")
+            on_disk = {entry["shard"] for entry in entries}
+            new_users = [user for user in self if not user.on_disk]
+            taken = [user for user in new_users if user.shard in on_disk]
+            if taken:
+                self[:] = [user for user in self if not any(user is t for t in taken)]
+            new_users = [user for user in new_users if user.shard not in on_disk]
+            updated = {user.shard: user for user in self if user.shard in self.updated}
+            if new_users or updated:
+                version += 1
+                entries = [
+                    dict({k: v for k, v in updated[entry["shard"]].items() if k != "tasks"},
+                         shard=entry["shard"])
+                    if entry["shard"] in updated else entry
+                    for entry in entries
+                ] + [
+                    dict({k: v for k, v in user.items() if k != "tasks"}, shard=user.shard)
+                    for user in new_users
+                ]
+                write_versioned(self.directory_path, "users", version, entries)
+                for user in new_users:
+                    user.on_disk = True
+                self.updated = set()
+            changed = self.adopt_directory(version, entries) or bool(taken)
+        if taken:
+            self.mark_changed(())
+            raise ShardConflictError(
+                "Email already registered from another instance: "
+                + ", ".join(user["email"] for user in taken)
+            )
+        return changed
+
+###############################################################################
+# Utility: Password Hashing
+###############################################################################
+# Passwords are stored as "scrypt$n$r$p$salt$hash" (or, where hashlib lacks
+# scrypt, "pbkdf2_sha256$iterations$salt$hash"), salt and hash in base64.
+# The cost is set with TMC_SCRYPT_N / TMC_PBKDF2_ITERATIONS. Plaintext
+# records from older versions, and hashes made at another cost, are
+# rehashed on the user's next successful login. Each hash takes around
+# 100ms, so the UI runs them on kdf_pool() (hashlib releases the GIL while
+# hashing, so threads verify several logins at once).
+SCRYPT_N = int(os.environ.get("TMC_SCRYPT_N", 2 ** 15))
+SCRYPT_R = 8
+SCRYPT_P = 1
+PBKDF2_ITERATIONS = int(os.environ.get("TMC_PBKDF2_ITERATIONS", 600000))
+PASSWORD_SALT_BYTES = 16
+KDF_WORKERS = 4
+KDF_POOL = None
+KDF_POOL_LOCK = threading.Lock()
+
+def kdf_pool():
+    """
+    The thread pool for password hashing, created on first use.
+    """
+    global KDF_POOL
+    with KDF_POOL_LOCK:
+        if KDF_POOL is None:
+            KDF_POOL = futures.ThreadPoolExecutor(max_workers=KDF_WORKERS, thread_name_prefix="kdf")
+        return KDF_POOL
+
+def b64(raw):
+    return base64.b64encode(raw).decode("ascii")
+
+def hash_password(password, salt=None):
+    """
+    Returns a salted password record at the configured cost.
+    """
+    salt = salt or os.urandom(PASSWORD_SALT_BYTES)
+    secret = password.encode("utf-8")
+    if hasattr(hashlib, "scrypt"):
+        digest = hashlib.scrypt(secret, salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P,
+                                maxmem=256 * SCRYPT_N * SCRYPT_R)
+        return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${b64(salt)}${b64(digest)}"
+    digest = hashlib.pbkdf2_hmac("sha256", secret, salt, PBKDF2_ITERATIONS)
+    return f"pbkdf2_sha256${PBKDF2_ITERATIONS}${b64(salt)}${b64(digest)}"
+
+def is_password_hash(record):
+    return record.startswith(("scrypt$", "pbkdf2_sha256$"))
+
+def check_password(password, record):
+    """
+    Returns (matches, upgraded): upgraded is a fresh record to store when
+    record is legacy plaintext or was hashed at another cost, else None.
+    """
+    secret = password.encode("utf-8")
+    if not is_password_hash(record):
+        matches = hmac.compare_digest(secret, record.encode("utf-8"))
+        return matches, hash_password(password) if matches else None
+    try:
+        kind, *params, salt, expected = record.split("$")
+        salt, expected = base64.b64decode(salt, validate=True), base64.b64decode(expected, validate=True)
+        if kind == "scrypt":
+            n, r, p = map(int, params)
+            digest = hashlib.scrypt(secret, salt=salt, n=n, r=r, p=p, maxmem=256 * n * r)
+            current = hasattr(hashlib, "scrypt") and (n, r, p) == (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+        else:
+            iterations, = map(int, params)
+            digest = hashlib.pbkdf2_hmac("sha256", secret, salt, iterations)
+            current = not hasattr(hashlib, "scrypt") and iterations == PBKDF2_ITERATIONS
+    except (ValueError, OverflowError, MemoryError):
+        # Hand-edited or truncated: report it rather than fail the login
+        raise ValueError("The stored password record is damaged.") from None
+    matches = hmac.compare_digest(digest, expected)
+    return matches, hash_password(password) if matches and not current else None
+
+def set_user_password(users, user_index, record):
+    """
+    Stores a password record for a user and returns the journal record to
+    save. SQLite and sharded stores also stage the change in their own
+    storage.
+    """
+    if hasattr(users, "set_password"):
+        users.set_password(user_index, record)
+    else:
+        users[user_index]["password"] = record
+    return set_password_change(user_index, record)
+
+def set_user_views(users, user_index, views):
+    """
+    Stores a user's saved filter views (see validate_views) and returns
+    the journal record to save, like set_user_password.
+    """
+    if hasattr(users, "set_views"):
+        users.set_views(user_index, views)
+    else:
+        users[user_index]["views"] = views
+    return set_views_change(user_index, views)
+
+###############################################################################
+# Utility: Password & Email Validation
+###############################################################################
+def is_valid_email(email):
+    """
+    Basic check for a valid email format.
+    """
+    pattern = r"^[\w\.-]+@[\w\.-]+\.\w+$"
+    return re.match(pattern, email) is not None
+
+def is_valid_password(password):
+    """
+    Checks if the password meets complexity requirements:
+    - Minimum 8 characters
+    - Contains at least one letter
+    - Contains at least one digit
+    """
+    if len(password) < 8:
+        return False
+    if not re.search(r"[A-Za-z]", password):
+        return False
+    if not re.search(r"\d", password):
+        return False
+    return True
+
+def build_email_index(users):
+    """
+    Maps each case-folded email to its index in data["users"], so login and
+    signup don't have to scan every account. The first account wins if an
+    email appears twice, matching the old linear search.
+    """
+    email_index = {}
+    for i, user in enumerate(users):
+        email_index.setdefault(user["email"].casefold(), i)
+    return email_index
+
+###############################################################################
+# Class: Task
+###############################################################################
+STATUS_OPTIONS = ["Not Started", "In Progress", "Completed"]
+REPEAT_OPTIONS = ["Never", "Daily", "Weekly", "Monthly"]
+
+class Recurrence:
+    """
+    A repeat rule: every interval days, weeks or months from a task's end
+    date, until an end date (until_ord, inclusive) and/or for count
+    occurrences, or forever. Only the rule is stored; occurrences are
+    computed for the date window that is asked for. Monthly occurrences
+    keep the first one's day of month, or the month's last day if shorter.
+    """
+    __slots__ = ("freq", "interval", "until_ord", "count")
+
+    def __init__(self, freq, interval=1, until_ord=None, count=None):
+        self.freq = freq
+        self.interval = interval
+        self.until_ord = until_ord
+        self.count = count
+
+    @classmethod
+    def from_dict(cls, d):
+        until = d.get("until")
+        return cls(d["freq"], d.get("interval", 1), date_ordinal(until) if until else None, d.get("count"))
+
+    def to_dict(self):
+        d = {"freq": self.freq, "interval": self.interval}
+        if self.until_ord is not None:
+            d["until"] = ordinal_to_date(self.until_ord)
+        if self.count is not None:
+            d["count"] = self.count
+        return d
+
+    def __eq__(self, other):
+        if not isinstance(other, Recurrence):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    __hash__ = None
+
+    def dates(self, first_ord, start_ord, end_ord):
+        """
+        Yields the ordinal days of the occurrences from start_ord to end_ord
+        (inclusive) of a series starting on first_ord. Occurrences before
+        the window are skipped arithmetically, not generated.
+        """
+        if self.until_ord is not None:
+            end_ord = min(end_ord, self.until_ord)
+        if self.freq == "monthly":
+            first = date.fromordinal(first_ord)
+            first_month = first.year * 12 + first.month - 1
+            start = date.fromordinal(max(start_ord, first_ord))
+            # The occurrence in start's month or the one before it
+            k = max(0, (start.year * 12 + start.month - 1 - first_month) // self.interval - 1)
+            occurrence = lambda k: month_day_ordinal(first_month + k * self.interval, first.day)
+        else:
+            step = self.interval * (7 if self.freq == "weekly" else 1)
+            k = max(0, -(-(start_ord - first_ord) // step))
+            occurrence = lambda k: first_ord + k * step
+        while self.count is None or k < self.count:
+            ordinal = occurrence(k)
+            if ordinal > end_ord:
+                return
+            if ordinal >= start_ord:
+                yield ordinal
+            k += 1
+
+def month_day_ordinal(month_index, day):
+    """
+    Ordinal of the given day (clamped to the month's length) of the month
+    month_index = year * 12 + month - 1.
+    """
+    year, month = divmod(month_index, 12)
+    first = date(year, month + 1, 1).toordinal()
+    length = 31 if month == 11 else date(year, month + 2, 1).toordinal() - first
+    return first + min(day, length) - 1
+
+class Occurrence:
+    """
+    One date of a recurring task: the series' fields, with end_ord set to
+    that date and its status and progress overrides (if any) applied.
+    """
+    __slots__ = ("series", "end_ord", "status", "progress")
+    end_text = None
+    recurrence = None
+
+    def __init__(self, series, end_ord, override=None):
+        self.series = series
+        self.end_ord = end_ord
+        override = override or {}
+        self.status = override.get("status", series.status)
+        self.progress = override.get("progress", series.progress)
+
+    name = property(lambda self: self.series.name)
+    priority = property(lambda self: self.series.priority)
+    assignees = property(lambda self: self.series.assignees)
+    end_date = property(lambda self: ordinal_to_date(self.end_ord))
+
+def overrides_from_dict(d):
+    """
+    Per-occurrence overrides as stored ({"YYYY-MM-DD": {"status": ...,
+    "progress": ...}}) keyed by ordinal day, or None if there are none.
+    """
+    if not d:
+        return None
+    overrides = {}
+    for date_str, override in d.items():
+        ordinal = date_ordinal(date_str)
+        if ordinal is None or not isinstance(override, dict) or not override.keys() <= {"status", "progress"}:
+            raise ValueError(f"Invalid occurrence override for {date_str!r}.")
+        if override.get("status", STATUS_OPTIONS[0]) not in STATUS_OPTIONS:
+            raise ValueError(f"Status must be one of: {', '.join(STATUS_OPTIONS)}.")
+        progress = override.get("progress", 0)
+        if not isinstance(progress, int) or not 0 <= progress <= 100:
+            raise ValueError("Progress must be an integer from 0 to 100.")
+        overrides[ordinal] = override
+    return overrides
+
+class Task:
+    """
+    A simple data class for tasks, and the in-memory form of every task.
+    __slots__ keeps instances small, status and assignee strings are interned
+    so repeated values share one object, and the end date is held as an
+    ordinal (end_text only keeps input that isn't already YYYY-MM-DD).
+    name        : str
+    end_date    : str (e.g., '2025-12-31'), stored as end_ord
+    status      : str (e.g., 'Not Started', 'In Progress', 'Completed')
+    priority    : int
+    progress    : int (0 to 100)
+    assignees   : tuple of names
+    recurrence  : Recurrence or None; end_date is then the first occurrence
+    overrides   : None, or {ordinal day: {"status"/"progress": value}} for
+                  the occurrences that differ from the series
+    depends_on  : ascending tuple of the task indexes this task waits for
+                  (see DependencyGraph)
+    """
+    __slots__ = ("name", "end_ord", "end_text", "status", "priority", "progress", "assignees",
+                 "recurrence", "overrides", "depends_on")
+
+    def __init__(self, name, end_date, status, priority, progress, assignees, recurrence=None, overrides=None,
+                 depends_on=()):
+        self.name = name
+        self.end_date = end_date
+        self.status = sys.intern(status)
+        self.priority = priority
+        self.progress = progress
+        self.assignees = tuple(sys.intern(a) for a in assignees)
+        self.recurrence = recurrence
+        self.overrides = overrides or None
+        self.depends_on = tuple(depends_on)
+
+    @property
+    def end_date(self):
+        if self.end_text is not None:
+            return self.end_text
+        return ordinal_to_date(self.end_ord)
+
+    @end_date.setter
+    def end_date(self, date_str):
+        self.end_ord = date_ordinal(date_str)
+        if self.end_ord is not None and ordinal_to_date(self.end_ord) == date_str:
+            self.end_text = None
+        else:
+            self.end_text = date_str
+
+    @classmethod
+    def from_dict(cls, d):
+        task = cls(d["name"], d["end_date"], d["status"], d["priority"], d["progress"], d["assignees"])
+        if "recurrence" in d:
+            task.recurrence = Recurrence.from_dict(d["recurrence"])
+            task.overrides = overrides_from_dict(d.get("overrides"))
+        if "depends_on" in d:
+            task.depends_on = tuple(d["depends_on"])
+        return task
+
+    def to_dict(self):
+        d = {
+            "name": self.name,
+            "end_date": self.end_date,
+            "status": self.status,
+            "priority": self.priority,
+            "progress": self.progress,
+            "assignees": list(self.assignees)
+        }
+        # Only recurring tasks carry the extra keys
+        if self.recurrence is not None:
+            d["recurrence"] = self.recurrence.to_dict()
+            if self.overrides:
+                d["overrides"] = {ordinal_to_date(o): dict(v) for o, v in sorted(self.overrides.items())}
+        if self.depends_on:
+            d["depends_on"] = list(self.depends_on)
+        return d
+
+    def occurrences(self, start_ord, end_ord):
+        """
+        Yields the task itself if it is due from start_ord to end_ord
+        (inclusive), or for a recurring task an Occurrence per date in
+        that window.
+        """
+        if self.end_ord is None:
+            return
+        if self.recurrence is None:
+            if start_ord <= self.end_ord <= end_ord:
+                yield self
+            return
+        overrides = self.overrides or {}
+        for ordinal in self.recurrence.dates(self.end_ord, start_ord, end_ord):
+            yield Occurrence(self, ordinal, overrides.get(ordinal))
+
+    def with_override(self, ordinal, status, progress):
+        """
+        A copy of this recurring task with the occurrence on ordinal set to
+        status and progress; an occurrence that matches the series again
+        drops its override.
+        """
+        overrides = dict(self.overrides or {})
+        override = {key: value for key, value in (("status", status), ("progress", progress))
+                    if value != getattr(self, key)}
+        if override:
+            overrides[ordinal] = override
+        else:
+            overrides.pop(ordinal, None)
+        return Task(self.name, self.end_date, self.status, self.priority, self.progress,
+                    self.assignees, self.recurrence, overrides, self.depends_on)
+
+    def with_dependencies(self, depends_on):
+        """
+        A copy of this task depending on the tasks at depends_on instead.
+        """
+        return Task(self.name, self.end_date, self.status, self.priority, self.progress,
+                    self.assignees, self.recurrence, self.overrides, depends_on)
+
+    def __eq__(self, other):
+        if not isinstance(other, Task):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Task({self.to_dict()!r})"
+
+@lru_cache(maxsize=4096)
+def ordinal_to_date(ordinal):
+    return date.fromordinal(ordinal).strftime("%Y-%m-%d")
+
+def encode_task(obj):
+    """
+    json.dumps() default= hook that serializes Task objects as dicts.
+    """
+    if isinstance(obj, Task):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def validate_task_fields(name, end_date, status, priority, progress, assignees,
+                         recurrence=None, overrides=None, depends_on=None):
+    """
+    Checks task fields as entered in CreateOrEditTaskWindow (strings;
+    assignees comma-separated) or read from an import (numbers and an
+    assignee list are accepted too) and returns the Task. recurrence is a
+    Recurrence (see validate_recurrence) or its stored dict, and overrides
+    are kept only with a recurrence. depends_on is a list of task indexes
+    (cycles are the caller's to check, see find_dependency_cycle). Raises
+    ValueError with a message for the user if a field is invalid.
+    """
+    name = str(name).strip()
+    end_date = str(end_date).strip()
+    status = str(status).strip()
+    if not name:
+        raise ValueError("Task name is required.")
+    if not end_date:
+        raise ValueError("End date is required.")
+    # Validate date format
+    try:
+        datetime.strptime(end_date, "%Y-%m-%d")
+    except ValueError:
+        raise ValueError("End date must be in YYYY-MM-DD format.") from None
+    if status not in STATUS_OPTIONS:
+        raise ValueError(f"Status must be one of: {', '.join(STATUS_OPTIONS)}.")
+    # Validate priority
+    try:
+        priority = int(str(priority).strip())
+    except ValueError:
+        raise ValueError("Priority must be an integer.") from None
+    # Validate progress
+    try:
+        progress = int(str(progress).strip())
+        if progress < 0 or progress > 100:
+            raise ValueError()
+    except ValueError:
+        raise ValueError("Progress must be an integer from 0 to 100.") from None
+
+    # Validate assignees: at most 5, no duplicates
+    if isinstance(assignees, str):
+        assignees = assignees.split(",")
+    elif not isinstance(assignees, (list, tuple)):
+        raise ValueError("Assignees must be a list of names.")
+    assignees = [str(a).strip() for a in assignees if str(a).strip()]
+    if len(assignees) > 5:
+        raise ValueError("You can add up to 5 assignees.")
+    unique_names = set()
+    for a in assignees:
+        if a in unique_names:
+            raise ValueError(f"Duplicate assignee '{a}'.")
+        unique_names.add(a)
+
+    if isinstance(recurrence, dict):
+        try:
+            recurrence = Recurrence.from_dict(recurrence)
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Invalid repeat rule.") from None
+        if recurrence.freq not in ("daily", "weekly", "monthly") or \
+                not isinstance(recurrence.interval, int) or recurrence.interval < 1 or \
+                not (recurrence.count is None or isinstance(recurrence.count, int) and recurrence.count > 0):
+            raise ValueError("Invalid repeat rule.")
+    if recurrence is None:
+        overrides = None
+    else:
+        if recurrence.until_ord is not None and recurrence.until_ord < date_ordinal(end_date):
+            raise ValueError("Repeat end date must not be before the end date.")
+        if isinstance(overrides, dict):
+            overrides = overrides_from_dict(overrides)
+        elif overrides is not None:
+            raise ValueError("Invalid occurrence overrides.")
+
+    if depends_on is None:
+        depends_on = ()
+    elif not isinstance(depends_on, (list, tuple)) or \
+            not all(isinstance(i, int) and not isinstance(i, bool) and i >= 0 for i in depends_on):
+        raise ValueError("Dependencies must be a list of task numbers.")
+    depends_on = sorted(set(depends_on))
+    if len(depends_on) > MAX_DEPENDENCIES:
+        raise ValueError(f"A task can depend on up to {MAX_DEPENDENCIES} tasks.")
+
+    return Task(name, end_date, status, priority, progress, assignees, recurrence, overrides, depends_on)
+
+def validate_recurrence(repeat, interval, until, count):
+    """
+    Builds the Recurrence for the repeat fields of CreateOrEditTaskWindow
+    (repeat is one of REPEAT_OPTIONS; until and count may be blank), or
+    None for "Never". Raises ValueError like validate_task_fields.
+    """
+    repeat = str(repeat).strip()
+    if repeat not in REPEAT_OPTIONS:
+        raise ValueError(f"Repeat must be one of: {', '.join(REPEAT_OPTIONS)}.")
+    if repeat == "Never":
+        return None
+    try:
+        interval = int(str(interval).strip() or 1)
+        if interval < 1:
+            raise ValueError()
+    except ValueError:
+        raise ValueError("Repeat interval must be a positive integer.") from None
+    until = str(until).strip()
+    until_ord = date_ordinal(until) if until else None
+    if until and until_ord is None:
+        raise ValueError("Repeat end date must be in YYYY-MM-DD format.")
+    count = str(count).strip()
+    try:
+        count = int(count) if count else None
+        if count is not None and count < 1:
+            raise ValueError()
+    except ValueError:
+        raise ValueError("Number of occurrences must be a positive integer.") from None
+    return Recurrence(repeat.lower(), interval, until_ord, count)
+
+def tasks_from_dicts(user):
+    """
+    Converts a freshly parsed user's task dicts into Task objects.
+    """
+    user["tasks"] = [Task.from_dict(t) for t in user["tasks"]]
+    return user
+
+###############################################################################
+# Class: MainApp
+###############################################################################
+PERSISTENCE_POLL_MS = 200
+KDF_POLL_MS = 20
+
+class MainApp(tk.Tk):
+    """
+    Main application class.
+    Handles switching between the Login/Signup frame and the TaskView frame.
+    """
+    def __init__(self, data_file="users_and_tasks.json", server=None):
+        super().__init__()
+        self.title("Task Management Calendar")
+        self.geometry("700x540")
+        self.resizable(False, False)
+
+        # Load data from JSON (or SQLite, depending on the file extension).
+        # Only the user directory is read up front when LAZY_LOAD is on, and
+        # only once the login screen has been drawn (see below).
+        # With server=(host, port) the app is a thin client of a TaskServer
+        # instead, and holds only the logged-in user's tasks.
+        self.data_file = data_file
+        self.client = None
+        self.data = {"users": []}
+        self.email_index = {}
+        self.persistence = None
+        if server is not None:
+            self.client = self.persistence = TaskClient(*server)
+
+        # Active user index in self.data["users"]
+        self.active_user_index = None
+        self.task_view = None
+        # OperationLog per user index, read when first needed; kept here so
+        # undo survives the task view being rebuilt
+        self.operation_logs = {}
+
+        # Hidden timing and profiling window (see Instrumentation)
+        self.diagnostics_window = None
+        self.bind_all("<Control-Shift-D>", lambda event: self.open_diagnostics_window())
+
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.after(PERSISTENCE_POLL_MS, self.poll_persistence)
+
+        self._show_login_frame()
+        if self.client is None:
+            # Paint the login screen first; nobody can log in before the
+            # data is loaded, since no input is handled until mainloop()
+            self.update_idletasks()
+            try:
+                self.reload_data()
+            except DataFileError as e:
+                # Nothing may be saved over the file; close instead
+                messagebox.showerror("Error", str(e))
+                self.destroy()
+
+    def reload_data(self):
+        """
+        (Re)loads the data file, rebuilds the email lookup index and starts
+        a background writer for the new data.
+        """
+        if self.persistence is not None:
+            self.persistence.stop()
+        # Filled in place: the frames already showing hold this dict
+        data = load_data(self.data_file, lazy=LAZY_LOAD)
+        self.operation_logs.clear()
+        self.data.clear()
+        self.data.update(data)
+        self.email_index = build_email_index(self.data["users"])
+        self.persistence = PersistenceWorker(self.data, self.data_file)
+        users = self.data["users"]
+        if LAZY_LOAD and not self.persistence.synchronous and users \
+                and not isinstance(users[0], LazyUser):
+            # No usable index: rewrite once in the background so the next
+            # start can be lazy
+            self.persistence.submit()
+
+    def poll_persistence(self):
+        """
+        Shows errors from the background writer and redraws data another
+        instance's edits were merged into, then re-arms itself.
+        """
+        try:
+            while True:
+                error = self.persistence.errors.get_nowait()
+                messagebox.showerror("Save Failed", f"Your changes could not be saved:\n{error}")
+        except queue.Empty:
+            pass
+        users = self.data["users"]
+        if isinstance(users, ShardedUserList) and users.changed is not None:
+            changed, users.changed = users.changed, None
+            self.email_index = build_email_index(users)
+            for user_index in changed:
+                self.forget_undo(user_index)
+            if self.active_user_index in changed:
+                self.show_task_view(self.active_user_index)
+        if self.client is not None:
+            self.apply_remote_changes()
+        self.after(PERSISTENCE_POLL_MS, self.poll_persistence)
+
+    def apply_remote_changes(self):
+        """
+        Applies the server's change events to the local task list (client
+        mode). Edited or created tasks redraw just their rows; a delete
+        renumbers tasks, so the view is rebuilt, and one that doesn't fit
+        the local copy (our own creation still in flight) reloads the list.
+        """
+        tasks = self.client.tasks
+        rebuild = resync = False
+        for change in self.client.pending_changes():
+            if change["op"] == "put_task":
+                task_index = change["task_index"]
+                if task_index > len(tasks):
+                    resync = True
+                    continue
+                apply_task_change(tasks, change)
+                tasks.created.discard(task_index)
+                if self.task_view is not None and not rebuild:
+                    self.task_view.task_changed(task_index)
+            elif change["op"] == "delete_tasks":
+                if len(tasks) != change["task_count"]:
+                    resync = True
+                    continue
+                apply_task_change(tasks, change)
+                rebuild = True
+        if (resync or rebuild) and self.active_user_index is not None:
+            # Tasks were renumbered behind the undo stacks' back
+            self.forget_undo(self.active_user_index)
+        if resync:
+            self.when_done(self.client.request("tasks"), self.resynced)
+        elif rebuild and self.active_user_index is not None:
+            self.show_task_view(self.active_user_index)
+
+    def resynced(self, future):
+        try:
+            reply = future.result()
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not reload tasks from the server:\n{e}")
+            return
+        if self.active_user_index is not None:
+            self.data["users"][self.active_user_index]["tasks"] = self.client.logged_in(reply)
+            self.show_task_view(self.active_user_index)
+
+    def when_done(self, future, callback):
+        """
+        Calls callback(future) on the UI thread once future (e.g. a kdf_pool()
+        job) has finished, polling with after() so the UI never blocks.
+        """
+        if future.done():
+            callback(future)
+        else:
+            self.after(KDF_POLL_MS, self.when_done, future, callback)
+
+    def operation_log(self, user_index):
+        """
+        The user's OperationLog, read from the history file on first use
+        (client mode keeps history in memory only).
+        """
+        log = self.operation_logs.get(user_index)
+        if log is None:
+            email = self.data["users"][user_index]["email"]
+            entries = () if self.client is not None else read_history(self.data_file + HISTORY_SUFFIX, email)
+            log = self.operation_logs[user_index] = OperationLog(email, entries)
+        return log
+
+    def forget_undo(self, user_index):
+        log = self.operation_logs.get(user_index)
+        if log is not None:
+            log.forget_stacks()
+
+    def open_diagnostics_window(self):
+        if self.diagnostics_window is not None and self.diagnostics_window.winfo_exists():
+            self.diagnostics_window.lift()
+            return
+        self.diagnostics_window = DiagnosticsWindow(self)
+
+    def refresh_directory(self):
+        """
+        Picks up accounts other instances created (sharded data only).
+        """
+        users = self.data["users"]
+        if isinstance(users, ShardedUserList) and users.refresh_directory():
+            self.email_index = build_email_index(users)
+
+    def on_close(self):
+        """
+        Flushes pending saves before the window closes.
+        """
+        if not self.persistence.flush():
+            if not messagebox.askyesno("Save Failed", "Some changes could not be saved.\nQuit anyway?"):
+                return
+        self.persistence.stop()
+        self.destroy()
+
+    def _show_login_frame(self):
+        """
+        Clears the window and shows the login/register frame.
+        """
+        self.task_view = None
+        for widget in self.winfo_children():
+            if widget is not self.diagnostics_window:
+                widget.destroy()
+        login_frame = LoginFrame(self, self.data)
+        login_frame.pack(expand=True, fill="both")
+
+    def show_task_view(self, user_index):
+        """
+        Clears the window and shows the Task View frame for the specified user index.
+        """
+        opened = time.perf_counter()
+        self.active_user_index = user_index
+        for widget in self.winfo_children():
+            if widget is not self.diagnostics_window:
+                widget.destroy()
+        self.task_view = TaskViewFrame(self, self.data, user_index)
+        self.task_view.pack(expand=True, fill="both")
+        record_when_ready(self.task_view, "open_task_view", opened)
+
+###############################################################################
+# Frame: LoginFrame
+###############################################################################
+SPINNER_FRAMES = "|/-\\"
+SPINNER_MS = 100
+
+class LoginFrame(tk.Frame):
+    """
+    Frame for user login and signup.
+    """
+    def __init__(self, master, data):
+        super().__init__(master)
+        self.master = master
+        self.data = data
+
+        self.label_title = tk.Label(self, text="Login", font=("Arial", 16, "bold"))
+        self.label_title.pack(pady=10)
+
+        tk.Label(self, text="Email:").pack()
+        self.entry_email = tk.Entry(self, width=30)
+        self.entry_email.pack()
+
+        tk.Label(self, text="Password:").pack()
+        self.entry_password = tk.Entry(self, width=30, show="*")
+        self.entry_password.pack()
+
+        self.button_login = tk.Button(self, text="Login", command=self.login)
+        self.button_login.pack(pady=10)
+
+        self.button_signup = tk.Button(self, text="Sign Up", command=self.signup_popup)
+        self.button_signup.pack()
+
+        self.label_busy = tk.Label(self, text="")
+        self.label_busy.pack(pady=10)
+        self.spin_job = None
+
+    def set_busy(self, message):
+        """
+        Shows message with a spinner and disables the buttons while a
+        password is hashed in the background; None clears it.
+        """
+        state = "normal" if message is None else "disabled"
+        self.button_login.config(state=state)
+        self.button_signup.config(state=state)
+        if self.spin_job is not None:
+            self.after_cancel(self.spin_job)
+            self.spin_job = None
+        self.label_busy.config(text="")
+        if message is not None:
+            self.spin(message, 0)
+
+    def spin(self, message, step):
+        self.label_busy.config(text=f"{message} {SPINNER_FRAMES[step % len(SPINNER_FRAMES)]}")
+        self.spin_job = self.after(SPINNER_MS, self.spin, message, step + 1)
+
+    def login(self):
+        email = self.entry_email.get().strip()
+        password = self.entry_password.get().strip()
+
+        # Validate input
+        if not email or not password:
+            messagebox.showerror("Error", "Please fill in both fields.")
+            return
+
+        if self.master.client is not None:
+            # The server finds the account and checks the password
+            self.set_busy("Logging in")
+            future = self.master.client.request("login", email=email, password=password)
+            self.master.when_done(future, self.remote_login_done)
+            return
+
+        # Find user
+        i = self.master.email_index.get(email.casefold())
+        if i is None:
+            # Possibly registered by another instance since we loaded
+            self.master.refresh_directory()
+            i = self.master.email_index.get(email.casefold())
+        if i is None:
+            messagebox.showerror("Error", "Email not found.")
+            return
+
+        # Check the password hash on kdf_pool(); login_checked() runs after
+        record = self.data["users"][i]["password"]
+        self.set_busy("Checking password")
+        future = kdf_pool().submit(check_password, password, record)
+        self.master.when_done(future, lambda f: self.login_checked(i, record, f))
+
+    def login_checked(self, user_index, record, future):
+        if not self.winfo_exists():
+            return
+        self.set_busy(None)
+        try:
+            matches, upgraded = future.result()
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not check the password:\n{e}")
+            return
+        if not matches:
+            messagebox.showerror("Error", "Incorrect password.")
+            return
+        users = self.data["users"]
+        if upgraded is not None and users[user_index]["password"] == record:
+            # Legacy plaintext or an outdated cost: store the fresh hash
+            persistence = self.master.persistence
+            with persistence.lock:
+                persistence.submit(set_user_password(users, user_index, upgraded))
+        # Successful login
+        messagebox.showinfo("Success", "Login successful!")
+        self.master.show_task_view(user_index)
+
+    def remote_login_done(self, future):
+        if not self.winfo_exists():
+            return
+        self.set_busy(None)
+        try:
+            reply = future.result()
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self.data["users"][:] = [{"email": reply["email"], "views": reply.get("views", []),
+                                  "tasks": self.master.client.logged_in(reply)}]
+        messagebox.showinfo("Success", "Login successful!")
+        self.master.show_task_view(0)
+
+    def signup_popup(self):
+        """
+        Popup window to handle signup.
+        """
+        popup = tk.Toplevel(self)
+        popup.title("Sign Up")
+        popup.geometry("300x250")
+        popup.resizable(False, False)
+
+        tk.Label(popup, text="Email:").pack(pady=5)
+        entry_new_email = tk.Entry(popup, width=30)
+        entry_new_email.pack()
+
+        tk.Label(popup, text="Password:").pack(pady=5)
+        entry_new_password = tk.Entry(popup, width=30, show="*")
+        entry_new_password.pack()
+
+        def handle_signup():
+            new_email = entry_new_email.get().strip()
+            new_pass = entry_new_password.get().strip()
+
+            # Validate
+            if not is_valid_email(new_email):
+                messagebox.showerror("Error", "Invalid email format.")
+                return
+            if not is_valid_password(new_pass):
+                messagebox.showerror(
+                    "Error",
+                    "Password must be at least 8 characters,\ninclude one letter and one number."
+                )
+                return
+            # Check if email already exists
+            if new_email.casefold() in self.master.email_index:
+                messagebox.showerror("Error", "Email is already taken.")
+                return
+
+            btn_create.config(state="disabled")
+            self.set_busy("Creating account")
+            if self.master.client is not None:
+                future = self.master.client.request("signup", email=new_email, password=new_pass)
+                self.master.when_done(future, remote_account_created)
+                return
+            future = kdf_pool().submit(hash_password, new_pass)
+            self.master.when_done(future, lambda f: create_account(new_email, f))
+
+        def remote_account_created(future):
+            if not self.winfo_exists():
+                return
+            self.set_busy(None)
+            if popup.winfo_exists():
+                btn_create.config(state="normal")
+            try:
+                future.result()
+            except Exception as e:
+                messagebox.showerror("Error", str(e))
+                return
+            messagebox.showinfo("Success", "Account created successfully!")
+            if popup.winfo_exists():
+                popup.destroy()
+
+        def create_account(new_email, future):
+            if not self.winfo_exists():
+                return
+            self.set_busy(None)
+            if popup.winfo_exists():
+                btn_create.config(state="normal")
+            try:
+                record = future.result()
+            except Exception as e:
+                messagebox.showerror("Error", f"Could not hash the password:\n{e}")
+                return
+            # Taken while the password was being hashed?
+            if new_email.casefold() in self.master.email_index:
+                messagebox.showerror("Error", "Email is already taken.")
+                return
+
+            # Create new user
+            new_user = {
+                "email": new_email,
+                "password": record,
+                "tasks": []
+            }
+            persistence = self.master.persistence
+            with persistence.lock:
+                self.data["users"].append(new_user)
+                user_index = len(self.data["users"]) - 1
+                persistence.submit(add_user_change(user_index, new_user))
+            self.master.email_index[new_email.casefold()] = user_index
+            messagebox.showinfo("Success", "Account created successfully!")
+            if popup.winfo_exists():
+                popup.destroy()
+
+        btn_create = tk.Button(popup, text="Create Account", command=handle_signup)
+        btn_create.pack(pady=10)
+
+###############################################################################
+# Widget: VirtualTaskList
+###############################################################################
+def task_row_values(t):
+    assignees_str = ", ".join(t.assignees) if t.assignees else ""
+    return (
+        t.name,
+        t.end_date if t.recurrence is None else f"{t.end_date} ({t.recurrence.freq})",
+        t.status,
+        t.priority,
+        f"{t.progress}%",
+        assignees_str
+    )
+
+class VirtualTaskList(tk.Frame):
+    """
+    A task Treeview with a scrollbar that only materializes the rows in
+    view. rows is any sequence of task indexes in display order (a list, or
+    the SortedTaskIndex itself); scrolling just changes which slice of it is
+    drawn, and redraws reuse the existing items, moving or updating only
+    those that changed.
+    """
+    COLUMNS = ("name", "end_date", "status", "priority", "progress", "assignees")
+
+    def __init__(self, master, get_task, height=15):
+        super().__init__(master)
+        self.get_task = get_task
+        self.height = height
+        self.rows = []
+        self.offset = 0
+        # iid -> values currently drawn for the rows in view
+        self.rendered = {}
+
+        self.tree = ttk.Treeview(self, columns=self.COLUMNS, show="headings", height=height)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.on_scrollbar)
+        self.tree.pack(side="left")
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.tree.bind("<MouseWheel>", self.on_mousewheel)
+        self.tree.bind("<Button-4>", self.on_mousewheel)
+        self.tree.bind("<Button-5>", self.on_mousewheel)
+        self.tree.bind("<Up>", lambda event: self.on_arrow_key(-1))
+        self.tree.bind("<Down>", lambda event: self.on_arrow_key(1))
+        self.tree.bind("<Prior>", lambda event: self.scroll(-self.height))
+        self.tree.bind("<Next>", lambda event: self.scroll(self.height))
+
+    def set_rows(self, rows, changed=()):
+        """
+        Shows a new row sequence. Rows for the task indexes in changed are
+        redrawn even if they stay in place.
+        """
+        self.rows = rows
+        for task_index in changed:
+            self.rendered.pop(str(task_index), None)
+        self.offset = max(0, min(self.offset, len(self.rows) - self.height))
+        self.render()
+
+    def show(self, task_index):
+        """
+        Scrolls the row of task_index into view and selects it.
+        """
+        try:
+            position = self.rows.index(task_index)
+        except ValueError:
+            return
+        if not self.offset <= position < self.offset + self.height:
+            self.offset = max(0, min(position - self.height // 2, len(self.rows) - self.height))
+            self.render()
+        iid = str(task_index)
+        self.tree.selection_set(iid)
+        self.tree.focus(iid)
+
+    def scroll(self, delta):
+        offset = max(0, min(self.offset + delta, len(self.rows) - self.height))
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+        return "break"
+
+    def render(self):
+        with timed("render"):
+            self.draw()
+
+    def draw(self):
+        end = min(self.offset + self.height, len(self.rows))
+        wanted = [self.rows[pos] for pos in range(self.offset, end)]
+        wanted_iids = {str(task_index) for task_index in wanted}
+
+        stale = [iid for iid in self.tree.get_children() if iid not in wanted_iids]
+        if stale:
+            self.tree.delete(*stale)
+            for iid in stale:
+                self.rendered.pop(iid, None)
+
+        for pos, task_index in enumerate(wanted):
+            iid = str(task_index)
+            if iid not in self.rendered:
+                values = task_row_values(self.get_task(task_index))
+                if self.tree.exists(iid):
+                    self.tree.item(iid, values=values)
+                else:
+                    self.tree.insert("", pos, iid=iid, values=values)
+                self.rendered[iid] = values
+            if self.tree.index(iid) != pos:
+                self.tree.move(iid, "", pos)
+
+        if self.rows:
+            self.scrollbar.set(self.offset / len(self.rows), end / len(self.rows))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            offset = int(float(amount) * len(self.rows))
+            self.scroll(offset - self.offset)
+        elif action == "scroll":
+            self.scroll(int(amount) * (self.height if unit == "pages" else 1))
+
+    def on_mousewheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            return self.scroll(-3)
+        return self.scroll(3)
+
+    def on_arrow_key(self, direction):
+        """
+        Moving the selection past the first or last row in view scrolls by
+        one row instead of stopping at the edge.
+        """
+        children = self.tree.get_children()
+        focus = self.tree.focus()
+        if not children or focus not in (children[0], children[-1]):
+            return None
+        if (direction < 0) != (focus == children[0]):
+            return None
+        old_offset = self.offset
+        self.scroll(direction)
+        if self.offset == old_offset:
+            return "break"
+        children = self.tree.get_children()
+        iid = children[0] if direction < 0 else children[-1]
+        self.tree.selection_set(iid)
+        self.tree.focus(iid)
+        return "break"
+
+###############################################################################
+# Widget: SummaryPanel
+###############################################################################
+# Checked at least this often, so a suspended machine or a clock change
+# doesn't leave the overdue count stale for long
+SUMMARY_MIDNIGHT_CHECK_MS = 60 * 60 * 1000
+
+class SummaryPanel(tk.Frame):
+    """
+    Workload summary shown in TaskViewFrame: tasks per status, average
+    progress, overdue count and tasks per assignee, read from a
+    TaskAggregates. refresh() redraws the totals and only the assignee rows
+    that changed; at midnight the overdue count rolls forward by itself.
+    """
+    def __init__(self, master, aggregates):
+        super().__init__(master)
+        self.aggregates = aggregates
+        self.label_totals = tk.Label(self, anchor="w")
+        self.label_totals.pack(fill="x")
+        self.tree = ttk.Treeview(self, columns=("assignee", "tasks"), show="headings", height=4)
+        self.tree.heading("assignee", text="Assignee")
+        self.tree.heading("tasks", text="Tasks")
+        self.tree.column("assignee", width=200)
+        self.tree.column("tasks", width=60, anchor="e")
+        self.tree.pack(fill="x")
+        # Rows are kept in name order; this mirrors the tree's row order
+        self.assignee_rows = []
+        self.midnight_job = None
+        self.refresh(aggregates.touched)
+        self.schedule_midnight()
+
+    def destroy(self):
+        if self.midnight_job is not None:
+            self.after_cancel(self.midnight_job)
+            self.midnight_job = None
+        super().destroy()
+
+    def refresh(self, assignees=()):
+        """
+        Redraws the totals and the rows of the given assignees.
+        """
+        a = self.aggregates
+        statuses = "   ".join(f"{status}: {a.by_status.get(status, 0)}" for status in STATUS_OPTIONS)
+        self.label_totals.config(
+            text=f"{statuses}   |   Average progress: {a.average_progress():.0f}%   |   Overdue: {a.overdue}"
+        )
+        for assignee in assignees:
+            count = a.by_assignee.get(assignee, 0)
+            position = bisect_left(self.assignee_rows, assignee)
+            listed = position < len(self.assignee_rows) and self.assignee_rows[position] == assignee
+            if count and listed:
+                self.tree.item(assignee, values=(assignee, count))
+            elif count:
+                self.assignee_rows.insert(position, assignee)
+                self.tree.insert("", position, iid=assignee, values=(assignee, count))
+            elif listed:
+                del self.assignee_rows[position]
+                self.tree.delete(assignee)
+
+    def schedule_midnight(self):
+        now = time.time()
+        today = date.fromtimestamp(now).toordinal()
+        delay = int((start_of_day(today + 1) - now) * 1000) + 1
+        self.midnight_job = self.after(min(delay, SUMMARY_MIDNIGHT_CHECK_MS), self.roll_forward)
+
+    def roll_forward(self):
+        self.aggregates.advance(date.today().toordinal())
+        self.refresh()
+        self.schedule_midnight()
+
+###############################################################################
+# Frame: TaskViewFrame
+###############################################################################
+class TaskViewFrame(tk.Frame):
+    """
+    Frame to view, create, edit, and filter tasks for the currently logged-in user.
+    """
+    def __init__(self, master, data, user_index):
+        super().__init__(master)
+        self.master = master
+        self.data = data
+        self.user_index = user_index
+
+        # Rows are ordered by these columns (click a header to change it).
+        # Database-backed tasks are ordered by the query; in-memory tasks
+        # keep a SortedTaskIndex that is patched on every save.
+        self.sort_keys = ["priority"]
+        self.filtered_tasks = None
+        self.ranked_rows = None
+        tasks = self.data["users"][self.user_index]["tasks"]
+        # Database-backed tasks: the full row order, read once per sort
+        # order and patched on every save (see place_db_row)
+        self.db_rows = None
+        if hasattr(tasks, "query"):
+            self.sorted_index = self.filter_index = None
+            self.indexes = []
+        else:
+            self.sorted_index = SortedTaskIndex(tasks, self.sort_keys)
+            self.filter_index = TaskFilterIndex(tasks)
+            self.indexes = [self.sorted_index, self.filter_index]
+        # Deadline reminders: kept up to date like the indexes, so a save
+        # reschedules just that task
+        self.reminder_window = None
+        self.reminders = ReminderScheduler(tasks, self, self.show_reminders)
+        self.indexes.append(self.reminders)
+        self.aggregates = TaskAggregates(tasks, date.today().toordinal())
+        self.indexes.append(self.aggregates)
+        # Dependencies: earliest finishes are patched downstream of each save
+        self.dependencies = DependencyGraph(tasks)
+        self.indexes.append(self.dependencies)
+        # Saved views: results are cached per view and patched on every save
+        if self.sorted_index is not None:
+            select = lambda task_filter: [(i, tasks[i]) for i in self.filter_index.select(task_filter)]
+            sort_key = lambda task_index, task: self.sorted_index.key_of(task_index)
+        else:
+            select = lambda task_filter: tasks.query(**task_filter.criteria())
+            sort_key = lambda task_index, task: task_sort_key(task, self.sort_keys) + (task_index,)
+        self.views = SavedViewCache(tasks, select, sort_key)
+        self.views.set_views(self.data["users"][self.user_index].get("views", []))
+        self.indexes.append(self.views)
+        self.active_view = None
+
+        # Title
+        tk.Label(self, text="Task Management Calendar", font=("Arial", 16, "bold")).pack(pady=5)
+
+        # Button: Add New Task
+        btn_new_task = tk.Button(self, text="Add New Task", command=self.open_create_task_window)
+        btn_new_task.pack()
+
+        # Undo/redo of task edits, and past versions of the selected task
+        history_bar = tk.Frame(self)
+        tk.Button(history_bar, text="Undo", command=self.undo).pack(side="left")
+        tk.Button(history_bar, text="Redo", command=self.redo).pack(side="left", padx=5)
+        tk.Button(history_bar, text="Task History", command=self.open_history_window).pack(side="left")
+        history_bar.pack(pady=5)
+        self.master.bind("<Control-z>", lambda event: self.undo())
+        self.master.bind("<Control-y>", lambda event: self.redo())
+
+        # Button: Filter
+        btn_filter = tk.Button(self, text="Filter Tasks", command=self.open_filter_window)
+        btn_filter.pack()
+
+        # Saved views (created from the filter window)
+        view_bar = tk.Frame(self)
+        tk.Label(view_bar, text="Saved View:").pack(side="left")
+        self.view_var = tk.StringVar(value=ALL_TASKS_VIEW)
+        self.dropdown_view = ttk.Combobox(view_bar, textvariable=self.view_var, state="readonly", width=25)
+        self.dropdown_view.pack(side="left", padx=5)
+        self.dropdown_view.bind("<<ComboboxSelected>>", lambda event: self.show_view(self.view_var.get()))
+        tk.Button(view_bar, text="Delete View", command=self.delete_view).pack(side="left")
+        view_bar.pack(pady=5)
+        self.update_view_choices()
+
+        # Button: Calendar (the date index is built when it is first opened)
+        self.date_index = None
+        self.calendar_window = None
+        btn_calendar = tk.Button(self, text="Calendar View", command=self.open_calendar_window)
+        btn_calendar.pack()
+
+        # Search as you type over names and assignees (the index is built
+        # when the box first gets focus)
+        self.search_index = None
+        search_bar = tk.Frame(self)
+        tk.Label(search_bar, text="Search:").pack(side="left")
+        self.search_var = tk.StringVar()
+        self.entry_search = tk.Entry(search_bar, width=30, textvariable=self.search_var)
+        self.entry_search.pack(side="left")
+        self.entry_search.bind("<FocusIn>", lambda event: self.get_search_index())
+        self.search_var.trace_add("write", lambda *args: self.search())
+        search_bar.pack(pady=5)
+
+        # Treeview for tasks (virtualized: only the rows in view exist)
+        self.task_list = VirtualTaskList(self, self.get_task, height=15)
+        self.tree = self.task_list.tree
+        for col in self.tree["columns"]:
+            self.tree.heading(col, command=lambda c=col: self.sort_by_column(c))
+            self.tree.column(col, width=100 if col != "name" else 150)
+        self.update_headings()
+
+        self.tree.bind("<Double-1>", self.handle_tree_double_click)
+
+        self.task_list.pack(pady=10)
+
+        # Populate the tree initially
+        self.refresh_task_list()
+
+        # Workload summary, kept current by deltas on every save
+        self.summary = SummaryPanel(self, self.aggregates)
+        self.summary.pack(fill="x", padx=10, pady=5)
+        self.label_conflicts = tk.Label(self, anchor="w", fg="red")
+        self.label_conflicts.pack(fill="x", padx=10)
+        self.update_conflicts()
+
+        # Button: Logout
+        btn_logout = tk.Button(self, text="Logout", command=self.logout)
+        btn_logout.pack()
+
+    def destroy(self):
+        self.reminders.stop()
+        self.master.unbind("<Control-z>")
+        self.master.unbind("<Control-y>")
+        super().destroy()
+
+    def logout(self):
+        # Make sure this user's edits are on disk before leaving; a failure
+        # is reported by MainApp.poll_persistence and keeps the user here
+        if not self.master.persistence.flush():
+            return
+        if self.master.client is not None:
+            self.master.client.request("logout")
+            self.master.client.tasks = None
+        self.master.forget_undo(self.user_index)
+        self.master.active_user_index = None
+        self.master._show_login_frame()
+
+    def get_task(self, task_index):
+        return self.data["users"][self.user_index]["tasks"][task_index]
+
+    def put_task(self, task_index, task, action="edit"):
+        """
+        Saves task at task_index (len(tasks) creates it), logging the
+        change for undo and the task's history, and redraws it. action is
+        "edit" for a new change, or "undo"/"redo" (see OperationLog.record).
+        """
+        tasks = self.data["users"][self.user_index]["tasks"]
+        log = self.master.operation_log(self.user_index)
+        persistence = self.master.persistence
+        with persistence.lock:
+            old = tasks[task_index] if task_index < len(tasks) else None
+            if old is None:
+                tasks.append(task)
+            else:
+                tasks[task_index] = task
+            entry = put_history_entry(log.email, task_index, old, task, None if action == "edit" else action)
+            history = [log.record(entry, action)] if entry is not None else []
+            # Written by the background writer; failures are reported later
+            persistence.submit(put_task_change(self.user_index, task_index, task), history)
+        self.task_saved(task_index)
+        if action == "edit":
+            self.warn_conflicts(task_index)
+
+    def update_conflicts(self):
+        count = len(self.dependencies.conflicts)
+        self.label_conflicts.config(
+            text=f"Schedule conflicts: {count} task(s) due before a task they depend on" if count else ""
+        )
+
+    def warn_conflicts(self, task_index):
+        """
+        Warns if the task just saved is due before a task it depends on,
+        or made dependent tasks late.
+        """
+        graph = self.dependencies
+        lines = []
+        if task_index in graph.conflicts:
+            task = self.get_task(task_index)
+            driver = self.get_task(graph.driver[task_index])
+            lines.append(f"'{task.name}' is due {task.end_date}, but it depends on '{driver.name}', "
+                         f"which can't finish before {ordinal_to_date(graph.finish[task_index])}.")
+        late = sum(1 for i in graph.touched if i in graph.conflicts and i != task_index)
+        if late:
+            lines.append(f"{late} task(s) depending on it are now due before it can finish.")
+        if lines:
+            messagebox.showwarning("Schedule Conflict", "\n\n".join(lines))
+
+    def undo(self):
+        """
+        Undoes the latest task edit or creation made this session that
+        isn't undone yet.
+        """
+        log = self.master.operation_log(self.user_index)
+        entry = log.pop_undo()
+        if entry is None:
+            return
+        task_index = log.current_index(entry)
+        if task_index is None:
+            log.forget_stacks()
+            messagebox.showerror("Undo", "The task has since been deleted.")
+            return
+        if entry["kind"] == "edit":
+            self.put_task(task_index, apply_fields(self.get_task(task_index), entry["before"]), "undo")
+            return
+        # Undoing a creation deletes the task; later tasks move up, so the
+        # view is rebuilt
+        tasks = self.data["users"][self.user_index]["tasks"]
+        persistence = self.master.persistence
+        log.anchor_redo(entry, task_index)
+        with persistence.lock:
+            task = tasks[task_index]
+            change = delete_tasks_change(self.user_index, [task_index], len(tasks))
+            delete_tasks(tasks, [task_index])
+            line = log.record(delete_history_entry(log.email, [task_index], [task], "undo"), "undo")
+            persistence.submit(change, [line])
+        self.master.show_task_view(self.user_index)
+
+    def redo(self):
+        """
+        Redoes the latest undone change, unless a new edit came since.
+        """
+        log = self.master.operation_log(self.user_index)
+        entry = log.pop_redo()
+        if entry is None:
+            return
+        if entry["kind"] == "create":
+            tasks = self.data["users"][self.user_index]["tasks"]
+            self.put_task(len(tasks), Task.from_dict(entry["after"]), "redo")
+            log.reanchor(entry, log.undo_stack[-1])
+            return
+        task_index = log.current_index(entry)
+        if task_index is None:
+            log.forget_stacks()
+            messagebox.showerror("Redo", "The task has since been deleted.")
+            return
+        self.put_task(task_index, apply_fields(self.get_task(task_index), entry["after"]), "redo")
+
+    def open_history_window(self):
+        selected = self.tree.selection()
+        if not selected:
+            messagebox.showinfo("Task History", "Select a task first.")
+            return
+        HistoryWindow(self, int(selected[0]))
+
+    def refresh_task_list(self, filtered_tasks=None, changed=(), ranked=False, view=None):
+        """
+        Refreshes the Treeview with either all tasks or a filtered list of
+        (task_index, task) pairs, shown in the current sort order. If ranked,
+        filtered_tasks is a list of bare task indexes (search results, or
+        the rows of the saved view named by view) shown in their own order,
+        so no task has to be fetched. Each row's iid is
+        the task's index in the user's task list, so it stays valid whatever
+        the display order. Only the rows in view are redrawn, and of those
+        only the ones that moved or whose task index is listed in changed.
+        """
+        with timed("refresh_task_list") as info:
+            if view is None and self.active_view is not None:
+                self.view_var.set(ALL_TASKS_VIEW)
+            self.active_view = view
+            self.filtered_tasks = None if ranked else filtered_tasks
+            self.ranked_rows = filtered_tasks if ranked and view is None else None
+            tasks = self.data["users"][self.user_index]["tasks"]
+
+            if ranked:
+                rows = filtered_tasks
+            elif filtered_tasks is not None:
+                if self.sorted_index is not None:
+                    pairs = sorted(filtered_tasks, key=lambda pair: self.sorted_index.key_of(pair[0]))
+                else:
+                    pairs = sorted(filtered_tasks, key=lambda pair: task_sort_key(pair[1], self.sort_keys) + (pair[0],))
+                rows = [task_index for task_index, _ in pairs]
+            elif self.sorted_index is not None:
+                # The sort index itself is the row sequence
+                rows = self.sorted_index
+            else:
+                # Database-backed tasks come back already ordered by the indexes
+                if self.db_rows is None:
+                    self.db_rows = tasks.positions(order_by=self.sort_keys)
+                rows = self.db_rows
+
+            info["rows"] = len(rows)
+            self.task_list.set_rows(rows, changed)
+
+    def place_db_row(self, task_index):
+        """
+        Moves a created or edited database-backed task to its place in the
+        cached row order: one list removal and a binary search that fetches
+        about log2(n) tasks, instead of re-reading every position.
+        """
+        rows = self.db_rows
+        if rows is None:
+            return
+        tasks = self.data["users"][self.user_index]["tasks"]
+        if task_index < len(rows):
+            rows.remove(task_index)
+        key = lambda i: task_sort_key(tasks[i], self.sort_keys) + (i,)
+        rows.insert(bisect_left(rows, key(task_index), key=key), task_index)
+
+    def task_saved(self, task_index):
+        """
+        Called after a task was created or edited: re-sorts just that task
+        and shows the full (unfiltered) list again.
+        """
+        for index in self.indexes:
+            index.update(task_index)
+        self.summary.refresh(self.aggregates.touched)
+        self.update_conflicts()
+        self.place_db_row(task_index)
+        if self.search_var.get():
+            self.search_var.set("")
+        self.refresh_task_list(changed=[task_index])
+        self.task_list.show(task_index)
+        if self.calendar_window is not None and self.calendar_window.winfo_exists():
+            self.calendar_window.refresh()
+
+    def task_changed(self, task_index):
+        """
+        Called when another session created or edited a task (client mode):
+        redraws its row in place, keeping the current filter or search.
+        """
+        for index in self.indexes:
+            index.update(task_index)
+        self.summary.refresh(self.aggregates.touched)
+        self.update_conflicts()
+        self.place_db_row(task_index)
+        if self.search_var.get():
+            self.search()
+        elif self.active_view is not None:
+            self.show_view(self.active_view, changed=[task_index])
+        else:
+            self.refresh_task_list(self.filtered_tasks, changed=[task_index])
+        if self.calendar_window is not None and self.calendar_window.winfo_exists():
+            self.calendar_window.refresh()
+
+    def sort_by_column(self, column):
+        """
+        Makes the clicked column the primary sort key; the previous keys
+        follow as tie-breakers.
+        """
+        self.sort_keys = ([column] + [key for key in self.sort_keys if key != column])[:MAX_SORT_KEYS]
+        if self.sorted_index is not None:
+            self.sorted_index.set_order(self.sort_keys)
+        self.db_rows = None
+        self.views.order_changed()
+        self.update_headings()
+        if self.active_view is not None:
+            self.show_view(self.active_view)
+            return
+        filtered_tasks = self.filtered_tasks
+        if self.ranked_rows is not None:
+            # Search results give up their ranking for the clicked order
+            tasks = self.data["users"][self.user_index]["tasks"]
+            filtered_tasks = [(i, tasks[i]) for i in self.ranked_rows]
+        self.refresh_task_list(filtered_tasks)
+
+    def update_headings(self):
+        for col in self.tree["columns"]:
+            text = col.capitalize()
+            if col in self.sort_keys:
+                text += f" ({self.sort_keys.index(col) + 1})"
+            self.tree.heading(col, text=text)
+
+    def open_create_task_window(self):
+        opened = time.perf_counter()
+        record_when_ready(CreateOrEditTaskWindow(self, mode="create"), "open_create_window", opened)
+
+    def handle_tree_double_click(self, event):
+        """
+        Double-click on a row to edit the task.
+        """
+        item_id = self.tree.focus()
+        if not item_id:
+            return
+
+        opened = time.perf_counter()
+        window = CreateOrEditTaskWindow(self, mode="edit", task_index=int(item_id))
+        record_when_ready(window, "open_edit_window", opened)
+
+    def open_filter_window(self):
+        opened = time.perf_counter()
+        record_when_ready(FilterWindow(self), "open_filter_window", opened)
+
+    def update_view_choices(self):
+        names = list(self.views.criteria)
+        self.dropdown_view.config(values=[ALL_TASKS_VIEW] + names)
+        if self.view_var.get() not in names:
+            self.view_var.set(ALL_TASKS_VIEW)
+
+    def show_view(self, name, changed=()):
+        """
+        Shows a saved view's tasks from its cached results (built on first
+        use), or all tasks for ALL_TASKS_VIEW.
+        """
+        if name not in self.views.criteria:
+            self.refresh_task_list()
+            return
+        with timed("show_view") as info:
+            rows = self.views.rows_of(name)
+            info["matches"] = len(rows)
+        self.view_var.set(name)
+        self.refresh_task_list(rows, changed, ranked=True, view=name)
+
+    def save_views(self, views):
+        """
+        Stores the user's list of saved views.
+        """
+        persistence = self.master.persistence
+        with persistence.lock:
+            persistence.submit(set_user_views(self.data["users"], self.user_index, views))
+        self.views.set_views(views)
+        self.update_view_choices()
+
+    def save_view(self, name, criteria):
+        """
+        Adds the view, or replaces the one with the same name, and shows
+        it. Raises ValueError (see validate_views).
+        """
+        views = [v for v in self.data["users"][self.user_index].get("views", []) if v["name"] != name.strip()]
+        views = validate_views(views + [{"name": name, "criteria": criteria}])
+        self.save_views(views)
+        self.show_view(views[-1]["name"])
+
+    def delete_view(self):
+        name = self.view_var.get()
+        if name not in self.views.criteria:
+            return
+        if not messagebox.askyesno("Delete View", f"Delete the saved view '{name}'?"):
+            return
+        self.save_views([v for v in self.data["users"][self.user_index].get("views", []) if v["name"] != name])
+        self.refresh_task_list()
+
+    def get_search_index(self):
+        if self.search_index is None:
+            self.search_index = TaskSearchIndex(self.data["users"][self.user_index]["tasks"])
+            self.indexes.append(self.search_index)
+        return self.search_index
+
+    def search(self):
+        """
+        Shows the tasks matching the search box, best match first, or all
+        tasks once the box is cleared.
+        """
+        query = self.search_var.get()
+        if not query.strip():
+            self.refresh_task_list()
+            return
+        with timed("search") as info:
+            results = self.get_search_index().search(query)
+            info["matches"] = len(results)
+        self.refresh_task_list(results, ranked=True)
+
+    def open_calendar_window(self):
+        if self.calendar_window is not None and self.calendar_window.winfo_exists():
+            self.calendar_window.lift()
+            return
+        opened = time.perf_counter()
+        tasks = self.data["users"][self.user_index]["tasks"]
+        if self.date_index is None and not hasattr(tasks, "between"):
+            self.date_index = DateBucketIndex(tasks)
+            self.indexes.append(self.date_index)
+        self.calendar_window = CalendarWindow(self)
+        record_when_ready(self.calendar_window, "open_calendar_window", opened)
+
+    def show_reminders(self, due):
+        """
+        Lists the (kind, task_index) reminders that just came due in the
+        reminder window, opening it if needed.
+        """
+        if self.reminder_window is None or not self.reminder_window.winfo_exists():
+            self.reminder_window = ReminderWindow(self)
+        self.reminder_window.add(due)
+        self.reminder_window.lift()
+        self.bell()
+
+    def tasks_between(self, start_ord, end_ord):
+        """
+        (task_index, task) pairs due from start_ord to end_ord inclusive,
+        by date, then priority. Recurring tasks appear as an Occurrence on
+        each of their dates in the range.
+        """
+        tasks = self.data["users"][self.user_index]["tasks"]
+        if hasattr(tasks, "between"):
+            candidates = tasks.between(start_ord, end_ord)
+        else:
+            candidates = [(i, tasks[i]) for _, task_indexes in self.date_index.between(start_ord, end_ord)
+                          for i in task_indexes]
+            candidates.extend((i, tasks[i]) for i in self.date_index.recurring)
+        pairs = list(occurrences_between(candidates, start_ord, end_ord))
+        pairs.sort(key=lambda pair: (pair[1].end_ord, pair[1].priority, pair[0]))
+        return pairs
+
+###############################################################################
+# Window: CreateOrEditTaskWindow
+###############################################################################
+class CreateOrEditTaskWindow(tk.Toplevel):
+    """
+    Popup window to create or edit a task.
+    """
+    def __init__(self, parent_frame, mode="create", task_index=None):
+        super().__init__(parent_frame)
+        self.parent_frame = parent_frame
+        self.master_app = parent_frame.master
+        self.data = parent_frame.data
+        self.user_index = parent_frame.user_index
+        self.mode = mode
+        self.task_index = task_index
+
+        self.title("Create Task" if mode == "create" else "Edit Task")
+        self.geometry("400x720")
+        self.resizable(False, False)
+
+        # If editing, load existing task data
+        self.existing_task = None
+        if self.mode == "edit" and self.task_index is not None:
+            self.existing_task = self.data["users"][self.user_index]["tasks"][self.task_index]
+
+        # Task Name
+        tk.Label(self, text="Task Name").pack(pady=5)
+        self.entry_name = tk.Entry(self, width=30)
+        self.entry_name.pack()
+        if self.existing_task:
+            self.entry_name.insert(0, self.existing_task.name)
+
+        # End Date
+        tk.Label(self, text="End Date (YYYY-MM-DD; first date if repeating)").pack(pady=5)
+        self.entry_end_date = tk.Entry(self, width=30)
+        self.entry_end_date.pack()
+        if self.existing_task:
+            self.entry_end_date.insert(0, self.existing_task.end_date)
+
+        # Status
+        tk.Label(self, text="Status").pack(pady=5)
+        self.status_var = tk.StringVar(value="Not Started")
+        self.dropdown_status = ttk.Combobox(self, textvariable=self.status_var, values=STATUS_OPTIONS, state="readonly")
+        self.dropdown_status.pack()
+        if self.existing_task:
+            self.status_var.set(self.existing_task.status)
+
+        # Priority
+        tk.Label(self, text="Priority (1 = Highest)").pack(pady=5)
+        self.entry_priority = tk.Entry(self, width=30)
+        self.entry_priority.pack()
+        if self.existing_task:
+            self.entry_priority.insert(0, str(self.existing_task.priority))
+
+        # Progress
+        tk.Label(self, text="Progress (0 - 100%)").pack(pady=5)
+        self.entry_progress = tk.Entry(self, width=30)
+        self.entry_progress.pack()
+        if self.existing_task:
+            self.entry_progress.insert(0, str(self.existing_task.progress))
+
+        # Assignees
+        tk.Label(self, text="Assignees (comma-separated, up to 5)").pack(pady=5)
+        self.entry_assignees = tk.Entry(self, width=30)
+        self.entry_assignees.pack()
+        if self.existing_task:
+            if self.existing_task.assignees:
+                self.entry_assignees.insert(0, ", ".join(self.existing_task.assignees))
+
+        # Repeat rule (stored once; occurrences are computed when shown)
+        recurrence = self.existing_task.recurrence if self.existing_task else None
+        repeat_bar = tk.Frame(self)
+        repeat_bar.pack(pady=5)
+        tk.Label(repeat_bar, text="Repeat").pack(side="left")
+        self.repeat_var = tk.StringVar(value=recurrence.freq.capitalize() if recurrence else "Never")
+        ttk.Combobox(repeat_bar, textvariable=self.repeat_var, values=REPEAT_OPTIONS,
+                     state="readonly", width=9).pack(side="left", padx=5)
+        tk.Label(repeat_bar, text="every").pack(side="left")
+        self.entry_interval = tk.Entry(repeat_bar, width=4)
+        self.entry_interval.insert(0, str(recurrence.interval) if recurrence else "1")
+        self.entry_interval.pack(side="left", padx=5)
+
+        tk.Label(self, text="Repeat Until (YYYY-MM-DD, optional)").pack(pady=5)
+        self.entry_until = tk.Entry(self, width=30)
+        self.entry_until.pack()
+        if recurrence and recurrence.until_ord is not None:
+            self.entry_until.insert(0, ordinal_to_date(recurrence.until_ord))
+
+        tk.Label(self, text="Or Number of Times (optional)").pack(pady=5)
+        self.entry_count = tk.Entry(self, width=30)
+        self.entry_count.pack()
+        if recurrence and recurrence.count is not None:
+            self.entry_count.insert(0, str(recurrence.count))
+
+        # Dependencies, by name; the critical path shows what sets the
+        # earliest finish
+        tk.Label(self, text="Depends On (task names, comma-separated)").pack(pady=5)
+        self.entry_depends = tk.Entry(self, width=30)
+        self.entry_depends.pack()
+        self.label_finish = tk.Label(self, text="", wraplength=380)
+        self.label_finish.pack()
+        if self.existing_task and self.existing_task.depends_on:
+            tasks = self.data["users"][self.user_index]["tasks"]
+            self.entry_depends.insert(0, ", ".join(tasks[i].name for i in self.existing_task.depends_on))
+            graph = parent_frame.dependencies
+            finish = graph.earliest_finish(self.task_index)
+            if finish is not None:
+                path = " -> ".join(tasks[i].name for i in reversed(graph.critical_path(self.task_index)))
+                self.label_finish.config(text=f"Earliest finish: {ordinal_to_date(finish)}\nCritical path: {path}")
+
+        # Button: Save
+        btn_save = tk.Button(self, text="Save Task", command=self.save_task)
+        btn_save.pack(pady=10)
+
+    def save_task(self):
+        """
+        Validate fields, then save or update the task in the JSON structure.
+        """
+        try:
+            recurrence = validate_recurrence(
+                repeat=self.repeat_var.get(),
+                interval=self.entry_interval.get(),
+                until=self.entry_until.get(),
+                count=self.entry_count.get()
+            )
+            new_task_data = validate_task_fields(
+                name=self.entry_name.get(),
+                end_date=self.entry_end_date.get(),
+                status=self.status_var.get(),
+                priority=self.entry_priority.get(),
+                progress=self.entry_progress.get(),
+                assignees=self.entry_assignees.get(),
+                recurrence=recurrence
+            )
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        # Per-date overrides only carry over while the dates stay the same
+        existing = self.existing_task
+        if existing is not None and recurrence is not None and existing.recurrence == recurrence \
+                and existing.end_ord == new_task_data.end_ord:
+            new_task_data.overrides = existing.overrides
+
+        tasks = self.data["users"][self.user_index]["tasks"]
+        task_index = len(tasks) if self.mode == "create" else self.task_index
+        try:
+            depends_on = dependency_indexes(tasks, self.entry_depends.get(), task_index)
+            if len(depends_on) > MAX_DEPENDENCIES:
+                raise ValueError(f"A task can depend on up to {MAX_DEPENDENCIES} tasks.")
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        cycle = self.parent_frame.dependencies.cycle(task_index, depends_on)
+        if cycle is not None:
+            names = [new_task_data.name] + [tasks[i].name for i in cycle[:-1]] + [new_task_data.name]
+            messagebox.showerror("Error", f"That would make a dependency cycle: {' -> '.join(names)}")
+            return
+        new_task_data.depends_on = tuple(depends_on)
+
+        self.parent_frame.put_task(task_index, new_task_data)
+        messagebox.showinfo("Success", "Task saved successfully.")
+        self.destroy()
+
+###############################################################################
+# Window: OccurrenceWindow
+###############################################################################
+class OccurrenceWindow(tk.Toplevel):
+    """
+    Popup window to set the status and progress of one occurrence of a
+    recurring task. Only occurrences that differ from the series are
+    stored (see Task.with_override).
+    """
+    def __init__(self, parent_frame, task_index, ordinal):
+        super().__init__(parent_frame)
+        self.parent_frame = parent_frame
+        self.master_app = parent_frame.master
+        self.data = parent_frame.data
+        self.user_index = parent_frame.user_index
+        self.task_index = task_index
+        self.ordinal = ordinal
+
+        task = self.data["users"][self.user_index]["tasks"][task_index]
+        occurrence = Occurrence(task, ordinal, (task.overrides or {}).get(ordinal))
+        self.title("Edit Occurrence")
+        self.resizable(False, False)
+
+        tk.Label(self, text=f"{task.name} on {occurrence.end_date}", font=("Arial", 11, "bold")).pack(padx=10, pady=5)
+
+        tk.Label(self, text="Status").pack(pady=5)
+        self.status_var = tk.StringVar(value=occurrence.status)
+        ttk.Combobox(self, textvariable=self.status_var, values=STATUS_OPTIONS, state="readonly").pack()
+
+        tk.Label(self, text="Progress (0 - 100%)").pack(pady=5)
+        self.entry_progress = tk.Entry(self, width=30)
+        self.entry_progress.insert(0, str(occurrence.progress))
+        self.entry_progress.pack()
+
+        tk.Button(self, text="Save Occurrence", command=self.save_occurrence).pack(pady=10)
+        tk.Button(self, text="Edit Series", command=self.edit_series).pack(pady=(0, 10))
+
+    def save_occurrence(self):
+        try:
+            progress = int(self.entry_progress.get().strip())
+            if progress < 0 or progress > 100:
+                raise ValueError()
+        except ValueError:
+            messagebox.showerror("Error", "Progress must be an integer from 0 to 100.")
+            return
+
+        task = self.data["users"][self.user_index]["tasks"][self.task_index]
+        self.parent_frame.put_task(self.task_index, task.with_override(self.ordinal, self.status_var.get(), progress))
+        self.destroy()
+
+    def edit_series(self):
+        CreateOrEditTaskWindow(self.parent_frame, mode="edit", task_index=self.task_index)
+        self.destroy()
+
+###############################################################################
+# Window: FilterWindow
+###############################################################################
+class FilterWindow(tk.Toplevel):
+    """
+    Popup window to filter tasks by end date, status, priority, progress, or assignees.
+    """
+    def __init__(self, parent_frame):
+        super().__init__(parent_frame)
+        self.parent_frame = parent_frame
+        self.master_app = parent_frame.master
+        self.data = parent_frame.data
+        self.user_index = parent_frame.user_index
+
+        self.title("Filter Tasks")
+        self.geometry("400x420")
+        self.resizable(False, False)
+
+        # Create fields for each filter type
+        tk.Label(self, text="End Date Before (YYYY-MM-DD):").pack(pady=5)
+        self.entry_end_date = tk.Entry(self, width=25)
+        self.entry_end_date.pack()
+
+        tk.Label(self, text="Status (exact match):").pack(pady=5)
+        self.status_var = tk.StringVar()
+        self.dropdown_status = ttk.Combobox(self, textvariable=self.status_var, values=[""] + STATUS_OPTIONS)
+        self.dropdown_status.pack()
+
+        tk.Label(self, text="Max Priority (integer):").pack(pady=5)
+        self.entry_priority = tk.Entry(self, width=25)
+        self.entry_priority.pack()
+
+        tk.Label(self, text="Progress >= (0-100):").pack(pady=5)
+        self.entry_progress = tk.Entry(self, width=25)
+        self.entry_progress.pack()
+
+        tk.Label(self, text="Assignee Contains:").pack(pady=5)
+        self.entry_assignee = tk.Entry(self, width=25)
+        self.entry_assignee.pack()
+
+        tk.Button(self, text="Apply Filter", command=self.apply_filter).pack(pady=5)
+        tk.Button(self, text="Clear Filter", command=self.clear_filter).pack(pady=5)
+
+        # Save these criteria as a named view
+        view_bar = tk.Frame(self)
+        tk.Label(view_bar, text="View Name:").pack(side="left")
+        self.entry_view_name = tk.Entry(view_bar, width=20)
+        self.entry_view_name.pack(side="left", padx=5)
+        tk.Button(view_bar, text="Save as View", command=self.save_view).pack(side="left")
+        view_bar.pack(pady=10)
+
+    def apply_filter(self):
+        tasks = self.data["users"][self.user_index]["tasks"]
+        with timed("filter") as info:
+            filtered = self.select_tasks(tasks)
+            info["matches"] = len(filtered)
+
+        if not filtered:
+            messagebox.showinfo("No Results", "No tasks match the selected criteria.")
+        self.parent_frame.refresh_task_list(filtered)
+        self.destroy()
+
+    def clear_filter(self):
+        """
+        Shows every task again, leaving any filter or saved view.
+        """
+        self.parent_frame.filtered_tasks = None
+        self.parent_frame.active_view = None
+        self.parent_frame.view_var.set(ALL_TASKS_VIEW)
+        self.parent_frame.refresh_task_list()
+        self.destroy()
+
+    def save_view(self):
+        try:
+            self.parent_frame.save_view(self.entry_view_name.get(), self.criteria())
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self.destroy()
+
+    def criteria(self):
+        """
+        The criteria entered, as TaskFilter arguments.
+        """
+        return {
+            "end_date": self.entry_end_date.get().strip(),
+            "status": self.status_var.get().strip(),
+            "max_priority": self.entry_priority.get().strip(),
+            "min_progress": self.entry_progress.get().strip(),
+            "assignees": self.entry_assignee.get().strip()
+        }
+
+    def select_tasks(self, tasks):
+        """
+        (task_index, task) pairs matching the criteria entered.
+        """
+        try:
+            task_filter = TaskFilter(**self.criteria())
+        except ValueError:
+            # Invalid date, priority or progress input matches nothing
+            filtered = []
+        else:
+            if hasattr(tasks, "query"):
+                # Database-backed tasks: let the indexes do the filtering
+                filtered = tasks.query(**task_filter.criteria())
+            else:
+                filtered = [(i, tasks[i]) for i in self.parent_frame.filter_index.select(task_filter)]
+        return filtered
+
+
+###############################################################################
+# Window: CalendarWindow
+###############################################################################
+WEEKDAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+MONTH_NAMES = ["January", "February", "March", "April", "May", "June", "July",
+               "August", "September", "October", "November", "December"]
+
+class CalendarWindow(tk.Toplevel):
+    """
+    Month or week grid with each task listed on its end date. The cells are
+    created once per mode; navigating only refills them with the tasks the
+    date index returns for the visible range.
+    Double-click a task to edit it, or an occurrence of a recurring task to
+    update just that date.
+    """
+    def __init__(self, parent_frame):
+        super().__init__(parent_frame)
+        self.parent_frame = parent_frame
+        self.title("Calendar")
+        self.resizable(False, False)
+
+        self.anchor = date.today()
+        self.mode_var = tk.StringVar(value="month")
+
+        bar = tk.Frame(self)
+        bar.pack(fill="x", pady=5)
+        tk.Button(bar, text="<", command=lambda: self.move(-1)).pack(side="left", padx=5)
+        tk.Button(bar, text="Today", command=self.go_today).pack(side="left")
+        tk.Button(bar, text=">", command=lambda: self.move(1)).pack(side="left", padx=5)
+        self.label_title = tk.Label(bar, font=("Arial", 14, "bold"))
+        self.label_title.pack(side="left", padx=10)
+        for mode in ("week", "month"):
+            tk.Radiobutton(bar, text=mode.capitalize(), value=mode, variable=self.mode_var,
+                           command=self.build_grid).pack(side="right")
+
+        self.grid_frame = tk.Frame(self)
+        self.grid_frame.pack(padx=5, pady=5)
+        self.cells = []
+        self.build_grid()
+
+    def build_grid(self):
+        """
+        (Re)creates the day cells for the current mode: 6 weeks of short
+        lists for a month, one week of tall ones.
+        """
+        for widget in self.grid_frame.winfo_children():
+            widget.destroy()
+        weeks, height = (6, 4) if self.mode_var.get() == "month" else (1, 20)
+        for col, name in enumerate(WEEKDAY_NAMES):
+            tk.Label(self.grid_frame, text=name, font=("Arial", 10, "bold")).grid(row=0, column=col)
+        self.cells = []
+        for week in range(weeks):
+            for col in range(7):
+                cell = tk.Frame(self.grid_frame, borderwidth=1, relief="solid")
+                cell.grid(row=week + 1, column=col, sticky="nsew")
+                day_label = tk.Label(cell, anchor="w")
+                day_label.pack(fill="x")
+                listbox = tk.Listbox(cell, width=13, height=height, borderwidth=0,
+                                     highlightthickness=0, activestyle="none")
+                listbox.pack(fill="both")
+                listbox.bind("<Double-1>", self.handle_double_click)
+                listbox.entries = []
+                self.cells.append((day_label, listbox))
+        self.refresh()
+
+    def visible_range(self):
+        """
+        First and last day shown, Monday to Sunday.
+        """
+        if self.mode_var.get() == "month":
+            first = self.anchor.replace(day=1)
+            start = first.toordinal() - first.weekday()
+        else:
+            start = self.anchor.toordinal() - self.anchor.weekday()
+        return start, start + len(self.cells) - 1
+
+    def refresh(self):
+        """
+        Refills every cell from the tasks due in the visible range.
+        """
+        start, end = self.visible_range()
+        by_day = {}
+        for task_index, task in self.parent_frame.tasks_between(start, end):
+            by_day.setdefault(task.end_ord, []).append((task_index, task))
+        today = date.today().toordinal()
+        for ordinal, (day_label, listbox) in enumerate(self.cells, start):
+            day = date.fromordinal(ordinal)
+            day_label.config(
+                text=str(day.day),
+                fg="black" if self.mode_var.get() == "week" or day.month == self.anchor.month else "gray",
+                font=("Arial", 9, "bold" if ordinal == today else "normal")
+            )
+            entries = by_day.get(ordinal, [])
+            listbox.delete(0, "end")
+            if entries:
+                listbox.insert("end", *(task.name for _, task in entries))
+            listbox.entries = entries
+
+        if self.mode_var.get() == "month":
+            title = f"{MONTH_NAMES[self.anchor.month - 1]} {self.anchor.year}"
+        else:
+            first, last = date.fromordinal(start), date.fromordinal(end)
+            title = f"{first.day} {MONTH_NAMES[first.month - 1][:3]} - " \
+                    f"{last.day} {MONTH_NAMES[last.month - 1][:3]} {last.year}"
+        self.label_title.config(text=title)
+
+    def move(self, step):
+        """
+        Moves one month or one week forward (step=1) or back (step=-1).
+        """
+        if self.mode_var.get() == "month":
+            month = self.anchor.year * 12 + self.anchor.month - 1 + step
+            self.anchor = date(month // 12, month % 12 + 1, 1)
+        else:
+            self.anchor = date.fromordinal(self.anchor.toordinal() + 7 * step)
+        self.refresh()
+
+    def go_today(self):
+        self.anchor = date.today()
+        self.refresh()
+
+    def handle_double_click(self, event):
+        listbox = event.widget
+        selection = listbox.curselection()
+        if selection:
+            task_index, task = listbox.entries[selection[0]]
+            if isinstance(task, Occurrence):
+                OccurrenceWindow(self.parent_frame, task_index, task.end_ord)
+            else:
+                CreateOrEditTaskWindow(self.parent_frame, mode="edit", task_index=task_index)
+
+
+###############################################################################
+# Window: ReminderWindow
+###############################################################################
+REMINDER_LABELS = {"overdue": "Overdue", "due_soon": "Due soon"}
+
+class ReminderWindow(tk.Toplevel):
+    """
+    Lists overdue and due-soon tasks as their reminders come due; a task
+    shows once, with its latest reminder. Double-click a task to edit it.
+    """
+    COLUMNS = ("reminder", "name", "end_date", "status")
+
+    def __init__(self, parent_frame):
+        super().__init__(parent_frame)
+        self.parent_frame = parent_frame
+        self.title("Reminders")
+        self.resizable(False, False)
+
+        self.tree = ttk.Treeview(self, columns=self.COLUMNS, show="headings", height=8)
+        for col in self.COLUMNS:
+            self.tree.heading(col, text=col.replace("_", " ").capitalize())
+            self.tree.column(col, width=150 if col == "name" else 90)
+        self.tree.pack(padx=5, pady=5)
+        self.tree.bind("<Double-1>", self.edit_task)
+        tk.Button(self, text="Dismiss", command=self.destroy).pack(pady=5)
+
+    def add(self, due):
+        tasks = self.parent_frame.data["users"][self.parent_frame.user_index]["tasks"]
+        for kind, task_index in due:
+            task = tasks[task_index]
+            values = (REMINDER_LABELS[kind], task.name, task.end_date, task.status)
+            iid = str(task_index)
+            if self.tree.exists(iid):
+                self.tree.item(iid, values=values)
+            else:
+                self.tree.insert("", "end", iid=iid, values=values)
+
+    def edit_task(self, event):
+        item_id = self.tree.focus()
+        if item_id:
+            CreateOrEditTaskWindow(self.parent_frame, mode="edit", task_index=int(item_id))
+
+###############################################################################
+# Window: HistoryWindow
+###############################################################################
+HISTORY_KIND_LABELS = {"create": "Created", "edit": "Edited", None: "Earliest logged"}
+
+class HistoryWindow(tk.Toplevel):
+    """
+    Lists the logged versions of one task, newest first, each rebuilt by
+    replaying the diffs (see OperationLog.versions). Select a version to
+    see its fields; "Restore" saves it as a new edit, so it can be undone.
+    """
+    COLUMNS = ("time", "change", "fields")
+
+    def __init__(self, parent_frame, task_index):
+        super().__init__(parent_frame)
+        self.parent_frame = parent_frame
+        self.task_index = task_index
+        task = parent_frame.get_task(task_index)
+        log = parent_frame.master.operation_log(parent_frame.user_index)
+        self.versions = log.versions(task_index, task)
+        self.title(f"History: {task.name}")
+        self.resizable(False, False)
+
+        self.tree = ttk.Treeview(self, columns=self.COLUMNS, show="headings", height=8)
+        for col in self.COLUMNS:
+            self.tree.heading(col, text=col.capitalize())
+            self.tree.column(col, width=200 if col == "fields" else 130)
+        for i, (entry, _) in enumerate(self.versions):
+            if entry is None:
+                values = ("", HISTORY_KIND_LABELS[None], "")
+            else:
+                change = HISTORY_KIND_LABELS[entry["kind"]]
+                if "via" in entry:
+                    change += f" ({entry['via']})"
+                when = datetime.fromtimestamp(entry["time"]).strftime("%Y-%m-%d %H:%M:%S")
+                values = (when, change, ", ".join(entry["after"]) if entry["kind"] == "edit" else "")
+            self.tree.insert("", "end", iid=str(i), values=values)
+        self.tree.pack(padx=5, pady=5)
+        self.tree.bind("<<TreeviewSelect>>", self.show_version)
+
+        self.label_fields = tk.Label(self, text="", justify="left", anchor="w")
+        self.label_fields.pack(fill="x", padx=10)
+        tk.Button(self, text="Restore this version", command=self.restore).pack(pady=5)
+
+    def selected_task(self):
+        item_id = self.tree.focus()
+        return self.versions[int(item_id)][1] if item_id else None
+
+    def show_version(self, event):
+        task = self.selected_task()
+        if task is not None:
+            self.label_fields.config(text="\n".join(
+                f"{field}: {value}" for field, value in zip(TASK_FIELDS, task_row_values(task))))
+
+    def restore(self):
+        task = self.selected_task()
+        if task is None:
+            return
+        self.parent_frame.put_task(self.task_index, task)
+        self.destroy()
+
+###############################################################################
+# Window: DiagnosticsWindow
+###############################################################################
+DIAGNOSTICS_REFRESH_MS = 1000
+
+class DiagnosticsWindow(tk.Toplevel):
+    """
+    Hidden window (Ctrl+Shift+D) with latency percentiles per timed hot
+    path, refreshed every second. It can switch recording on, capture a
+    cProfile of the UI thread, and export the samples as a JSONL trace;
+    both files go next to the data file.
+    """
+    COLUMNS = ("name", "count", "p50", "p90", "p99", "max", "bytes")
+
+    def __init__(self, master):
+        super().__init__(master)
+        self.title("Diagnostics")
+        self.resizable(False, False)
+
+        bar = tk.Frame(self)
+        bar.pack(fill="x", padx=5, pady=5)
+        self.recording_var = tk.BooleanVar(value=INSTRUMENTS.enabled)
+        tk.Checkbutton(bar, text="Record timings", variable=self.recording_var,
+                       command=self.toggle_recording).pack(side="left")
+        self.button_profile = tk.Button(bar, command=self.toggle_profile)
+        self.button_profile.pack(side="left", padx=5)
+        tk.Button(bar, text="Export Trace", command=self.export_trace).pack(side="left")
+        tk.Button(bar, text="Clear", command=self.clear).pack(side="left", padx=5)
+
+        self.tree = ttk.Treeview(self, columns=self.COLUMNS, show="headings", height=12)
+        for col in self.COLUMNS:
+            self.tree.heading(col, text=col if col in ("name", "count", "bytes") else f"{col} ms")
+            self.tree.column(col, width=160 if col == "name" else 70, anchor="w" if col == "name" else "e")
+        self.tree.pack(padx=5)
+
+        self.label_status = tk.Label(self, anchor="w")
+        self.label_status.pack(fill="x", padx=5)
+        self.text_profile = tk.Text(self, height=12, width=90, font=("Courier", 9))
+        self.text_profile.pack(padx=5, pady=5)
+
+        self.update_profile_button()
+        self.refresh_job = None
+        self.refresh()
+
+    def destroy(self):
+        if self.refresh_job is not None:
+            self.after_cancel(self.refresh_job)
+            self.refresh_job = None
+        super().destroy()
+
+    def refresh(self):
+        self.tree.delete(*self.tree.get_children())
+        for name, row in INSTRUMENTS.summary().items():
+            size = "" if row["bytes"] is None else f"{row['bytes']:.0f}"
+            self.tree.insert("", "end", values=(
+                name, row["count"], *(f"{row[key]:.2f}" for key in ("p50", "p90", "p99", "max")), size
+            ))
+        self.refresh_job = self.after(DIAGNOSTICS_REFRESH_MS, self.refresh)
+
+    def output_path(self, kind, suffix):
+        """
+        "<data file directory>/tmc-<kind>-<timestamp><suffix>".
+        """
+        directory = os.path.dirname(os.path.abspath(self.master.data_file))
+        return os.path.join(directory, f"tmc-{kind}-{datetime.now():%Y%m%d-%H%M%S}{suffix}")
+
+    def toggle_recording(self):
+        INSTRUMENTS.enabled = self.recording_var.get()
+
+    def update_profile_button(self):
+        profiling = INSTRUMENTS.profiler is not None
+        self.button_profile.config(text="Stop Profile" if profiling else "Start Profile")
+
+    def toggle_profile(self):
+        if INSTRUMENTS.profiler is None:
+            INSTRUMENTS.start_profile()
+            self.label_status.config(text="Profiling the UI thread...")
+        else:
+            filename = self.output_path("profile", ".prof")
+            try:
+                report = INSTRUMENTS.stop_profile(filename)
+            except OSError as e:
+                messagebox.showerror("Error", f"Could not save the profile:\n{e}")
+                report = ""
+            else:
+                self.label_status.config(text=f"Profile saved to {filename}")
+            self.text_profile.delete("1.0", "end")
+            self.text_profile.insert("end", report)
+        self.update_profile_button()
+
+    def export_trace(self):
+        filename = self.output_path("trace", ".jsonl")
+        try:
+            count = INSTRUMENTS.export_trace(filename)
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not export the trace:\n{e}")
+            return
+        self.label_status.config(text=f"Exported {count} samples to {filename}")
+
+    def clear(self):
+        INSTRUMENTS.clear()
+        self.tree.delete(*self.tree.get_children())
+
+###############################################################################
+# Insertion Sort for tasks by priority
+###############################################################################
+def insertion_sort_by_priority(tasks):
+    """
+    An example of Insertion Sort that sorts tasks by ascending priority (smallest = highest).
+    Returns a new sorted list.
+    """
+    arr = tasks[:]
+    for i in range(1, len(arr)):
+        key_task = arr[i]
+        j = i - 1
+        while j >= 0 and arr[j].priority > key_task.priority:
+            arr[j+1] = arr[j]
+            j -= 1
+        arr[j+1] = key_task
+    return arr
+
+###############################################################################
+# Sorted Task Index
+###############################################################################
+MAX_SORT_KEYS = 3
+
+SORT_KEYS = {
+    "name": lambda t: t.name.casefold(),
+    # Unparsable dates go last
+    "end_date": lambda t: sys.maxsize if t.end_ord is None else t.end_ord,
+    "status": lambda t: STATUS_OPTIONS.index(t.status) if t.status in STATUS_OPTIONS else len(STATUS_OPTIONS),
+    "priority": lambda t: t.priority,
+    "progress": lambda t: t.progress,
+    "assignees": lambda t: ", ".join(t.assignees).casefold()
+}
+
+def task_sort_key(task, sort_keys):
+    return tuple(SORT_KEYS[key](task) for key in sort_keys)
+
+class SortedTaskIndex:
+    """
+    Keeps one user's task indexes ordered by a multi-key sort order.
+    Entries are (key1, key2, ..., task_index) tuples in a bisect-maintained
+    list, so a created or edited task is repositioned with two binary
+    searches instead of re-sorting everything. The trailing task_index keeps
+    ties in insertion order, like a stable sort.
+    """
+    def __init__(self, tasks, sort_keys=("priority",)):
+        self.tasks = tasks
+        self.set_order(sort_keys)
+
+    def set_order(self, sort_keys):
+        """
+        Switches to a new sort order (a full O(n log n) rebuild).
+        """
+        self.sort_keys = list(sort_keys)
+        with timed("sort", tasks=len(self.tasks)):
+            self.keys = [task_sort_key(t, self.sort_keys) + (i,) for i, t in enumerate(self.tasks)]
+            self.entries = sorted(self.keys)
+
+    def key_of(self, task_index):
+        return self.keys[task_index]
+
+    def update(self, task_index):
+        """
+        Re-sorts the task at task_index after it was appended or replaced.
+        """
+        new_key = task_sort_key(self.tasks[task_index], self.sort_keys) + (task_index,)
+        if task_index < len(self.keys):
+            old_key = self.keys[task_index]
+            del self.entries[bisect_left(self.entries, old_key)]
+            self.keys[task_index] = new_key
+        else:
+            self.keys.append(new_key)
+        insort(self.entries, new_key)
+
+    def __iter__(self):
+        return (key[-1] for key in self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, position):
+        """
+        Task index of the row at position in sorted order.
+        """
+        return self.entries[position][-1]
+
+    def index(self, task_index):
+        """
+        Sorted position of the task at task_index (a binary search).
+        """
+        if not 0 <= task_index < len(self.keys):
+            raise ValueError(f"{task_index} is not indexed")
+        return bisect_left(self.entries, self.keys[task_index])
+
+###############################################################################
+# Filter Engine
+###############################################################################
+class TaskFilter:
+    """
+    FilterWindow criteria parsed once into a predicate. Empty inputs are
+    ignored; an unparsable date, priority or progress raises ValueError.
+    Assignee tokens are comma-separated, case-insensitive substrings and
+    any one of them is enough.
+    """
+    def __init__(self, end_date="", status="", max_priority="", min_progress="", assignees=""):
+        self.end_before = datetime.strptime(end_date, "%Y-%m-%d").toordinal() if end_date else None
+        self.status = status or None
+        self.max_priority = int(max_priority) if max_priority else None
+        self.min_progress = int(min_progress) if min_progress else None
+        self.assignee_tokens = [token.strip() for token in assignees.lower().split(",") if token.strip()]
+
+    def criteria(self):
+        """
+        Keyword arguments for SqliteTaskList.query().
+        """
+        return {
+            "end_before": self.end_before,
+            "status": self.status,
+            "max_priority": self.max_priority,
+            "min_progress": self.min_progress,
+            "assignee_tokens": self.assignee_tokens
+        }
+
+    def matches(self, task):
+        if self.end_before is not None:
+            if task.end_ord is None or task.end_ord > self.end_before:
+                return False
+        if self.status is not None and task.status != self.status:
+            return False
+        if self.max_priority is not None and task.priority > self.max_priority:
+            return False
+        if self.min_progress is not None and task.progress < self.min_progress:
+            return False
+        if self.assignee_tokens:
+            assignees = [a.lower() for a in task.assignees]
+            if not any(token in a for a in assignees for token in self.assignee_tokens):
+                return False
+        return True
+
+def mask_from_ids(ids):
     """
-    Loads user data (accounts and tasks) from a local JSON file.
-    If the file doesn't exist or is empty, returns a default structure.
+    Builds an int bitmask with bit i set for every task index i in ids.
     """
-    if not os.path.exists(filename):
-        return {"users": []}
-    try:
-        with open(filename, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return data
-    except:
-        return {"users": []}
+    if not ids:
+        return 0
+    bits = bytearray((max(ids) >> 3) + 1)
+    for i in ids:
+        bits[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(bits, "little")
 
-def save_data(data, filename="users_and_tasks.json"):
+def ids_from_mask(mask):
     """
-    Saves user data (accounts and tasks) to a local JSON file.
+    Returns the task indexes whose bits are set in mask, ascending.
+    """
+    bits = bin(mask)[:1:-1]
+    ids = []
+    i = bits.find("1")
+    while i != -1:
+        ids.append(i)
+        i = bits.find("1", i + 1)
+    return ids
+
+class BitmapIndex:
+    """
+    Maps each distinct value of one task field to a bitmask of the task
+    indexes holding it. The distinct values are kept sorted, so a range
+    query ORs one mask per distinct value in range rather than touching
+    every task, and criteria on different fields intersect with a single
+    AND on machine words.
+    """
+    def __init__(self, values_by_task=(), multi_valued=False):
+        """
+        values_by_task holds each task's value (None = not indexed), or each
+        task's collection of values if multi_valued.
+        """
+        ids_by_value = {}
+        if multi_valued:
+            for i, values in enumerate(values_by_task):
+                for value in values:
+                    ids_by_value.setdefault(value, []).append(i)
+        else:
+            for i, value in enumerate(values_by_task):
+                if value is not None:
+                    ids_by_value.setdefault(value, []).append(i)
+        self.masks = {value: mask_from_ids(ids) for value, ids in ids_by_value.items()}
+        self.values = sorted(self.masks)
+
+    def add(self, value, task_index):
+        if value not in self.masks:
+            insort(self.values, value)
+            self.masks[value] = 0
+        self.masks[value] |= 1 << task_index
+
+    def remove(self, value, task_index):
+        mask = self.masks[value] & ~(1 << task_index)
+        if mask:
+            self.masks[value] = mask
+        else:
+            del self.masks[value]
+            del self.values[bisect_left(self.values, value)]
+
+    def equal(self, value):
+        return self.masks.get(value, 0)
+
+    def at_most(self, value):
+        return self.union(self.values[:bisect_right(self.values, value)])
+
+    def at_least(self, value):
+        return self.union(self.values[bisect_left(self.values, value):])
+
+    def union(self, values):
+        mask = 0
+        for value in values:
+            mask |= self.masks[value]
+        return mask
+
+class TaskColumns:
+    """
+    Columnar copy of one user's scalar task fields: priority, progress, end
+    date ordinal (0 = unparsable) and a status code, each in a typed array,
+    so TaskFilterIndex can read the values it indexed a task under without
+    touching a Python object. Kept in step with the task list through
+    update() like the indexes.
+    """
+    # Fits array("q"); absurd priorities are clamped into range
+    INT_MIN, INT_MAX = -2 ** 63, 2 ** 63 - 1
+
+    def __init__(self, tasks):
+        self.tasks = tasks
+        self.status_names = list(STATUS_OPTIONS)
+        self.status_codes = {status: code for code, status in enumerate(self.status_names)}
+        self.rebuild()
+
+    def clamp(self, value):
+        return max(self.INT_MIN, min(self.INT_MAX, value))
+
+    def status_code(self, status):
+        code = self.status_codes.get(status)
+        if code is None:
+            code = self.status_codes[status] = len(self.status_names)
+            self.status_names.append(status)
+        return code
+
+    def rebuild(self):
+        self.priority = array("q", (self.clamp(t.priority) for t in self.tasks))
+        self.progress = array("q", (self.clamp(t.progress) for t in self.tasks))
+        self.end_ord = array("i", (t.end_ord or 0 for t in self.tasks))
+        self.status = array("H", (self.status_code(t.status) for t in self.tasks))
+
+    def update(self, task_index):
+        task = self.tasks[task_index]
+        values = (self.clamp(task.priority), self.clamp(task.progress),
+                  task.end_ord or 0, self.status_code(task.status))
+        for column, value in zip((self.priority, self.progress, self.end_ord, self.status), values):
+            if task_index == len(column):
+                column.append(value)
+            else:
+                column[task_index] = value
+
+    def __len__(self):
+        return len(self.priority)
+
+class TaskFilterIndex:
+    """
+    Secondary indexes over one user's tasks: bitmap indexes on status,
+    end date (as an ordinal), priority, progress and lowercased assignee.
+    select() turns each criterion into a bitmask and ANDs them, so a filter
+    costs a few bitwise operations per distinct value instead of a parse and
+    compare per task. Assignee tokens are matched against the distinct
+    assignee names, not against every task. The values each task was
+    indexed under live in a TaskColumns, for undoing them on update.
     """
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4)
+    def __init__(self, tasks):
+        self.tasks = tasks
+        self.rebuild()
+
+    def rebuild(self):
+        self.columns = TaskColumns(self.tasks)
+        self.assignees = [{a.lower() for a in t.assignees} for t in self.tasks]
+        self.by_status = BitmapIndex(self.columns.status)
+        self.by_date = BitmapIndex(o or None for o in self.columns.end_ord)
+        self.by_priority = BitmapIndex(self.columns.priority)
+        self.by_progress = BitmapIndex(self.columns.progress)
+        self.by_assignee = BitmapIndex(self.assignees, multi_valued=True)
+        self.all_tasks = (1 << len(self.tasks)) - 1
+
+    def _add(self, task_index):
+        c = self.columns
+        c.update(task_index)
+        assignees = {a.lower() for a in self.tasks[task_index].assignees}
+        if task_index == len(self.assignees):
+            self.assignees.append(assignees)
+        else:
+            self.assignees[task_index] = assignees
+        self.by_status.add(c.status[task_index], task_index)
+        if c.end_ord[task_index]:
+            self.by_date.add(c.end_ord[task_index], task_index)
+        self.by_priority.add(c.priority[task_index], task_index)
+        self.by_progress.add(c.progress[task_index], task_index)
+        for assignee in assignees:
+            self.by_assignee.add(assignee, task_index)
+        self.all_tasks |= 1 << task_index
+
+    def _remove(self, task_index):
+        c = self.columns
+        self.by_status.remove(c.status[task_index], task_index)
+        if c.end_ord[task_index]:
+            self.by_date.remove(c.end_ord[task_index], task_index)
+        self.by_priority.remove(c.priority[task_index], task_index)
+        self.by_progress.remove(c.progress[task_index], task_index)
+        for assignee in self.assignees[task_index]:
+            self.by_assignee.remove(assignee, task_index)
+
+    def update(self, task_index):
+        """
+        Re-indexes the task at task_index after it was appended or replaced.
+        """
+        if task_index < len(self.columns):
+            self._remove(task_index)
+        self._add(task_index)
+
+    def select(self, task_filter):
+        """
+        Returns the indexes of the tasks matching task_filter, ascending.
+        """
+        f = task_filter
+        mask = self.all_tasks
+        if f.status is not None:
+            code = self.columns.status_codes.get(f.status)
+            mask &= 0 if code is None else self.by_status.equal(code)
+        if f.end_before is not None and mask:
+            mask &= self.by_date.at_most(f.end_before)
+        if f.max_priority is not None and mask:
+            mask &= self.by_priority.at_most(f.max_priority)
+        if f.min_progress is not None and mask:
+            mask &= self.by_progress.at_least(f.min_progress)
+        if f.assignee_tokens and mask:
+            names = [name for name in self.by_assignee.values
+                     if any(token in name for token in f.assignee_tokens)]
+            mask &= self.by_assignee.union(names)
+        return ids_from_mask(mask)
 
 ###############################################################################
-# Utility: Password & Email Validation
+# Saved Views
 ###############################################################################
-def is_valid_email(email):
+# A user's saved views are stored next to their tasks as
+# [{"name": ..., "criteria": {TaskFilter argument: text as entered}}].
+VIEW_CRITERIA = ("end_date", "status", "max_priority", "min_progress", "assignees")
+ALL_TASKS_VIEW = "All Tasks"
+MAX_VIEW_NAME = 40
+
+def validate_views(views):
     """
-    Basic check for a valid email format.
+    Checks a list of saved views and returns it with the criteria
+    normalized to strings. Raises ValueError with a message for the user.
     """
-    pattern = r"^[\w\.-]+@[\w\.-]+\.\w+$"
-    return re.match(pattern, email) is not None
+    if not isinstance(views, list):
+        raise ValueError("Saved views must be a list.")
+    names = set()
+    checked = []
+    for view in views:
+        if not isinstance(view, dict) or not isinstance(view.get("criteria"), dict):
+            raise ValueError("Each saved view needs a name and criteria.")
+        name = str(view.get("name", "")).strip()
+        if not name or len(name) > MAX_VIEW_NAME:
+            raise ValueError(f"View names must be 1 to {MAX_VIEW_NAME} characters.")
+        if name == ALL_TASKS_VIEW:
+            raise ValueError(f"'{ALL_TASKS_VIEW}' is reserved.")
+        if name in names:
+            raise ValueError(f"Duplicate view name '{name}'.")
+        names.add(name)
+        unknown = set(view["criteria"]) - set(VIEW_CRITERIA)
+        if unknown:
+            raise ValueError(f"Unknown view criteria: {', '.join(sorted(unknown))}.")
+        criteria = {key: str(value).strip() for key, value in view["criteria"].items() if str(value).strip()}
+        try:
+            TaskFilter(**criteria)
+        except ValueError:
+            raise ValueError(f"View '{name}' has an invalid date, priority or progress.") from None
+        checked.append({"name": name, "criteria": criteria})
+    return checked
 
-def is_valid_password(password):
+class SavedViewCache:
     """
-    Checks if the password meets complexity requirements:
-    - Minimum 8 characters
-    - Contains at least one letter
-    - Contains at least one digit
+    Materialized results of a user's saved views: for each view shown so
+    far, the set of matching task indexes and those indexes in display
+    order. Showing a cached view costs nothing more; update() checks each
+    cached view's predicate against just the changed task and, if it was
+    or now is a member, patches the view's rows in place. A new sort
+    order only drops the row orders, which are rebuilt from the members.
+    select(task_filter) returns (task_index, task) pairs for a view's first
+    materialization; sort_key(task_index, task) is the display order key.
     """
-    if len(password) < 8:
-        return False
-    if not re.search(r"[A-Za-z]", password):
-        return False
-    if not re.search(r"\d", password):
-        return False
-    return True
+    def __init__(self, tasks, select, sort_key):
+        self.tasks = tasks
+        self.select = select
+        self.sort_key = sort_key
+        self.filters = {}
+        self.criteria = {}
+        self.members = {}
+        self.rows = {}
+
+    def set_views(self, views):
+        """
+        Takes a new list of views; cached results of views whose criteria
+        are unchanged are kept.
+        """
+        criteria = {view["name"]: view["criteria"] for view in views}
+        for name in list(self.members):
+            if self.criteria.get(name) != criteria.get(name):
+                del self.members[name]
+                self.rows.pop(name, None)
+        self.criteria = criteria
+        self.filters = {name: TaskFilter(**c) for name, c in criteria.items()}
+
+    def rows_of(self, name):
+        """
+        Task indexes of the view's matches, in display order.
+        """
+        rows = self.rows.get(name)
+        if rows is not None:
+            return rows
+        if name in self.members:
+            if hasattr(self.tasks, "pairs"):
+                # One query for the whole view rather than one per member
+                pairs = self.tasks.pairs(self.members[name])
+            else:
+                pairs = [(i, self.tasks[i]) for i in self.members[name]]
+        else:
+            pairs = self.select(self.filters[name])
+            self.members[name] = {i for i, _ in pairs}
+        pairs.sort(key=lambda pair: self.sort_key(*pair))
+        rows = self.rows[name] = [i for i, _ in pairs]
+        return rows
+
+    def order_changed(self):
+        self.rows.clear()
+
+    def update(self, task_index):
+        """
+        Patches the cached views the task at task_index was or now is in,
+        after it was appended or replaced.
+        """
+        task = self.tasks[task_index]
+        key = lambda i: self.sort_key(i, task if i == task_index else self.tasks[i])
+        for name, members in self.members.items():
+            was = task_index in members
+            now = self.filters[name].matches(task)
+            if not was and not now:
+                continue
+            rows = self.rows.get(name)
+            if was:
+                members.discard(task_index)
+                if rows is not None:
+                    rows.remove(task_index)
+            if now:
+                members.add(task_index)
+                if rows is not None:
+                    insort(rows, task_index, key=key)
 
 ###############################################################################
-# Class: Task
+# Calendar Date Index
 ###############################################################################
-class Task:
+class DateBucketIndex:
     """
-    A simple data class for tasks. 
-    name        : str
-    end_date    : str (e.g., '2025-12-31')
-    status      : str (e.g., 'Not Started', 'In Progress', 'Completed')
-    priority    : int
-    progress    : int (0 to 100)
-    assignees   : list of names
+    One user's tasks bucketed by end date: ordinal day -> ascending task
+    indexes, plus the sorted list of days that have tasks. The tasks due in
+    a date range are found with two binary searches, so showing a month
+    costs the tasks in that month rather than a pass over all of them.
+    Recurring tasks are kept apart in recurring (a set of task indexes),
+    since they are due on many days. Tasks without a valid end date are
+    not indexed.
     """
-    def __init__(self, name, end_date, status, priority, progress, assignees):
-        self.name = name
-        self.end_date = end_date
-        self.status = status
-        self.priority = priority
-        self.progress = progress
-        self.assignees = assignees
+    def __init__(self, tasks):
+        self.tasks = tasks
+        self.rebuild()
 
-    def to_dict(self):
-        return {
-            "name": self.name,
-            "end_date": self.end_date,
-            "status": self.status,
-            "priority": self.priority,
-            "progress": self.progress,
-            "assignees": self.assignees
-        }
+    @staticmethod
+    def day_of_task(task):
+        return None if task.recurrence is not None else task.end_ord
+
+    def rebuild(self):
+        self.day_of = [self.day_of_task(task) for task in self.tasks]
+        self.recurring = {i for i, task in enumerate(self.tasks) if task.recurrence is not None}
+        self.buckets = {}
+        for task_index, day in enumerate(self.day_of):
+            if day is not None:
+                self.buckets.setdefault(day, []).append(task_index)
+        self.days = sorted(self.buckets)
+
+    def update(self, task_index):
+        """
+        Re-files the task at task_index after it was appended or replaced.
+        """
+        task = self.tasks[task_index]
+        day = self.day_of_task(task)
+        if task.recurrence is not None:
+            self.recurring.add(task_index)
+        else:
+            self.recurring.discard(task_index)
+        if task_index == len(self.day_of):
+            self.day_of.append(None)
+        elif self.day_of[task_index] == day:
+            return
+        self._remove(task_index)
+        self.day_of[task_index] = day
+        if day is not None:
+            bucket = self.buckets.get(day)
+            if bucket is None:
+                bucket = self.buckets[day] = []
+                insort(self.days, day)
+            insort(bucket, task_index)
+
+    def _remove(self, task_index):
+        day = self.day_of[task_index]
+        if day is None:
+            return
+        bucket = self.buckets[day]
+        del bucket[bisect_left(bucket, task_index)]
+        if not bucket:
+            del self.buckets[day]
+            del self.days[bisect_left(self.days, day)]
+
+    def between(self, start_ord, end_ord):
+        """
+        (day, task indexes) for every day from start_ord to end_ord
+        (inclusive) that has tasks, in date order.
+        """
+        lo = bisect_left(self.days, start_ord)
+        hi = bisect_right(self.days, end_ord)
+        return [(day, self.buckets[day]) for day in self.days[lo:hi]]
+
+def occurrences_between(pairs, start_ord, end_ord):
+    """
+    Expands (task_index, task) pairs into (task_index, task or Occurrence)
+    pairs for everything due from start_ord to end_ord (inclusive); tasks
+    with nothing due in that window are dropped.
+    """
+    for task_index, task in pairs:
+        for occurrence in task.occurrences(start_ord, end_ord):
+            yield task_index, occurrence
 
 ###############################################################################
-# Class: MainApp
+# Workload Aggregates
 ###############################################################################
-class MainApp(tk.Tk):
+def add_count(counter, key, delta):
     """
-    Main application class.
-    Handles switching between the Login/Signup frame and the TaskView frame.
+    Adds delta to counter[key], dropping keys that reach zero.
     """
-    def __init__(self):
-        super().__init__()
-        self.title("Task Management Calendar")
-        self.geometry("700x500")
-        self.resizable(False, False)
+    count = counter[key] + delta
+    if count:
+        counter[key] = count
+    else:
+        del counter[key]
 
-        # Load data from JSON
-        self.data = load_data()
+class TaskAggregates:
+    """
+    Workload summary of one user's tasks: counts by status and by assignee,
+    the progress total (for the average) and the number of overdue tasks.
+    It keeps the fields it last counted for each task, (status, progress,
+    open day, assignees), rather than the Task itself, so update()
+    subtracts the old entry and adds the new one instead of recounting, and
+    a SQLite store is counted from its workload() rows without building or
+    holding any Task. Open tasks are also counted per end date; advance()
+    moves "today" forward and adds the days that just went overdue, so
+    midnight costs one lookup per day. Recurring tasks are not
+    counted as overdue: their due date moves with every occurrence.
+    """
+    def __init__(self, tasks, today):
+        self.tasks = tasks
+        self.today = today
+        self.rebuild()
 
-        # Active user index in self.data["users"]
-        self.active_user_index = None
+    def rebuild(self):
+        self.counted = []
+        self.by_status = Counter()
+        self.by_assignee = Counter()
+        self.progress_sum = 0
+        self.open_by_day = Counter()
+        self.overdue = 0
+        if hasattr(self.tasks, "workload"):
+            self.counted = self.tasks.workload()
+        else:
+            self.counted = [self.entry(task) for task in self.tasks]
+        for entry in self.counted:
+            self._count(entry, 1)
+        # Assignees whose count changed in the last update()
+        self.touched = set(self.by_assignee)
 
-        self._show_login_frame()
+    @staticmethod
+    def entry(task):
+        """
+        The (status, progress, open day, assignees) a task is counted by;
+        the open day is None for completed and recurring tasks.
+        """
+        day = None if task.status == "Completed" or task.recurrence is not None else task.end_ord
+        return task.status, task.progress, day, task.assignees
 
-    def _show_login_frame(self):
+    def _count(self, entry, sign):
+        status, progress, day, assignees = entry
+        add_count(self.by_status, status, sign)
+        self.progress_sum += sign * progress
+        for assignee in assignees:
+            add_count(self.by_assignee, assignee, sign)
+        if day is not None:
+            add_count(self.open_by_day, day, sign)
+            if day < self.today:
+                self.overdue += sign
+
+    def update(self, task_index):
         """
-        Clears the window and shows the login/register frame.
+        Recounts the task at task_index after it was appended or replaced.
         """
-        for widget in self.winfo_children():
-            widget.destroy()
-        login_frame = LoginFrame(self, self.data)
-        login_frame.pack(expand=True, fill="both")
+        entry = self.entry(self.tasks[task_index])
+        self.touched = set(entry[3])
+        if task_index == len(self.counted):
+            self.counted.append(entry)
+        else:
+            old = self.counted[task_index]
+            self.touched.update(old[3])
+            self._count(old, -1)
+            self.counted[task_index] = entry
+        self._count(entry, 1)
 
-    def show_task_view(self, user_index):
+    def advance(self, today):
         """
-        Clears the window and shows the Task View frame for the specified user index.
+        Moves the overdue cutoff to today (either way, for clock changes).
         """
-        self.active_user_index = user_index
-        for widget in self.winfo_children():
-            widget.destroy()
-        task_view = TaskViewFrame(self, self.data, user_index)
-        task_view.pack(expand=True, fill="both")
+        if today > self.today:
+            self.overdue += sum(self.open_by_day.get(day, 0) for day in range(self.today, today))
+        else:
+            self.overdue -= sum(self.open_by_day.get(day, 0) for day in range(today, self.today))
+        self.today = today
+
+    def __len__(self):
+        return len(self.counted)
+
+    def average_progress(self):
+        return self.progress_sum / len(self.counted) if self.counted else 0.0
 
 ###############################################################################
-# Frame: LoginFrame
+# Task Dependencies
 ###############################################################################
-class LoginFrame(tk.Frame):
+# A task can depend on (wait for) other tasks of the same user, stored as
+# their indexes in Task.depends_on. Tasks have end dates but no durations, so
+# a task's earliest finish is the later of its own end date and the earliest
+# finish of everything it depends on, and a task due before that has a
+# schedule conflict. Its critical path is the chain of dependencies that sets
+# its earliest finish.
+MAX_DEPENDENCIES = 20
+
+def find_dependency_cycle(depends_on_of, task_index, depends_on):
     """
-    Frame for user login and signup.
+    The cycle task_index depending on depends_on would close, as the tasks
+    around it: [d, ..., task_index], where task_index depends on d, d on the
+    next, and so on back to task_index. None if there is none.
+    depends_on_of(i) gives the current dependencies of task i.
     """
-    def __init__(self, master, data):
-        super().__init__(master)
-        self.master = master
-        self.data = data
+    parent = {}
+    stack = []
+    for d in depends_on:
+        if d == task_index:
+            return [task_index]
+        if d not in parent:
+            parent[d] = None
+            stack.append(d)
+    while stack:
+        i = stack.pop()
+        for d in depends_on_of(i):
+            if d == task_index:
+                path = [i]
+                while parent[path[-1]] is not None:
+                    path.append(parent[path[-1]])
+                path.reverse()
+                return path + [task_index]
+            if d not in parent:
+                parent[d] = i
+                stack.append(d)
+    return None
 
-        self.label_title = tk.Label(self, text="Login", font=("Arial", 16, "bold"))
-        self.label_title.pack(pady=10)
+def check_dependencies(tasks, task_index, depends_on):
+    """
+    Raises ValueError unless every task in depends_on exists and depending
+    on them would not close a cycle.
+    """
+    count = len(tasks)
+    if any(d >= count for d in depends_on):
+        raise ValueError("That task no longer exists.")
+    depends_on_of = lambda i: tasks[i].depends_on if i != task_index else ()
+    if find_dependency_cycle(depends_on_of, task_index, depends_on) is not None:
+        raise ValueError("Dependencies can't form a cycle.")
 
-        tk.Label(self, text="Email:").pack()
-        self.entry_email = tk.Entry(self, width=30)
-        self.entry_email.pack()
+def dependency_indexes(tasks, names, task_index):
+    """
+    The indexes of the tasks named in names (comma-separated, as entered in
+    CreateOrEditTaskWindow) for the task at task_index to depend on. Raises
+    ValueError for a name that matches no task, or several.
+    """
+    wanted = {name.strip() for name in names.split(",") if name.strip()}
+    if not wanted:
+        return []
+    found = {}
+    for i, task in enumerate(tasks):
+        if task.name in wanted:
+            if i == task_index:
+                raise ValueError("A task can't depend on itself.")
+            if task.name in found:
+                raise ValueError(f"Several tasks are named '{task.name}'; rename one to depend on it.")
+            found[task.name] = i
+    for name in wanted:
+        if name not in found:
+            raise ValueError(f"No task named '{name}'.")
+    return sorted(found.values())
 
-        tk.Label(self, text="Password:").pack()
-        self.entry_password = tk.Entry(self, width=30, show="*")
-        self.entry_password.pack()
+class DependencyGraph:
+    """
+    The dependency DAG of one user's tasks, with each task's earliest
+    finish, the dependency that sets it (its driver, the next step of its
+    critical path) and its depth, the longest chain of dependencies under
+    it. Only tasks that depend on others or have dependents are nodes.
+    update() relinks the saved task and re-evaluates only the tasks
+    downstream of it whose inputs changed, in depth order (a task is always
+    deeper than what it depends on), so an edit costs the affected
+    subgraph rather than the whole project. Dependencies out of range, or
+    closing a cycle (only possible in imported data; the editor refuses
+    them), are ignored.
+    """
+    def __init__(self, tasks):
+        self.tasks = tasks
+        self.rebuild()
 
-        self.button_login = tk.Button(self, text="Login", command=self.login)
-        self.button_login.pack(pady=10)
+    def rebuild(self):
+        self.deps = {}
+        self.dependents = {}
+        # Per node: its own end ordinal, earliest finish, driver and depth
+        self.own = {}
+        self.finish = {}
+        self.driver = {}
+        self.depth = {}
+        self.conflicts = set()
+        # Tasks whose conflict state changed in the last update(), and how
+        # many tasks it re-evaluated
+        self.touched = set()
+        self.evaluated = 0
+        tasks = self.tasks
+        if hasattr(tasks, "dependencies"):
+            pairs = tasks.dependencies()
+        else:
+            pairs = [(i, task.depends_on) for i, task in enumerate(tasks) if task.depends_on]
+        count = len(tasks)
+        for i, depends_on in pairs:
+            self.link(i, tuple(d for d in depends_on if d < count and d != i))
+        # Kahn's algorithm. Nodes left over sit on or after a cycle; their
+        # links among themselves are dropped, which leaves them depending
+        # only on nodes already ordered
+        waiting = {i: len(depends_on) for i, depends_on in self.deps.items()}
+        ready = [i for i in self.own if i not in waiting]
+        order = []
+        while ready:
+            i = ready.pop()
+            order.append(i)
+            for j in self.dependents.get(i, ()):
+                waiting[j] -= 1
+                if not waiting[j]:
+                    del waiting[j]
+                    ready.append(j)
+        for i in waiting:
+            self.relink(i, tuple(d for d in self.deps[i] if d not in waiting))
+        order.extend(waiting)
+        for i in order:
+            if i in self.own:
+                self.evaluate(i)
+        self.touched = set(self.conflicts)
 
-        self.button_signup = tk.Button(self, text="Sign Up", command=self.signup_popup)
-        self.button_signup.pack()
+    def add_node(self, i):
+        if i not in self.own:
+            self.own[i] = self.tasks[i].end_ord
+            self.finish[i] = self.own[i]
+            self.driver[i] = None
+            self.depth[i] = 0
 
-    def login(self):
-        email = self.entry_email.get().strip()
-        password = self.entry_password.get().strip()
+    def remove_node_if_unlinked(self, i):
+        if i in self.own and i not in self.deps and i not in self.dependents:
+            for values in (self.own, self.finish, self.driver, self.depth):
+                del values[i]
+            if i in self.conflicts:
+                self.conflicts.discard(i)
+                self.touched.add(i)
 
-        # Validate input
-        if not email or not password:
-            messagebox.showerror("Error", "Please fill in both fields.")
-            return
+    def link(self, i, depends_on):
+        if depends_on:
+            self.add_node(i)
+            self.deps[i] = depends_on
+            for d in depends_on:
+                self.add_node(d)
+                self.dependents.setdefault(d, set()).add(i)
 
-        # Find user
-        for i, user in enumerate(self.data["users"]):
-            if user["email"].lower() == email.lower():
-                # Check password (plain text for simplicity; ideally store a hash)
-                if user["password"] == password:
-                    # Successful login
-                    messagebox.showinfo("Success", "Login successful!")
-                    self.master.show_task_view(i)
-                    return
-                else:
-                    messagebox.showerror("Error", "Incorrect password.")
-                    return
+    def relink(self, i, depends_on):
+        for d in self.deps.pop(i, ()):
+            dependents = self.dependents[d]
+            dependents.discard(i)
+            if not dependents:
+                del self.dependents[d]
+            self.remove_node_if_unlinked(d)
+        self.link(i, depends_on)
+        self.remove_node_if_unlinked(i)
 
-        messagebox.showerror("Error", "Email not found.")
+    def evaluate(self, i):
+        """
+        Recomputes node i from its dependencies; True if its earliest
+        finish or depth changed (so its dependents need it too).
+        """
+        self.evaluated += 1
+        own = self.own[i]
+        driver = None
+        depth = 0
+        for d in self.deps.get(i, ()):
+            depth = max(depth, self.depth[d] + 1)
+            if self.finish[d] is not None and (driver is None or self.finish[d] > self.finish[driver]):
+                driver = d
+        latest = self.finish[driver] if driver is not None else None
+        finish = latest if latest is not None and (own is None or latest > own) else own
+        conflict = own is not None and finish > own
+        if conflict != (i in self.conflicts):
+            if conflict:
+                self.conflicts.add(i)
+            else:
+                self.conflicts.discard(i)
+            self.touched.add(i)
+        changed = finish != self.finish[i] or depth != self.depth[i]
+        self.finish[i], self.driver[i], self.depth[i] = finish, driver, depth
+        return changed
 
-    def signup_popup(self):
+    def update(self, task_index):
         """
-        Popup window to handle signup.
+        Relinks and re-evaluates the task at task_index after it was
+        appended or replaced, then whatever downstream depended on it.
         """
-        popup = tk.Toplevel(self)
-        popup.title("Sign Up")
-        popup.geometry("300x250")
-        popup.resizable(False, False)
+        self.touched = set()
+        self.evaluated = 0
+        task = self.tasks[task_index]
+        if not task.depends_on and task_index not in self.own:
+            return
+        count = len(self.tasks)
+        depends_on = tuple(d for d in task.depends_on if d < count and d != task_index)
+        if depends_on != self.deps.get(task_index, ()):
+            depends_on_of = lambda i: self.deps.get(i, ())
+            depends_on = tuple(d for d in depends_on
+                               if find_dependency_cycle(depends_on_of, task_index, (d,)) is None)
+            self.relink(task_index, depends_on)
+        if task_index not in self.own:
+            return
+        self.own[task_index] = task.end_ord
+        heap = [(self.depth[task_index], task_index)]
+        queued = {task_index}
+        while heap:
+            _, i = heapq.heappop(heap)
+            queued.discard(i)
+            if self.evaluate(i):
+                for j in self.dependents.get(i, ()):
+                    if j not in queued:
+                        queued.add(j)
+                        heapq.heappush(heap, (self.depth[j], j))
 
-        tk.Label(popup, text="Email:").pack(pady=5)
-        entry_new_email = tk.Entry(popup, width=30)
-        entry_new_email.pack()
+    def cycle(self, task_index, depends_on):
+        """
+        The cycle task_index depending on depends_on would close (see
+        find_dependency_cycle), or None.
+        """
+        return find_dependency_cycle(lambda i: self.deps.get(i, ()), task_index, depends_on)
 
-        tk.Label(popup, text="Password:").pack(pady=5)
-        entry_new_password = tk.Entry(popup, width=30, show="*")
-        entry_new_password.pack()
+    def earliest_finish(self, task_index):
+        if task_index in self.finish:
+            return self.finish[task_index]
+        return self.tasks[task_index].end_ord
 
-        def handle_signup():
-            new_email = entry_new_email.get().strip()
-            new_pass = entry_new_password.get().strip()
+    def critical_path(self, task_index):
+        """
+        task_index and the chain of drivers under it, latest first.
+        """
+        path = [task_index]
+        while self.driver.get(path[-1]) is not None:
+            path.append(self.driver[path[-1]])
+        return path
 
-            # Validate
-            if not is_valid_email(new_email):
-                messagebox.showerror("Error", "Invalid email format.")
-                return
-            if not is_valid_password(new_pass):
-                messagebox.showerror(
-                    "Error",
-                    "Password must be at least 8 characters,\ninclude one letter and one number."
-                )
-                return
-            # Check if email already exists
-            for user in self.data["users"]:
-                if user["email"].lower() == new_email.lower():
-                    messagebox.showerror("Error", "Email is already taken.")
-                    return
+###############################################################################
+# Deadline Reminders
+###############################################################################
+# Each open task list has a ReminderScheduler: a min-heap of its tasks' next
+# reminder times (due soon: DUE_SOON_DAYS before the end date; overdue: the
+# day after it). It sleeps with after() until the earliest one, so nothing
+# is polled, and a created or edited task just pushes new entries; the
+# ones they supersede are dropped when they reach the top. A recurring task
+# has reminders for one occurrence at a time: the next one not completed.
+DUE_SOON_DAYS = 1
+# Longest single sleep, so a suspended machine or a clock change is
+# noticed within the hour
+REMINDER_MAX_SLEEP_MS = 60 * 60 * 1000
 
-            # Create new user
-            new_user = {
-                "email": new_email,
-                "password": new_pass,
-                "tasks": []
-            }
-            self.data["users"].append(new_user)
-            save_data(self.data)
-            messagebox.showinfo("Success", "Account created successfully!")
-            popup.destroy()
+@lru_cache(maxsize=4096)
+def start_of_day(ordinal):
+    """
+    POSIX time of local midnight at the start of the given day.
+    """
+    return datetime.combine(date.fromordinal(ordinal), datetime.min.time()).timestamp()
 
-        btn_create = tk.Button(popup, text="Create Account", command=handle_signup)
-        btn_create.pack(pady=10)
+def task_reminders(task, from_ord):
+    """
+    (time, kind) reminders for a task, earliest first; none for completed
+    tasks or ones without a valid end date. A recurring task gets those of
+    its first occurrence on or after from_ord that isn't completed.
+    """
+    if task.status == "Completed" or task.end_ord is None:
+        return []
+    due = task.end_ord
+    if task.recurrence is not None:
+        occurrences = task.occurrences(from_ord, date.max.toordinal())
+        due = next((o.end_ord for o in occurrences if o.status != "Completed"), None)
+        if due is None:
+            return []
+    return [(start_of_day(due - DUE_SOON_DAYS), "due_soon"),
+            (start_of_day(due + 1), "overdue")]
 
-###############################################################################
-# Frame: TaskViewFrame
-###############################################################################
-class TaskViewFrame(tk.Frame):
+class ReminderScheduler:
     """
-    Frame to view, create, edit, and filter tasks for the currently logged-in user.
+    Deadline reminders for one user's tasks. Heap entries are (time,
+    task_index, version, kind); editing a task bumps its version, which
+    makes its older entries stale. notify(due) is called from the Tk event
+    loop with a list of (kind, task_index) whenever reminders come due. At
+    start, reminders already past are delivered at once, only the latest
+    per task (for a recurring task, back to yesterday's occurrence); after
+    an edit, only future ones are scheduled. Once a recurring task's
+    occurrence is overdue, its next occurrence is scheduled.
     """
-    def __init__(self, master, data, user_index):
-        super().__init__(master)
-        self.master = master
-        self.data = data
-        self.user_index = user_index
+    def __init__(self, tasks, widget, notify, clock=time.time):
+        self.tasks = tasks
+        self.widget = widget
+        self.notify = notify
+        self.clock = clock
+        self.job = None
+        self.versions = [0] * len(tasks)
+        now = clock()
+        yesterday = date.fromtimestamp(now).toordinal() - 1
+        self.heap = []
+        # Only open, dated tasks have reminders; a SQLite store reads just those
+        pairs = tasks.open_tasks() if hasattr(tasks, "open_tasks") else enumerate(tasks)
+        for task_index, task in pairs:
+            reminders = task_reminders(task, yesterday)
+            past = [reminder for reminder in reminders if reminder[0] <= now]
+            for when, kind in past[-1:] + [r for r in reminders if r[0] > now]:
+                self.heap.append((when, task_index, 0, kind))
+        heapq.heapify(self.heap)
+        self.schedule()
 
-        # Title
-        tk.Label(self, text="Task Management Calendar", font=("Arial", 16, "bold")).pack(pady=5)
+    def is_current(self, entry):
+        _, task_index, version, _ = entry
+        return task_index < len(self.versions) and self.versions[task_index] == version
 
-        # Button: Add New Task
-        btn_new_task = tk.Button(self, text="Add New Task", command=self.open_create_task_window)
-        btn_new_task.pack()
+    def update(self, task_index):
+        """
+        Reschedules the task at task_index after it was appended or replaced.
+        """
+        if task_index == len(self.versions):
+            self.versions.append(0)
+        else:
+            self.versions[task_index] += 1
+        self.push_future(task_index, self.clock())
+        if len(self.heap) > 2 * len(self.versions) + 64:
+            # Mostly stale entries from edits: drop them in one pass
+            self.heap = [entry for entry in self.heap if self.is_current(entry)]
+            heapq.heapify(self.heap)
+        self.schedule()
 
-        # Button: Filter
-        btn_filter = tk.Button(self, text="Filter Tasks", command=self.open_filter_window)
-        btn_filter.pack()
+    def push_future(self, task_index, now):
+        """
+        Pushes the task's reminders that are still ahead of now.
+        """
+        version = self.versions[task_index]
+        for when, kind in task_reminders(self.tasks[task_index], date.fromtimestamp(now).toordinal()):
+            if when > now:
+                heapq.heappush(self.heap, (when, task_index, version, kind))
+
+    def schedule(self):
+        """
+        Sets the after() timer for the earliest current reminder.
+        """
+        self.stop()
+        while self.heap and not self.is_current(self.heap[0]):
+            heapq.heappop(self.heap)
+        if self.heap:
+            delay = int((self.heap[0][0] - self.clock()) * 1000) + 1
+            self.job = self.widget.after(max(0, min(delay, REMINDER_MAX_SLEEP_MS)), self.fire)
+
+    def fire(self):
+        self.job = None
+        now = self.clock()
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            entry = heapq.heappop(self.heap)
+            if self.is_current(entry):
+                due.append((entry[3], entry[1]))
+                if entry[3] == "overdue" and self.tasks[entry[1]].recurrence is not None:
+                    self.push_future(entry[1], now)
+        if due:
+            self.notify(due)
+        self.schedule()
+
+    def stop(self):
+        if self.job is not None:
+            self.widget.after_cancel(self.job)
+            self.job = None
 
-        # Treeview for tasks
-        columns = ("name", "end_date", "status", "priority", "progress", "assignees")
-        self.tree = ttk.Treeview(self, columns=columns, show="headings", height=15)
-        for col in columns:
-            self.tree.heading(col, text=col.capitalize())
-            self.tree.column(col, width=100 if col != "name" else 150)
+###############################################################################
+# Search Index
+###############################################################################
+SEARCH_TOKEN_RE = re.compile(r"\w+")
+# Rough cost of expanding one vocabulary token relative to checking one
+# candidate task's tokens (see TaskSearchIndex.search)
+SEARCH_CHECK_COST = 4
 
-        self.tree.bind("<Double-1>", self.handle_tree_double_click)
+def search_tokens(text):
+    """
+    The distinct lowercase words of text.
+    """
+    return frozenset(SEARCH_TOKEN_RE.findall(text.casefold()))
 
-        self.tree.pack(pady=10)
+@lru_cache(maxsize=4096)
+def assignee_search_tokens(assignees):
+    # Cached: the same few assignee lists repeat across many tasks
+    return search_tokens(" ".join(assignees))
 
-        # Populate the tree initially
-        self.refresh_task_list()
+def task_search_tokens(task):
+    return search_tokens(task.name), assignee_search_tokens(task.assignees)
 
-        # Button: Logout
-        btn_logout = tk.Button(self, text="Logout", command=self.logout)
-        btn_logout.pack()
+class TaskSearchIndex:
+    """
+    Inverted index over task names and assignees: token -> set of task
+    indexes, one map per field, plus the sorted vocabulary of all tokens so
+    the tokens starting with a prefix are a bisect range. Every query word
+    is matched as a prefix, so the box can search as the user types.
+    """
+    def __init__(self, tasks):
+        self.tasks = tasks
+        self.rebuild()
 
-    def logout(self):
-        self.master.active_user_index = None
-        self.master._show_login_frame()
+    def rebuild(self):
+        self.name_postings = name_postings = {}
+        self.assignee_postings = assignee_postings = {}
+        self.task_tokens = [task_search_tokens(task) for task in self.tasks]
+        for task_index, (name_tokens, assignee_tokens) in enumerate(self.task_tokens):
+            for token in name_tokens:
+                ids = name_postings.get(token)
+                if ids is None:
+                    name_postings[token] = {task_index}
+                else:
+                    ids.add(task_index)
+            for token in assignee_tokens:
+                ids = assignee_postings.get(token)
+                if ids is None:
+                    assignee_postings[token] = {task_index}
+                else:
+                    ids.add(task_index)
+        self.vocabulary = sorted(name_postings.keys() | assignee_postings.keys())
 
-    def refresh_task_list(self, filtered_tasks=None):
+    def _add(self, task_index, task):
         """
-        Refreshes the Treeview with either all tasks or a filtered list.
+        Indexes one task; returns the tokens that are new to the index.
         """
-        self.tree.delete(*self.tree.get_children())
+        self.task_tokens[task_index] = tokens = task_search_tokens(task)
+        new_tokens = []
+        for postings, field_tokens in zip((self.name_postings, self.assignee_postings), tokens):
+            for token in field_tokens:
+                ids = postings.get(token)
+                if ids is None:
+                    ids = postings[token] = set()
+                    new_tokens.append(token)
+                ids.add(task_index)
+        return new_tokens
 
-        if filtered_tasks is not None:
-            tasks_to_show = filtered_tasks
-        else:
-            tasks_to_show = self.data["users"][self.user_index]["tasks"]
-
-        # insertion sort by priority
-        tasks_to_show = insertion_sort_by_priority(tasks_to_show)
-        
-
-        for idx, t in enumerate(tasks_to_show):
-            assignees_str = ", ".join(t["assignees"]) if t["assignees"] else ""
-            self.tree.insert(
-                "",
-                "end",
-                iid=str(idx),
-                values=(
-                    t["name"],
-                    t["end_date"],
-                    t["status"],
-                    t["priority"],
-                    f"{t['progress']}%",
-                    assignees_str
-                )
-            )
+    def _remove(self, task_index):
+        for postings, field_tokens in zip((self.name_postings, self.assignee_postings),
+                                          self.task_tokens[task_index]):
+            for token in field_tokens:
+                ids = postings[token]
+                ids.discard(task_index)
+                if not ids:
+                    del postings[token]
+                    if token not in self.name_postings and token not in self.assignee_postings:
+                        del self.vocabulary[bisect_left(self.vocabulary, token)]
 
-    def open_create_task_window(self):
-        CreateOrEditTaskWindow(self, mode="create")
+    def update(self, task_index):
+        """
+        Re-indexes the task at task_index after it was appended or replaced.
+        """
+        if task_index == len(self.task_tokens):
+            self.task_tokens.append(None)
+        else:
+            self._remove(task_index)
+        for token in self._add(task_index, self.tasks[task_index]):
+            i = bisect_left(self.vocabulary, token)
+            if i == len(self.vocabulary) or self.vocabulary[i] != token:
+                self.vocabulary.insert(i, token)
 
-    def handle_tree_double_click(self, event):
+    def _expand(self, word, lo, hi):
         """
-        Double-click on a row to edit the task.
+        (name ids, assignee-only ids, exact name ids) for the vocabulary
+        tokens in [lo, hi), i.e. those starting with word.
         """
-        item_id = self.tree.focus()
-        if not item_id:
-            return
+        tokens = self.vocabulary[lo:hi]
+        name_ids = union_of([self.name_postings[t] for t in tokens if t in self.name_postings])
+        assignee_ids = union_of([self.assignee_postings[t] for t in tokens if t in self.assignee_postings])
+        return name_ids, assignee_ids - name_ids, self.name_postings.get(word, set())
+
+    def search(self, query):
+        """
+        Task indexes matching every word of query (as a prefix of a name or
+        assignee token), best first: tasks whose name contains every word
+        exactly, then whose name has every word as a prefix, then the rest
+        (matched through assignees). Ties keep task order.
+
+        Words are taken narrowest prefix first. Each is looked up in the
+        postings unless it covers many vocabulary tokens (say "1" among
+        thousands of numbers) while few candidates remain; then those
+        candidates' own tokens are checked instead.
+        """
+        spans = []
+        for word in search_tokens(query):
+            lo = bisect_left(self.vocabulary, word)
+            hi = bisect_left(self.vocabulary, word + "\U0010ffff", lo)
+            if lo == hi:
+                return []
+            spans.append((hi - lo, word, lo, hi))
+        if not spans:
+            return []
+        spans.sort()
 
-        CreateOrEditTaskWindow(self, mode="edit", task_index=int(item_id))
+        # Candidates are split into name matches (exact ones also in exact)
+        # and assignee-only matches
+        name = other = exact = None
+        for span, word, lo, hi in spans:
+            if name is None:
+                name, other, exact = self._expand(word, lo, hi)
+            elif span * SEARCH_CHECK_COST <= len(name) + len(other):
+                name_ids, assignee_ids, exact_ids = self._expand(word, lo, hi)
+                other = (name & assignee_ids) | (other & name_ids) | (other & assignee_ids)
+                name = name & name_ids
+                exact = exact & exact_ids
+            else:
+                name_kept, other_kept = set(), set()
+                for i in chain(name, other):
+                    name_tokens, assignee_tokens = self.task_tokens[i]
+                    if i in name and any(token.startswith(word) for token in name_tokens):
+                        name_kept.add(i)
+                    elif any(token.startswith(word) for token in chain(name_tokens, assignee_tokens)):
+                        other_kept.add(i)
+                name, other = name_kept, other_kept
+                exact = {i for i in exact if word in self.task_tokens[i][0]}
+            if not (name or other):
+                return []
+        return sorted(exact) + sorted(name - exact if exact else name) + sorted(other)
 
-    def open_filter_window(self):
-        FilterWindow(self)
+def union_of(sets):
+    """
+    Union of a list of sets; a single set is returned as is (not copied).
+    """
+    if len(sets) == 1:
+        return sets[0]
+    return set().union(*sets)
 
 ###############################################################################
-# Window: CreateOrEditTaskWindow
+# Headless Batch Operations
 ###############################################################################
-class CreateOrEditTaskWindow(tk.Toplevel):
+# Bulk import, export, update and delete without Tk, for scripts and the
+# command line (see the __main__ block). Rows are validated exactly like
+# CreateOrEditTaskWindow.save_task, and each batch is committed with one
+# save_changes() call instead of one save per task.
+TASK_FIELDS = ["name", "end_date", "status", "priority", "progress", "assignees"]
+IMPORT_BATCH_SIZE = 1000
+
+def find_user_index(data, email):
     """
-    Popup window to create or edit a task.
+    Index of the account with this email (case-insensitive); raises
+    ValueError if there is none.
     """
-    def __init__(self, parent_frame, mode="create", task_index=None):
-        super().__init__(parent_frame)
-        self.parent_frame = parent_frame
-        self.master_app = parent_frame.master
-        self.data = parent_frame.data
-        self.user_index = parent_frame.user_index
-        self.mode = mode
-        self.task_index = task_index
+    user_index = build_email_index(data["users"]).get(email.strip().casefold())
+    if user_index is None:
+        raise ValueError(f"No account registered with {email}.")
+    return user_index
 
-        self.title("Create Task" if mode == "create" else "Edit Task")
-        self.geometry("400x450")
-        self.resizable(False, False)
+def is_csv_filename(filename):
+    return filename.lower().endswith(".csv")
 
-        # If editing, load existing task data
-        self.existing_task = None
-        if self.mode == "edit" and self.task_index is not None:
-            self.existing_task = self.data["users"][self.user_index]["tasks"][self.task_index]
+def read_task_rows(filename):
+    """
+    Yields (line number, row) from a CSV file with a header row or a JSONL
+    file of task objects, one row at a time. CSV rows are dicts; JSONL rows
+    are the raw line, parsed by task_from_row so a bad line is reported like
+    any other invalid row. In CSV, assignees are comma-separated within
+    their column.
+    """
+    with open(filename, "r", encoding="utf-8", newline="") as f:
+        if is_csv_filename(filename):
+            reader = csv.DictReader(f, restval="")
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(f, 1):
+                if line.strip():
+                    yield line_number, line
 
-        # Task Name
-        tk.Label(self, text="Task Name").pack(pady=5)
-        self.entry_name = tk.Entry(self, width=30)
-        self.entry_name.pack()
-        if self.existing_task:
-            self.entry_name.insert(0, self.existing_task["name"])
+def task_from_row(row):
+    """
+    Validates an imported row (a dict, or a JSONL line) with
+    validate_task_fields; missing fields count as empty. A JSONL task may
+    carry a recurrence, overrides and dependencies too.
+    """
+    if isinstance(row, str):
+        try:
+            row = json.loads(row)
+        except ValueError:
+            raise ValueError("Not valid JSON.") from None
+        if not isinstance(row, dict):
+            raise ValueError("Expected a JSON object.")
+    fields = {field: row.get(field) for field in TASK_FIELDS}
+    return validate_task_fields(**{
+        field: "" if value is None else value for field, value in fields.items()
+    }, recurrence=row.get("recurrence"), overrides=row.get("overrides"), depends_on=row.get("depends_on"))
 
-        # End Date
-        tk.Label(self, text="End Date (YYYY-MM-DD)").pack(pady=5)
-        self.entry_end_date = tk.Entry(self, width=30)
-        self.entry_end_date.pack()
-        if self.existing_task:
-            self.entry_end_date.insert(0, self.existing_task["end_date"])
+class PendingTasks:
+    """
+    A user's tasks followed by tasks about to be appended to them, as far
+    as check_dependencies() looks at a task list (len() and indexing).
+    """
+    def __init__(self, tasks, pending):
+        self.tasks = tasks
+        # Tracked here because len() of a SqliteTaskList is a COUNT query
+        self.start = len(tasks)
+        self.pending = pending
 
-        # Status
-        tk.Label(self, text="Status").pack(pady=5)
-        self.status_var = tk.StringVar(value="Not Started")
-        status_options = ["Not Started", "In Progress", "Completed"]
-        self.dropdown_status = ttk.Combobox(self, textvariable=self.status_var, values=status_options, state="readonly")
-        self.dropdown_status.pack()
-        if self.existing_task:
-            self.status_var.set(self.existing_task["status"])
+    def __len__(self):
+        return self.start + len(self.pending)
 
-        # Priority
-        tk.Label(self, text="Priority (1 = Highest)").pack(pady=5)
-        self.entry_priority = tk.Entry(self, width=30)
-        self.entry_priority.pack()
-        if self.existing_task:
-            self.entry_priority.insert(0, str(self.existing_task["priority"]))
+    def __getitem__(self, task_index):
+        if task_index < self.start:
+            return self.tasks[task_index]
+        return self.pending[task_index - self.start]
 
-        # Progress
-        tk.Label(self, text="Progress (0 - 100%)").pack(pady=5)
-        self.entry_progress = tk.Entry(self, width=30)
-        self.entry_progress.pack()
-        if self.existing_task:
-            self.entry_progress.insert(0, str(self.existing_task["progress"]))
+def import_tasks(data, filename, user_index, rows, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Appends the valid rows of (line number, row) pairs to a user's tasks,
+    saving once per batch_size tasks. Invalid rows are skipped; returns
+    the number imported and a list of (line number, message) errors.
+    A task's dependencies are indexes into the task list as it will be
+    after the import, so they are checked against the tasks before it;
+    if one is out of range or closes a cycle the whole file is rejected
+    with ValueError before anything is saved.
+    """
+    tasks = data["users"][user_index]["tasks"]
+    accepted = PendingTasks(tasks, [])
+    errors = []
+    for line_number, row in rows:
+        try:
+            task = task_from_row(row)
+        except ValueError as e:
+            errors.append((line_number, str(e)))
+            continue
+        if task.depends_on:
+            task_index = len(accepted)
+            missing = [d for d in task.depends_on if d >= task_index]
+            try:
+                if missing:
+                    raise ValueError(f"It depends on task {missing[0]}, but only {task_index} tasks come before it.")
+                check_dependencies(accepted, task_index, task.depends_on)
+            except ValueError as e:
+                raise ValueError(f"Line {line_number}: {e} Nothing was imported.") from None
+        accepted.pending.append(task)
 
-        # Assignees
-        tk.Label(self, text="Assignees (comma-separated, up to 5)").pack(pady=5)
-        self.entry_assignees = tk.Entry(self, width=30)
-        self.entry_assignees.pack()
-        if self.existing_task:
-            if self.existing_task["assignees"]:
-                self.entry_assignees.insert(0, ", ".join(self.existing_task["assignees"]))
+    start = accepted.start
+    for offset in range(0, len(accepted.pending), batch_size):
+        batch = accepted.pending[offset:offset + batch_size]
+        tasks.extend(batch)
+        save_changes(data, filename, [
+            put_task_change(user_index, task_index, task)
+            for task_index, task in enumerate(batch, start + offset)
+        ])
+    return len(accepted.pending), errors
 
-        # Button: Save
-        btn_save = tk.Button(self, text="Save Task", command=self.save_task)
-        btn_save.pack(pady=10)
+def matching_tasks(tasks, task_filter=None):
+    """
+    (task_index, task) pairs for the tasks task_filter accepts, in task
+    order; all tasks if task_filter is None.
+    """
+    if task_filter is None:
+        return list(enumerate(tasks))
+    if hasattr(tasks, "query"):
+        return tasks.query(**task_filter.criteria())
+    return [(i, task) for i, task in enumerate(tasks) if task_filter.matches(task)]
 
-    def save_task(self):
-        """
-        Validate fields, then save or update the task in the JSON structure.
-        """
-        name = self.entry_name.get().strip()
-        end_date = self.entry_end_date.get().strip()
-        status = self.status_var.get().strip()
-        priority_str = self.entry_priority.get().strip()
-        progress_str = self.entry_progress.get().strip()
-        assignees_raw = self.entry_assignees.get().strip()
+def export_tasks(tasks, out, csv_format=False, task_filter=None):
+    """
+    Writes the tasks task_filter accepts to the open text file out as JSONL,
+    or as CSV with a header row. Returns the number written.
+    """
+    if csv_format:
+        writer = csv.writer(out)
+        writer.writerow(TASK_FIELDS)
+    count = 0
+    for _, task in matching_tasks(tasks, task_filter):
+        if csv_format:
+            writer.writerow([task.name, task.end_date, task.status, task.priority,
+                             task.progress, ", ".join(task.assignees)])
+        else:
+            out.write(journal_line(task))
+        count += 1
+    return count
 
-        # Validate required fields
-        if not name:
-            messagebox.showerror("Error", "Task name is required.")
-            return
-        if not end_date:
-            messagebox.showerror("Error", "End date is required.")
-            return
-        # Validate date format
-        try:
-            datetime.strptime(end_date, "%Y-%m-%d")
-            # optional: also check if it's in the past, etc.
-        except ValueError:
-            messagebox.showerror("Error", "End date must be in YYYY-MM-DD format.")
-            return
-        # Validate priority
-        try:
-            priority = int(priority_str)
-        except ValueError:
-            messagebox.showerror("Error", "Priority must be an integer.")
-            return
-        # Validate progress
-        try:
-            progress = int(progress_str)
-            if progress < 0 or progress > 100:
-                raise ValueError()
-        except ValueError:
-            messagebox.showerror("Error", "Progress must be an integer from 0 to 100.")
-            return
+def update_tasks(data, filename, user_index, task_filter, updates):
+    """
+    Sets the fields in updates on every task task_filter accepts and saves
+    once. Every updated task is validated before any is changed, so a
+    ValueError leaves the data untouched. Returns the number updated.
+    """
+    unknown = set(updates) - set(TASK_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown task field: {', '.join(sorted(unknown))}.")
+    tasks = data["users"][user_index]["tasks"]
+    updated = [
+        (task_index, task_from_row(dict(task.to_dict(), **updates)))
+        for task_index, task in matching_tasks(tasks, task_filter)
+    ]
+    if not updated:
+        return 0
+    email = data["users"][user_index]["email"]
+    changes, history = [], []
+    for task_index, task in updated:
+        entry = put_history_entry(email, task_index, tasks[task_index], task)
+        if entry is not None:
+            history.append(history_line(entry))
+        tasks[task_index] = task
+        changes.append(put_task_change(user_index, task_index, task))
+    save_changes(data, filename, changes)
+    if history:
+        append_history(history, filename + HISTORY_SUFFIX)
+    return len(updated)
 
-        # Validate assignees
-        assignees = []
-        if assignees_raw:
-            splitted = [a.strip() for a in assignees_raw.split(",") if a.strip()]
-            if len(splitted) > 5:
-                messagebox.showerror("Error", "You can add up to 5 assignees.")
-                return
-            # Optionally filter out special characters or duplicates
-            # Example: ensure no duplicates
-            unique_names = set()
-            for s in splitted:
-                if s in unique_names:
-                    messagebox.showerror("Error", f"Duplicate assignee '{s}'.")
-                    return
-                unique_names.add(s)
-            assignees = list(unique_names)
-
-        new_task_data = {
-            "name": name,
-            "end_date": end_date,
-            "status": status,
-            "priority": priority,
-            "progress": progress,
-            "assignees": assignees
-        }
+def delete_tasks_where(data, filename, user_index, task_filter):
+    """
+    Deletes every task task_filter accepts with one save. Returns the
+    number deleted.
+    """
+    tasks = data["users"][user_index]["tasks"]
+    matched = sorted(matching_tasks(tasks, task_filter), key=lambda pair: pair[0])
+    if not matched:
+        return 0
+    task_indexes = [task_index for task_index, _ in matched]
+    entry = delete_history_entry(data["users"][user_index]["email"], task_indexes, [task for _, task in matched])
+    change = delete_tasks_change(user_index, task_indexes, len(tasks))
+    delete_tasks(tasks, task_indexes)
+    save_changes(data, filename, [change])
+    append_history([history_line(entry)], filename + HISTORY_SUFFIX)
+    return len(task_indexes)
 
-        if self.mode == "create":
-            # Append
-            self.data["users"][self.user_index]["tasks"].append(new_task_data)
-        else:
-            # Edit
-            self.data["users"][self.user_index]["tasks"][self.task_index] = new_task_data
+def parse_assignments(pairs):
+    """
+    Turns FIELD=VALUE command-line arguments into a dict.
+    """
+    assignments = {}
+    for pair in pairs:
+        field, sep, value = pair.partition("=")
+        if not sep:
+            raise ValueError(f"Expected FIELD=VALUE, got {pair!r}.")
+        assignments[field.strip()] = value
+    return assignments
 
-        save_data(self.data)
-        messagebox.showinfo("Success", "Task saved successfully.")
-        self.parent_frame.refresh_task_list()
-        self.destroy()
+def run_headless(args):
+    """
+    Runs the batch operation selected on the command line. Returns the
+    process exit status.
+    """
+    try:
+        data = load_data(args.data)
+        user_index = find_user_index(data, args.user)
+        task_filter = TaskFilter(**parse_assignments(args.where)) if args.where else None
+    except (TypeError, ValueError, DataFileError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    if (args.set or args.delete) and task_filter is None and not args.all:
+        # A forgotten --where must not rewrite or wipe the whole account
+        print("Error: --set and --delete need --where, or --all for every task", file=sys.stderr)
+        return 2
+    tasks = data["users"][user_index]["tasks"]
+    status = 0
+    try:
+        if args.import_file:
+            count, errors = import_tasks(data, args.data, user_index,
+                                         read_task_rows(args.import_file), args.batch_size)
+            for line_number, message in errors:
+                print(f"{args.import_file}:{line_number}: {message}", file=sys.stderr)
+            print(f"Imported {count} tasks, skipped {len(errors)}")
+            status = 1 if errors else 0
+        elif args.export_file:
+            with open(args.export_file, "w", encoding="utf-8", newline="") as out:
+                count = export_tasks(tasks, out, is_csv_filename(args.export_file), task_filter)
+            print(f"Exported {count} tasks to {args.export_file}")
+        elif args.set:
+            count = update_tasks(data, args.data, user_index, task_filter, parse_assignments(args.set))
+            print(f"Updated {count} tasks")
+        elif args.delete:
+            count = delete_tasks_where(data, args.data, user_index, task_filter)
+            print(f"Deleted {count} tasks")
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    return status
 
 ###############################################################################
-# Window: FilterWindow
+# Local Task Server
 ###############################################################################
-class FilterWindow(tk.Toplevel):
+# Optional: `--serve` runs a TaskServer that owns the data file, and
+# `--connect` starts the GUI as a thin client of it. Messages are JSON
+# objects, one per line, over a localhost TCP connection. Requests carry an
+# "id" echoed in the reply ({"id", "ok": true, ...} or {"id", "ok": false,
+# "error"}). Every edit is broadcast to the sessions logged in as the same
+# user as {"event": "change", "session", "change"}, where change is the
+# journal record (see put_task_change), so clients apply deltas with
+# apply_task_change.
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+# Longest message line; a "tasks" reply holds a user's whole task list
+SERVER_LINE_LIMIT = 64 * 1024 * 1024
+
+class ServerError(Exception):
     """
-    Popup window to filter tasks by end date, status, priority, progress, or assignees.
+    A request the server rejected; the message is meant for the user.
     """
-    def __init__(self, parent_frame):
-        super().__init__(parent_frame)
-        self.parent_frame = parent_frame
-        self.master_app = parent_frame.master
-        self.data = parent_frame.data
-        self.user_index = parent_frame.user_index
 
-        self.title("Filter Tasks")
-        self.geometry("400x300")
-        self.resizable(False, False)
+def encode_message(message):
+    return (json.dumps(message, separators=(",", ":"), default=encode_task) + "\n").encode("utf-8")
 
-        # Create fields for each filter type
-        tk.Label(self, text="End Date Before (YYYY-MM-DD):").pack(pady=5)
-        self.entry_end_date = tk.Entry(self, width=25)
-        self.entry_end_date.pack()
+def parse_address(address, default_host=SERVER_HOST):
+    """
+    "[HOST:]PORT" -> (host, port).
+    """
+    host, _, port = address.rpartition(":")
+    return host or default_host, int(port)
 
-        tk.Label(self, text="Status (exact match):").pack(pady=5)
-        self.status_var = tk.StringVar()
-        status_options = ["", "Not Started", "In Progress", "Completed"]
-        self.dropdown_status = ttk.Combobox(self, textvariable=self.status_var, values=status_options)
-        self.dropdown_status.pack()
+class TaskSession:
+    """
+    One client connection: the user it is logged in as (None before login)
+    and a login counter that tags its change events, so a client can drop
+    events meant for an earlier login.
+    """
+    __slots__ = ("writer", "handler", "user_index", "login_id")
 
-        tk.Label(self, text="Max Priority (integer):").pack(pady=5)
-        self.entry_priority = tk.Entry(self, width=25)
-        self.entry_priority.pack()
+    def __init__(self, writer):
+        self.writer = writer
+        self.handler = asyncio.current_task()
+        self.user_index = None
+        self.login_id = 0
 
-        tk.Label(self, text="Progress >= (0-100):").pack(pady=5)
-        self.entry_progress = tk.Entry(self, width=25)
-        self.entry_progress.pack()
+class TaskServer:
+    """
+    Serves one data file (any storage engine) to many clients over asyncio.
+    Requests run on the event loop one at a time, so edits apply in a
+    single order; only password hashing leaves it, for kdf_pool(). Saves go
+    through a PersistenceWorker exactly as in the GUI.
+    """
+    def __init__(self, data_file):
+        self.data_file = data_file
+        self.data = load_data(data_file, lazy=LAZY_LOAD)
+        self.email_index = build_email_index(self.data["users"])
+        self.persistence = PersistenceWorker(self.data, data_file)
+        self.sessions = set()
+        self.loop = None
+        self.stopping = None
+        self.port = None
+        self.handlers = {
+            "login": self.op_login,
+            "logout": self.op_logout,
+            "signup": self.op_signup,
+            "tasks": self.op_tasks,
+            "create_task": self.op_create_task,
+            "put_task": self.op_put_task,
+            "delete_tasks": self.op_delete_tasks,
+            "filter": self.op_filter,
+            "set_views": self.op_set_views,
+        }
 
-        tk.Label(self, text="Assignee Contains:").pack(pady=5)
-        self.entry_assignee = tk.Entry(self, width=25)
-        self.entry_assignee.pack()
+    async def serve(self, host=SERVER_HOST, port=SERVER_PORT, ready=None):
+        """
+        Serves until stop() is called; ready() is called once the socket
+        is listening (self.port holds the port, useful with port 0).
+        """
+        self.loop = asyncio.get_running_loop()
+        self.stopping = asyncio.Event()
+        server = await asyncio.start_server(self.handle_client, host, port, limit=SERVER_LINE_LIMIT)
+        self.port = server.sockets[0].getsockname()[1]
+        if ready is not None:
+            ready()
+        try:
+            await self.stopping.wait()
+        finally:
+            server.close()
+            sessions = list(self.sessions)
+            for session in sessions:
+                session.writer.close()
+            await asyncio.gather(*[session.handler for session in sessions], return_exceptions=True)
+            await server.wait_closed()
+            self.persistence.stop()
 
-        tk.Button(self, text="Apply Filter", command=self.apply_filter).pack(pady=5)
-        tk.Button(self, text="Clear Filter", command=self.clear_filter).pack(pady=5)
+    def stop(self):
+        """
+        Ends serve(); safe to call from any thread.
+        """
+        self.loop.call_soon_threadsafe(self.stopping.set)
 
-    def apply_filter(self):
-        tasks = self.data["users"][self.user_index]["tasks"]
+    async def handle_client(self, reader, writer):
+        session = TaskSession(writer)
+        self.sessions.add(session)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                writer.write(encode_message(await self.dispatch(session, line)))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            self.sessions.discard(session)
+            writer.close()
 
-        end_date_filter = self.entry_end_date.get().strip()
-        status_filter = self.status_var.get().strip()
-        priority_filter = self.entry_priority.get().strip()
-        progress_filter = self.entry_progress.get().strip()
-        # Grab assignee input and split on commas
-        assignee_input = self.entry_assignee.get().strip().lower()
-        assignee_tokens = [token.strip() for token in assignee_input.split(",") if token.strip()]
-
-        filtered = []
-        for t in tasks:
-            # End Date
-            if end_date_filter:
-                try:
-                    cutoff = datetime.strptime(end_date_filter, "%Y-%m-%d")
-                    task_date = datetime.strptime(t["end_date"], "%Y-%m-%d")
-                    if task_date > cutoff:
-                        continue
-                except ValueError:
-                    # Invalid date input -> skip
-                    continue
+    async def dispatch(self, session, line):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            handler = self.handlers.get(request.get("op"))
+            if handler is None:
+                raise ServerError(f"Unknown operation {request.get('op')!r}.")
+            reply = await handler(session, request)
+        except (ServerError, ValueError, TypeError, KeyError, AttributeError) as e:
+            return {"id": request_id, "ok": False, "error": str(e)}
+        return dict(reply, id=request_id, ok=True)
 
-            # Status
-            if status_filter and t["status"] != status_filter:
-                continue
+    def save(self, change):
+        self.persistence.submit(change)
+        while not self.persistence.errors.empty():
+            print(f"Save failed: {self.persistence.errors.get_nowait()}", file=sys.stderr)
 
-            # Priority
-            if priority_filter:
-                try:
-                    max_priority = int(priority_filter)
-                    if t["priority"] > max_priority:
-                        continue
-                except ValueError:
-                    # Invalid priority -> skip
-                    continue
+    def broadcast(self, user_index, change):
+        for session in self.sessions:
+            if session.user_index == user_index:
+                session.writer.write(encode_message(
+                    {"event": "change", "session": session.login_id, "change": change}
+                ))
 
-            # Progress
-            if progress_filter:
-                try:
-                    min_prog = int(progress_filter)
-                    if t["progress"] < min_prog:
-                        continue
-                except ValueError:
-                    continue
+    def user_tasks(self, session):
+        if session.user_index is None:
+            raise ServerError("Please log in first.")
+        return self.data["users"][session.user_index]["tasks"]
 
-            # Assignee filter: check if *any* token is found among the assignees
-            if assignee_tokens:
-                # Convert each assignee to lowercase for substring checks
-                lower_assignees = [a.lower() for a in t["assignees"]]
-                # If *none* of the tokens appear in any assignee, skip
-                # OR logic -> if at least one token matches, we keep it
-                if not any(
-                    any(tok in assignee for assignee in lower_assignees)
-                    for tok in assignee_tokens
-                ):
-                    continue
+    def find_user(self, email):
+        users = self.data["users"]
+        i = self.email_index.get(email.casefold())
+        if i is None and isinstance(users, ShardedUserList) and users.refresh_directory():
+            self.email_index = build_email_index(users)
+            i = self.email_index.get(email.casefold())
+        return i
 
-            filtered.append(t)
+    async def op_login(self, session, request):
+        users = self.data["users"]
+        i = self.find_user(str(request["email"]).strip())
+        if i is None:
+            raise ServerError("Email not found.")
+        record = users[i]["password"]
+        matches, upgraded = await self.loop.run_in_executor(
+            kdf_pool(), check_password, str(request["password"]), record
+        )
+        if not matches:
+            raise ServerError("Incorrect password.")
+        if upgraded is not None and users[i]["password"] == record:
+            with self.persistence.lock:
+                self.save(set_user_password(users, i, upgraded))
+        session.user_index = i
+        session.login_id += 1
+        return {"email": users[i]["email"], "session": session.login_id, "tasks": list(users[i]["tasks"]),
+                "views": users[i].get("views", [])}
 
-        if not filtered:
-            messagebox.showinfo("No Results", "No tasks match the selected criteria.")
-        self.parent_frame.refresh_task_list(filtered)
-        self.destroy()
+    async def op_logout(self, session, request):
+        session.user_index = None
+        return {}
 
+    async def op_signup(self, session, request):
+        email = str(request["email"]).strip()
+        password = str(request["password"]).strip()
+        if not is_valid_email(email):
+            raise ServerError("Invalid email format.")
+        if not is_valid_password(password):
+            raise ServerError("Password must be at least 8 characters,\ninclude one letter and one number.")
+        if self.find_user(email) is not None:
+            raise ServerError("Email is already taken.")
+        record = await self.loop.run_in_executor(kdf_pool(), hash_password, password)
+        # Taken while the password was being hashed?
+        if email.casefold() in self.email_index:
+            raise ServerError("Email is already taken.")
+        users = self.data["users"]
+        new_user = {"email": email, "password": record, "tasks": []}
+        with self.persistence.lock:
+            users.append(new_user)
+            user_index = len(users) - 1
+            self.save(add_user_change(user_index, new_user))
+        self.email_index[email.casefold()] = user_index
+        return {}
 
-###############################################################################
-# Insertion Sort for tasks by priority
-###############################################################################
-def insertion_sort_by_priority(tasks):
+    async def op_tasks(self, session, request):
+        return {"session": session.login_id, "tasks": list(self.user_tasks(session))}
+
+    async def op_create_task(self, session, request):
+        tasks = self.user_tasks(session)
+        task = task_from_row(request["task"])
+        check_dependencies(tasks, len(tasks), task.depends_on)
+        with self.persistence.lock:
+            task_index = len(tasks)
+            tasks.append(task)
+            return self.task_changed(session, put_task_change(session.user_index, task_index, task))
+
+    async def op_put_task(self, session, request):
+        tasks = self.user_tasks(session)
+        task_index = int(request["task_index"])
+        if not 0 <= task_index < len(tasks):
+            raise ServerError("That task no longer exists.")
+        task = task_from_row(request["task"])
+        check_dependencies(tasks, task_index, task.depends_on)
+        with self.persistence.lock:
+            tasks[task_index] = task
+            return self.task_changed(session, put_task_change(session.user_index, task_index, task))
+
+    async def op_delete_tasks(self, session, request):
+        tasks = self.user_tasks(session)
+        task_indexes = sorted({int(i) for i in request["task_indexes"]})
+        if task_indexes and not (0 <= task_indexes[0] and task_indexes[-1] < len(tasks)):
+            raise ServerError("That task no longer exists.")
+        change = delete_tasks_change(session.user_index, task_indexes, len(tasks))
+        with self.persistence.lock:
+            delete_tasks(tasks, task_indexes)
+            return self.task_changed(session, change)
+
+    def task_changed(self, session, change):
+        """
+        Saves and broadcasts an edit; called while the edit still holds
+        the persistence lock.
+        """
+        self.save(change)
+        self.broadcast(session.user_index, change)
+        return {"change": change}
+
+    async def op_set_views(self, session, request):
+        self.user_tasks(session)
+        views = validate_views(request["views"])
+        with self.persistence.lock:
+            self.save(set_user_views(self.data["users"], session.user_index, views))
+        return {}
+
+    async def op_filter(self, session, request):
+        task_filter = TaskFilter(**request.get("criteria", {}))
+        return {"task_indexes": [i for i, _ in matching_tasks(self.user_tasks(session), task_filter)]}
+
+def run_server(data_file, host=SERVER_HOST, port=SERVER_PORT):
+    server = TaskServer(data_file)
+    ready = lambda: print(f"Serving {data_file} on {host}:{server.port}", flush=True)
+    try:
+        asyncio.run(server.serve(host, port, ready))
+    except KeyboardInterrupt:
+        # serve() has already flushed pending saves
+        pass
+
+class RemoteTaskList(list):
     """
-    An example of Insertion Sort that sorts tasks by ascending priority (smallest = highest).
-    Returns a new sorted list.
+    A thin client's copy of the logged-in user's tasks. created holds the
+    indexes appended locally but not yet sent, which TaskClient.submit()
+    sends as creations rather than edits.
     """
-    arr = tasks[:]
-    for i in range(1, len(arr)):
-        key_task = arr[i]
-        j = i - 1
-        while j >= 0 and arr[j]["priority"] > key_task["priority"]:
-            arr[j+1] = arr[j]
-            j -= 1
-        arr[j+1] = key_task
-    return arr
+    def __init__(self, tasks=()):
+        super().__init__(tasks)
+        self.created = set()
+
+    def append(self, task):
+        self.created.add(len(self))
+        super().append(task)
+
+class TaskClient:
+    """
+    One persistent connection to a TaskServer, reused for every request.
+    request() returns a concurrent.futures.Future completed by a reader
+    thread, which also queues change events in changes for the UI thread.
+    In client mode MainApp uses it in place of a PersistenceWorker: the GUI
+    edits its local copy (tasks) as usual and submit() sends each edit on.
+    Change events echo our own edits too, in server order, so applying them
+    all makes the copy converge with the server's.
+    """
+    synchronous = True
+
+    def __init__(self, host=SERVER_HOST, port=SERVER_PORT):
+        self.sock = socket.create_connection((host, port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.lock = threading.RLock()
+        self.send_lock = threading.Lock()
+        self.next_id = 0
+        self.pending = {}
+        self.changes = queue.Queue()
+        self.errors = queue.Queue()
+        self.tasks = None
+        self.session = None
+        self.closing = False
+        # The error that ended the connection; later requests fail with it
+        self.lost = None
+        self.reader = threading.Thread(target=self.read_loop, name="task-client", daemon=True)
+        self.reader.start()
+
+    def request(self, op, **params):
+        future = futures.Future()
+        with self.send_lock:
+            if self.lost is not None:
+                future.set_exception(self.lost)
+                return future
+            self.next_id += 1
+            self.pending[self.next_id] = future
+            try:
+                self.sock.sendall(encode_message(dict(params, op=op, id=self.next_id)))
+            except OSError as e:
+                self.pending.pop(self.next_id, None)
+                future.set_exception(e)
+        return future
+
+    def read_loop(self):
+        error = ConnectionError("The task server closed the connection.")
+        try:
+            with self.sock.makefile("rb") as f:
+                for line in f:
+                    message = json.loads(line)
+                    if message.get("event") == "change":
+                        self.changes.put(message)
+                        continue
+                    future = self.pending.pop(message.get("id"), None)
+                    if future is None:
+                        continue
+                    if message["ok"]:
+                        future.set_result(message)
+                    else:
+                        future.set_exception(ServerError(message["error"]))
+        except (OSError, ValueError) as e:
+            error = e
+        with self.send_lock:
+            self.lost = error
+            pending, self.pending = self.pending, {}
+        for future in pending.values():
+            future.set_exception(error)
+        if not self.closing:
+            self.errors.put(error)
+
+    def logged_in(self, reply):
+        """
+        Takes the task list from a "login" or "tasks" reply as the local
+        copy; events from before it are ignored.
+        """
+        self.session = reply["session"]
+        self.tasks = RemoteTaskList(Task.from_dict(t) for t in reply["tasks"])
+        return self.tasks
+
+    def submit(self, change=None, history=()):
+        """
+        Sends an edit of the local copy (tasks or saved views) to the
+        server; a rejected one is queued in errors. Account changes are the
+        server's own business, and the server saves its data itself, so
+        other records are ignored, as is history (kept in memory only).
+        """
+        if change is None:
+            return
+        if change["op"] == "put_task":
+            task_index = change["task_index"]
+            if task_index in self.tasks.created:
+                self.tasks.created.discard(task_index)
+                future = self.request("create_task", task=change["task"])
+            else:
+                future = self.request("put_task", task_index=task_index, task=change["task"])
+        elif change["op"] == "delete_tasks":
+            future = self.request("delete_tasks", task_indexes=change["task_indexes"])
+        elif change["op"] == "set_views":
+            future = self.request("set_views", views=change["views"])
+        else:
+            return
+        future.add_done_callback(self.report)
+
+    def report(self, future):
+        if future.exception() is not None:
+            self.errors.put(future.exception())
+
+    def pending_changes(self):
+        """
+        Drains the change events for the current login.
+        """
+        changes = []
+        while True:
+            try:
+                message = self.changes.get_nowait()
+            except queue.Empty:
+                return changes
+            if self.tasks is not None and message["session"] == self.session:
+                changes.append(message["change"])
+
+    def flush(self, timeout=None):
+        """
+        Waits for every request in flight. Returns False if one failed or
+        didn't finish within timeout.
+        """
+        with self.send_lock:
+            pending = list(self.pending.values())
+        _, not_done = futures.wait(pending, timeout)
+        return not not_done and self.errors.empty()
+
+    def stop(self):
+        ok = self.flush(timeout=5)
+        self.closing = True
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+        return ok
 
 ###############################################################################
 # Main Entry Point
 ###############################################################################
 if __name__ == "__main__":
-    app = MainApp()
-    app.mainloop()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Task Management Calendar")
+    parser.add_argument("--data", default="users_and_tasks.json",
+                        help="data file (.json, .db/.sqlite for the SQLite engine, "
+                             "or a .d directory for the sharded store)")
+    parser.add_argument("--migrate-to-sqlite", metavar="DB_FILE",
+                        help="copy the JSON data file into a new SQLite database and exit")
+    parser.add_argument("--migrate-to-shards", metavar="DIR",
+                        help="copy the JSON data file into a new sharded directory and exit")
+    parser.add_argument("--serve", metavar="[HOST:]PORT",
+                        help="serve the data file to thin clients instead of opening the GUI")
+    parser.add_argument("--connect", metavar="[HOST:]PORT",
+                        help="run the GUI as a thin client of a --serve process")
+    parser.add_argument("--instrument", action="store_true",
+                        help="record hot-path timings (same as TMC_INSTRUMENT=1); "
+                             "Ctrl+Shift+D shows them")
+    batch = parser.add_argument_group(
+        "batch operations", "run without the GUI on one account's tasks (requires --user)")
+    batch.add_argument("--user", metavar="EMAIL", help="account whose tasks to work on")
+    operation = batch.add_mutually_exclusive_group()
+    operation.add_argument("--import", dest="import_file", metavar="FILE",
+                           help="append tasks from a .csv or .jsonl file")
+    operation.add_argument("--export", dest="export_file", metavar="FILE",
+                           help="write tasks to a .csv or .jsonl file")
+    operation.add_argument("--set", action="append", metavar="FIELD=VALUE",
+                           help="update a field of every matching task (repeatable)")
+    operation.add_argument("--delete", action="store_true", help="delete every matching task")
+    batch.add_argument("--where", action="append", default=[], metavar="CRITERION=VALUE",
+                       help="filter for --export/--set/--delete, as in the Filter window: "
+                            "end_date, status, max_priority, min_progress or assignees (repeatable)")
+    batch.add_argument("--all", action="store_true",
+                       help="let --set/--delete change every task when there is no --where")
+    batch.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE,
+                       help="tasks saved per write during --import")
+    args = parser.parse_args()
+    if args.instrument:
+        INSTRUMENTS.enabled = True
+
+    batch_operation = args.import_file or args.export_file or args.set or args.delete
+    if batch_operation and not args.user:
+        parser.error("batch operations require --user")
+    if args.user and not batch_operation:
+        parser.error("--user requires --import, --export, --set or --delete")
+    if args.all and args.where:
+        parser.error("--all cannot be combined with --where")
+
+    try:
+        if batch_operation:
+            sys.exit(run_headless(args))
+        elif args.migrate_to_sqlite:
+            count = migrate_json_to_sqlite(args.data, args.migrate_to_sqlite)
+            print(f"Migrated {count} users to {args.migrate_to_sqlite}")
+        elif args.migrate_to_shards:
+            count = migrate_json_to_shards(args.data, args.migrate_to_shards)
+            print(f"Migrated {count} users to {args.migrate_to_shards}")
+        elif args.serve:
+            run_server(args.data, *parse_address(args.serve))
+        else:
+            app = MainApp(args.data, parse_address(args.connect) if args.connect else None)
+            app.mainloop()
+    except DataFileError as e:
+        sys.exit(f"Error: {e}")
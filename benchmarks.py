@@ -0,0 +1,866 @@
+"""
+Benchmarks for the Task Management Calendar hot paths.
+
+Run all benchmarks:      python benchmarks.py
+Run selected ones:       python benchmarks.py login sort
+Save machine-readable results, or compare against a saved run:
+                         python benchmarks.py --json results.json
+                         python benchmarks.py --compare baseline.json
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tkinter as tk
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+import TaskManagementCalendar as tmc
+
+###############################################################################
+# Helpers
+###############################################################################
+def time_call(func, repeat):
+    """
+    Returns the mean wall time of func() in milliseconds over repeat calls.
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+def make_users(count):
+    """
+    Builds count user records without tasks.
+    """
+    no_tasks = []
+    return [
+        {"email": f"User{i}@Example.com", "password": "password1", "tasks": no_tasks}
+        for i in range(count)
+    ]
+
+ASSIGNEE_NAMES = ["Alice", "Bob", "Carol", "Dave", "Erin", "Frank", "Grace", "Heidi",
+                  "Ivan", "Judy", "Mallory", "Niaj", "Olivia", "Peggy", "Rupert", "Sybil"]
+# A few people get most of the work (Zipf weights, in ASSIGNEE_NAMES order)
+ASSIGNEE_WEIGHTS = [1 / rank for rank in range(1, len(ASSIGNEE_NAMES) + 1)]
+# Relative frequency of 0..5 assignees on a task
+ASSIGNEE_COUNT_WEIGHTS = [15, 40, 25, 12, 5, 3]
+STATUS_WEIGHTS = [40, 35, 25]
+# End dates cluster around this day
+DATE_CENTER = date(2025, 7, 1)
+
+def make_task_dicts(count, seed=0):
+    """
+    Builds count task dicts shaped like a real task list: most end dates
+    within a few weeks of DATE_CENTER with a tail up to a year either way,
+    priorities bunched around 5, progress consistent with status, and zero
+    to five assignees drawn mostly from the same few people.
+    """
+    rng = random.Random(seed)
+    task_dicts = []
+    for i in range(count):
+        if rng.random() < 0.9:
+            days = max(-365, min(365, round(rng.gauss(0, 30))))
+        else:
+            days = rng.randint(-365, 365)
+        status = rng.choices(tmc.STATUS_OPTIONS, STATUS_WEIGHTS)[0]
+        if status == "Not Started":
+            progress = 0
+        elif status == "Completed":
+            progress = 100
+        else:
+            progress = rng.randint(1, 99)
+        assignees = []
+        for _ in range(rng.choices(range(6), ASSIGNEE_COUNT_WEIGHTS)[0]):
+            name = rng.choices(ASSIGNEE_NAMES, ASSIGNEE_WEIGHTS)[0]
+            if name not in assignees:
+                assignees.append(name)
+        task_dicts.append({
+            "name": f"Task {i}",
+            "end_date": (DATE_CENTER + timedelta(days=days)).isoformat(),
+            "status": status,
+            "priority": max(1, min(10, round(rng.gauss(5, 2)))),
+            "progress": progress,
+            "assignees": assignees
+        })
+    return task_dicts
+
+def make_tasks(count, seed=0):
+    """
+    Same as make_task_dicts, as Task objects.
+    """
+    return [tmc.Task.from_dict(d) for d in make_task_dicts(count, seed)]
+
+# Every table printed by this run, for --json and --compare
+RESULTS = []
+
+def print_table(title, header, rows):
+    RESULTS.append({"title": title, "columns": list(header), "rows": [list(row) for row in rows]})
+    print(title)
+    print("  " + "".join(f"{h:>16}" for h in header))
+    for row in rows:
+        print("  " + "".join(f"{c:>16.4f}" if isinstance(c, float) else f"{c:>16}" for c in row))
+    print()
+
+###############################################################################
+# Login lookup
+###############################################################################
+def legacy_find_user(users, email):
+    """
+    The original LoginFrame.login search: a linear scan with .lower().
+    """
+    for i, user in enumerate(users):
+        if user["email"].lower() == email.lower():
+            return i
+    return None
+
+def bench_login(sizes=(1_000, 10_000, 100_000, 1_000_000)):
+    """
+    Login latency for the last-registered account (the linear scan's worst
+    case) with and without the email index.
+    """
+    rows = []
+    for size in sizes:
+        users = make_users(size)
+        email = f"user{size - 1}@example.COM"
+        start = time.perf_counter()
+        email_index = tmc.build_email_index(users)
+        build_ms = (time.perf_counter() - start) * 1000
+        indexed_ms = time_call(lambda: email_index.get(email.casefold()), 10_000)
+        scan_ms = time_call(lambda: legacy_find_user(users, email), max(1, 100_000 // size))
+        rows.append((size, build_ms, indexed_ms, scan_ms))
+    print_table("Login lookup (ms)", ("users", "index build", "indexed login", "linear scan"), rows)
+    return rows
+
+###############################################################################
+# Filtering
+###############################################################################
+FILTER_CASES = [
+    # (label, end_date, status, max_priority, min_progress, assignees)
+    ("date", "2025-02-01", "", "", "", ""),
+    ("status+priority", "", "In Progress", "2", "", ""),
+    ("priority+progress", "", "", "1", "90", ""),
+    ("date+assignee", "2025-03-01", "", "", "", "ali, bo"),
+    ("all criteria", "2025-06-30", "Completed", "3", "50", "grace"),
+]
+
+def legacy_apply_filter(tasks, end_date_filter, status_filter, priority_filter,
+                        progress_filter, assignee_input):
+    """
+    The original FilterWindow.apply_filter loop, minus the widgets.
+    """
+    assignee_tokens = [token.strip() for token in assignee_input.lower().split(",") if token.strip()]
+    filtered = []
+    for t in tasks:
+        if end_date_filter:
+            try:
+                cutoff = datetime.strptime(end_date_filter, "%Y-%m-%d")
+                task_date = datetime.strptime(t["end_date"], "%Y-%m-%d")
+                if task_date > cutoff:
+                    continue
+            except ValueError:
+                continue
+        if status_filter and t["status"] != status_filter:
+            continue
+        if priority_filter:
+            try:
+                if t["priority"] > int(priority_filter):
+                    continue
+            except ValueError:
+                continue
+        if progress_filter:
+            try:
+                if t["progress"] < int(progress_filter):
+                    continue
+            except ValueError:
+                continue
+        if assignee_tokens:
+            lower_assignees = [a.lower() for a in t["assignees"]]
+            if not any(any(tok in a for a in lower_assignees) for tok in assignee_tokens):
+                continue
+        filtered.append(t)
+    return filtered
+
+def bench_filter(task_counts=(10_000, 100_000)):
+    """
+    Compiled filter + secondary indexes versus the original row-by-row scan.
+    """
+    rows = []
+    for task_count in task_counts:
+        task_dicts = make_task_dicts(task_count)
+        tasks = [tmc.Task.from_dict(d) for d in task_dicts]
+        start = time.perf_counter()
+        index = tmc.TaskFilterIndex(tasks)
+        build_ms = (time.perf_counter() - start) * 1000
+        rows.append((task_count, "(index build)", task_count, build_ms, float("nan")))
+        for label, *criteria in FILTER_CASES:
+            task_filter = tmc.TaskFilter(*criteria)
+            matched = len(index.select(task_filter))
+            indexed_ms = time_call(lambda: index.select(task_filter), 20)
+            legacy_ms = time_call(lambda: legacy_apply_filter(task_dicts, *criteria), 1)
+            rows.append((task_count, label, matched, indexed_ms, legacy_ms))
+    print_table("Filter (ms)", ("tasks", "criteria", "matches", "indexed", "legacy scan"), rows)
+    return rows
+
+###############################################################################
+# Saving
+###############################################################################
+def make_data(user_count, tasks_per_user, seed=0):
+    return {
+        "users": [
+            {"email": f"user{u}@example.com", "password": "password1",
+             "tasks": make_tasks(tasks_per_user, seed + u)}
+            for u in range(user_count)
+        ]
+    }
+
+def bench_save(sizes=((10, 200), (100, 200), (100, 1_000)), edits=20):
+    """
+    UI-thread milliseconds per task edit for each (users, tasks per user)
+    size: the old synchronous full rewrite, a synchronous journal append, a
+    hand-off to PersistenceWorker, and a sharded store rewriting only the
+    edited user's shard.
+    """
+    rows = []
+    for user_count, tasks_per_user in sizes:
+        total = user_count * tasks_per_user
+        rows.extend((total, mode, ms) for mode, ms in save_modes(user_count, tasks_per_user, edits))
+    print_table("Save (UI-thread ms per edit)", ("total tasks", "mode", "ms"), rows)
+    return rows
+
+def save_modes(user_count, tasks_per_user, edits):
+    data = make_data(user_count, tasks_per_user)
+    tasks = data["users"][0]["tasks"]
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "users_and_tasks.json")
+        tmc.compact_data(data, filename)
+
+        def edit(i):
+            task = tmc.Task.from_dict(dict(tasks[i % len(tasks)].to_dict(), progress=i % 101))
+            tasks[i % len(tasks)] = task
+            return tmc.put_task_change(0, i % len(tasks), task)
+
+        full_ms = time_call(lambda: tmc.compact_data(data, filename), edits)
+        rows.append(("sync full rewrite", full_ms))
+
+        journal_ms = time_call(lambda: tmc.save_data(data, filename, edit(0)), edits)
+        rows.append(("sync journal", journal_ms))
+
+        worker = tmc.PersistenceWorker(data, filename)
+        for i in range(edits):
+            worker.submit(edit(i))
+        worker.stop()
+        stats = worker.stats()
+        rows.append(("background writer", stats["ui_thread"]["mean_ms"]))
+        rows.append(("  (writer thread)", stats["writer"]["mean_ms"]))
+
+        root = os.path.join(tmp, "users_and_tasks.d")
+        sharded = tmc.load_data(root)
+        for user in data["users"]:
+            sharded["users"].append(user)
+        tmc.save_data(sharded, root)
+        tasks = sharded["users"][0]["tasks"]
+        shard_ms = time_call(lambda: tmc.save_data(sharded, root, edit(0)), edits)
+        rows.append(("sharded", shard_ms))
+    return rows
+
+###############################################################################
+# Loading
+###############################################################################
+def bench_load(user_count=100, task_counts=(100, 1_000, 5_000)):
+    """
+    Time to the user directory (what the login screen needs): a full
+    load_data() versus the lazy, index-backed one, as tasks per user grow.
+    """
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "users_and_tasks.json")
+        for tasks_per_user in task_counts:
+            tmc.compact_data(make_data(user_count, tasks_per_user), filename)
+            eager_ms = time_call(lambda: tmc.load_data(filename), 1)
+            lazy_ms = time_call(lambda: tmc.load_data(filename, lazy=True), 5)
+            data = tmc.load_data(filename, lazy=True)
+            first_user_ms = time_call(lambda: data["users"][0]["tasks"], 1)
+            rows.append((user_count * tasks_per_user, eager_ms, lazy_ms, first_user_ms))
+    print_table(f"Load, {user_count} users (ms)",
+                ("total tasks", "full load", "lazy directory", "1 user tasks"), rows)
+    return rows
+
+###############################################################################
+# Startup
+###############################################################################
+# Run in a fresh interpreter: import the app and get to a drawn login
+# screen (MainApp plus one update()), or, with no display, do what MainApp
+# does before the login screen accepts input. Prints the milliseconds from
+# its own start to each step as JSON.
+STARTUP_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import TaskManagementCalendar as tmc
+imported = time.perf_counter()
+try:
+    app = tmc.MainApp(sys.argv[1])
+except tmc.tk.TclError:
+    data = tmc.load_data(sys.argv[1], lazy=tmc.LAZY_LOAD)
+    tmc.build_email_index(data["users"])
+    app = None
+else:
+    app.update()
+ready = time.perf_counter()
+print(json.dumps({"import": (imported - start) * 1000, "ready": (ready - start) * 1000,
+                  "mode": "stub" if app is None else "Tk"}), flush=True)
+if app is not None:
+    app.persistence.stop()
+    app.destroy()
+"""
+
+def launch(filename):
+    """
+    Starts the probe on filename; returns the wall milliseconds from
+    spawning the process to the login screen, and the probe's own report.
+    """
+    start = time.perf_counter()
+    probe = subprocess.Popen([sys.executable, "-c", STARTUP_PROBE, filename],
+                             stdout=subprocess.PIPE, text=True,
+                             cwd=os.path.dirname(os.path.abspath(tmc.__file__)))
+    line = probe.stdout.readline()
+    wall_ms = (time.perf_counter() - start) * 1000
+    probe.wait()
+    return wall_ms, json.loads(line)
+
+def bench_startup(sizes=((10, 100), (100, 1_000), (500, 1_000), (20_000, 5)), launches=5):
+    """
+    Cold launch to login screen, per (users, tasks per user): the first
+    launch on a data file without a snapshot index (a full parse), then the
+    median of later launches (the lazy path, whose cost depends on the
+    number of users, not tasks).
+    """
+    rows = []
+    mode = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for user_count, tasks_per_user in sizes:
+            filename = os.path.join(tmp, f"startup-{user_count}x{tasks_per_user}.json")
+            data = make_data(user_count, tasks_per_user)
+            with open(filename, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=4, default=tmc.encode_task)
+            del data
+            first_ms, _ = launch(filename)
+            if not os.path.exists(filename + tmc.INDEX_SUFFIX):
+                # Without a display nothing wrote the index; do it like the app
+                tmc.compact_data(tmc.load_data(filename), filename)
+            runs = [launch(filename) for _ in range(launches)]
+            mode = runs[0][1]["mode"]
+            rows.append((user_count * tasks_per_user, user_count, first_ms,
+                         statistics.median(wall for wall, _ in runs),
+                         statistics.median(report["import"] for _, report in runs),
+                         statistics.median(report["ready"] for _, report in runs)))
+    print_table(f"Startup to login screen ({mode} widgets, ms)",
+                ("total tasks", "users", "first launch", "launch", "import", "in-process"), rows)
+    return rows
+
+###############################################################################
+# Sorting
+###############################################################################
+def bench_sort(task_counts=(100, 1_000, 3_000, 10_000)):
+    """
+    Ordering a task list by priority: insertion_sort_by_priority (quadratic,
+    so skipped past 3,000 tasks) versus the built-in sort and building the
+    SortedTaskIndex the task view keeps.
+    """
+    rows = []
+    for task_count in task_counts:
+        tasks = make_tasks(task_count)
+        if task_count <= 3_000:
+            insertion_ms = time_call(lambda: tmc.insertion_sort_by_priority(tasks), 1)
+        else:
+            insertion_ms = float("nan")
+        sorted_ms = time_call(lambda: sorted(tasks, key=lambda t: t.priority), 5)
+        index_ms = time_call(lambda: tmc.SortedTaskIndex(tasks, ["priority"]), 5)
+        rows.append((task_count, insertion_ms, sorted_ms, index_ms))
+    print_table("Sort by priority (ms)",
+                ("tasks", "insertion sort", "sorted()", "SortedTaskIndex"), rows)
+    return rows
+
+###############################################################################
+# Task list rendering
+###############################################################################
+class StubTreeview:
+    """
+    The part of ttk.Treeview that VirtualTaskList uses, kept in Python
+    lists, for timing without a display. It measures the app's own work
+    per redraw, not Tk's.
+    """
+    def __init__(self):
+        self.children = []
+        self.values = {}
+
+    def get_children(self, item=""):
+        return tuple(self.children)
+
+    def delete(self, *iids):
+        gone = set(iids)
+        self.children = [iid for iid in self.children if iid not in gone]
+        for iid in iids:
+            del self.values[iid]
+
+    def exists(self, iid):
+        return iid in self.values
+
+    def item(self, iid, values):
+        self.values[iid] = values
+
+    def insert(self, parent, index, iid, values):
+        self.children.insert(index, iid)
+        self.values[iid] = values
+
+    def index(self, iid):
+        return self.children.index(iid)
+
+    def move(self, iid, parent, index):
+        self.children.remove(iid)
+        self.children.insert(index, iid)
+
+class StubScrollbar:
+    def set(self, first, last):
+        pass
+
+def make_task_view(data, user_index=0):
+    """
+    A TaskViewFrame for timing refresh_task_list. With a display (or a
+    virtual one such as Xvfb) it is the real frame on a hidden root;
+    without one, the frame's list state is set up as in
+    TaskViewFrame.__init__ around a StubTreeview. Returns (view, mode).
+    """
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pass
+    else:
+        root.withdraw()
+        return tmc.TaskViewFrame(root, data, user_index), "Tk"
+    tasks = data["users"][user_index]["tasks"]
+    view = tmc.TaskViewFrame.__new__(tmc.TaskViewFrame)
+    view.data = data
+    view.user_index = user_index
+    view.sort_keys = ["priority"]
+    view.filtered_tasks = view.ranked_rows = view.db_rows = view.active_view = None
+    view.sorted_index = tmc.SortedTaskIndex(tasks, view.sort_keys)
+    view.filter_index = tmc.TaskFilterIndex(tasks)
+    view.indexes = [view.sorted_index, view.filter_index]
+    task_list = tmc.VirtualTaskList.__new__(tmc.VirtualTaskList)
+    task_list.get_task = view.get_task
+    task_list.height = 15
+    task_list.rows = []
+    task_list.offset = 0
+    task_list.rendered = {}
+    task_list.tree = StubTreeview()
+    task_list.scrollbar = StubScrollbar()
+    view.task_list = task_list
+    view.refresh_task_list()
+    return view, "stub"
+
+def bench_render(task_counts=(1_000, 10_000, 100_000), repeat=20):
+    """
+    TaskViewFrame.refresh_task_list as the user drives it: applying and
+    clearing a filter, redrawing after one task is edited, and scrolling a
+    page.
+    """
+    rows = []
+    mode = None
+    for task_count in task_counts:
+        tasks = make_tasks(task_count)
+        data = {"users": [{"email": "user0@example.com", "password": "password1", "tasks": tasks}]}
+        view, mode = make_task_view(data)
+        task_filter = tmc.TaskFilter(status="In Progress", max_priority="5")
+        filtered = [(i, tasks[i]) for i in view.filter_index.select(task_filter)]
+
+        def filter_and_clear():
+            view.refresh_task_list(filtered)
+            view.refresh_task_list()
+
+        def edit(i=[0]):
+            i[0] += 1
+            task_index = i[0] % task_count
+            tasks[task_index] = tmc.Task.from_dict(dict(tasks[task_index].to_dict(), priority=i[0] % 10 + 1))
+            for index in view.indexes:
+                index.update(task_index)
+            view.refresh_task_list(changed=[task_index])
+
+        def page(direction=[1]):
+            direction[0] = -direction[0]
+            view.task_list.scroll(direction[0] * view.task_list.height)
+
+        rows.append((task_count, time_call(filter_and_clear, repeat) / 2,
+                     time_call(edit, repeat), time_call(page, repeat)))
+        if mode == "Tk":
+            view.winfo_toplevel().destroy()
+    print_table(f"Task list refresh ({mode} widgets, ms)",
+                ("tasks", "filter/clear", "edit one task", "scroll a page"), rows)
+    return rows
+
+###############################################################################
+# Calendar
+###############################################################################
+def legacy_tasks_in_month(task_dicts, year, month):
+    """
+    What a calendar page costs without an index: strptime on every task.
+    """
+    found = []
+    for t in task_dicts:
+        try:
+            due = datetime.strptime(t["end_date"], "%Y-%m-%d")
+        except ValueError:
+            continue
+        if due.year == year and due.month == month:
+            found.append(t)
+    return found
+
+def bench_calendar(task_count=50_000):
+    """
+    Tasks for one month view (6 weeks of cells) from the date-bucketed
+    index versus a strptime scan of every task.
+    """
+    task_dicts = make_task_dicts(task_count)
+    tasks = [tmc.Task.from_dict(d) for d in task_dicts]
+    start = time.perf_counter()
+    index = tmc.DateBucketIndex(tasks)
+    build_ms = (time.perf_counter() - start) * 1000
+    rows = []
+    for year, month in ((2025, 1), (2025, 7), (2026, 3)):
+        first = date(year, month, 1)
+        start_ord = first.toordinal() - first.weekday()
+        matched = sum(len(ids) for _, ids in index.between(start_ord, start_ord + 41))
+        indexed_ms = time_call(lambda: index.between(start_ord, start_ord + 41), 100)
+        legacy_ms = time_call(lambda: legacy_tasks_in_month(task_dicts, year, month), 1)
+        rows.append((f"{year}-{month:02d}", matched, indexed_ms, legacy_ms))
+    print_table(f"Calendar month, {task_count} tasks (ms; index build {build_ms:.0f} ms)",
+                ("month", "tasks shown", "indexed", "legacy scan"), rows)
+    return rows
+
+###############################################################################
+# Search
+###############################################################################
+SEARCH_QUERIES = ["t", "task", "task 4", "task 4242", "gra", "ali bo", "9"]
+
+def legacy_search(tasks, query):
+    """
+    Substring search over names and assignees, one task at a time.
+    """
+    words = query.lower().split()
+    return [i for i, t in enumerate(tasks)
+            if all(w in t.name.lower() or any(w in a.lower() for a in t.assignees) for w in words)]
+
+def bench_search(task_count=100_000):
+    """
+    Search-as-you-type latency per keystroke against the 16 ms frame
+    budget: TaskSearchIndex versus scanning every task.
+    """
+    tasks = make_tasks(task_count)
+    start = time.perf_counter()
+    index = tmc.TaskSearchIndex(tasks)
+    build_ms = (time.perf_counter() - start) * 1000
+    rows = []
+    for query in SEARCH_QUERIES:
+        matched = len(index.search(query))
+        indexed_ms = time_call(lambda: index.search(query), 20)
+        legacy_ms = time_call(lambda: legacy_search(tasks, query), 1)
+        rows.append((repr(query), matched, indexed_ms, legacy_ms))
+    print_table(f"Search, {task_count} tasks (ms; index build {build_ms:.0f} ms)",
+                ("query", "matches", "indexed", "scan"), rows)
+    return rows
+
+###############################################################################
+# Workload summary
+###############################################################################
+def bench_aggregates(task_counts=(10_000, 100_000)):
+    """
+    Keeping the workload summary current after one edit: TaskAggregates
+    deltas versus recounting every task.
+    """
+    rows = []
+    for task_count in task_counts:
+        tasks = make_tasks(task_count)
+        today = date(2025, 7, 1).toordinal()
+        aggregates = tmc.TaskAggregates(tasks, today)
+        edited = [tmc.Task(t.name, t.end_date, "Completed", t.priority, 100, t.assignees) for t in tasks[:100]]
+
+        def edit_all():
+            for task_index, task in enumerate(edited):
+                tasks[task_index], edited[task_index] = task, tasks[task_index]
+                aggregates.update(task_index)
+
+        delta_ms = time_call(edit_all, 10) / len(edited)
+        recount_ms = time_call(lambda: tmc.TaskAggregates(tasks, today), 1)
+        rows.append((task_count, delta_ms, recount_ms))
+    print_table("Workload summary after one edit (ms)", ("tasks", "delta", "recount"), rows)
+    return rows
+
+def bench_dependencies(task_counts=(1_000, 10_000), seed=0):
+    """
+    Keeping earliest finishes and conflicts current after one end date
+    slips a year, in a project where every task depends on up to three of
+    the 50 before it and is due a little after them: DependencyGraph.update()
+    on a late task (small downstream subgraph) and an early one (most of the
+    project downstream), versus rebuilding the graph.
+    """
+    rows = []
+    rng = random.Random(seed)
+    start = date(2025, 1, 1).toordinal()
+    for task_count in task_counts:
+        tasks = make_tasks(task_count, seed)
+        for i, task in enumerate(tasks):
+            depends_on = sorted(set(rng.randrange(max(0, i - 50), i) for _ in range(rng.randint(1, 3)))) if i else ()
+            tasks[i] = tmc.Task(task.name, tmc.ordinal_to_date(start + i // 5), task.status, task.priority,
+                                task.progress, task.assignees, depends_on=depends_on)
+        graph = tmc.DependencyGraph(tasks)
+
+        def edit(task_index):
+            task = tasks[task_index]
+            moved = tmc.Task(task.name, tmc.ordinal_to_date(task.end_ord + 365), task.status, task.priority,
+                             task.progress, task.assignees, depends_on=task.depends_on)
+            for replacement in (moved, task):
+                tasks[task_index] = replacement
+                graph.update(task_index)
+
+        late_ms = time_call(lambda: edit(task_count - 10), 20) / 2
+        early_ms = time_call(lambda: edit(10), 5) / 2
+        rebuild_ms = time_call(lambda: tmc.DependencyGraph(tasks), 1)
+        rows.append((task_count, late_ms, early_ms, rebuild_ms))
+    print_table("Dependency graph after one edit (ms)", ("tasks", "late task", "early task", "rebuild"), rows)
+    return rows
+
+###############################################################################
+# Memory
+###############################################################################
+def bench_memory(task_count=1_000_000):
+    """
+    Resident size of task_count tasks as parsed JSON dicts (the old
+    layout), as Task objects, and as TaskColumns arrays.
+    """
+    text = json.dumps(make_task_dicts(task_count))
+    gc.collect()
+    tracemalloc.start()
+
+    base = tracemalloc.get_traced_memory()[0]
+    task_dicts = json.loads(text)
+    dict_bytes = tracemalloc.get_traced_memory()[0] - base
+
+    base = tracemalloc.get_traced_memory()[0]
+    tasks = [tmc.Task.from_dict(d) for d in task_dicts]
+    del task_dicts
+    gc.collect()
+    task_bytes = tracemalloc.get_traced_memory()[0] - base + dict_bytes
+
+    base = tracemalloc.get_traced_memory()[0]
+    columns = tmc.TaskColumns(tasks)
+    column_bytes = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+
+    rows = [
+        ("dicts (old)", dict_bytes / 2 ** 20, dict_bytes / task_count),
+        ("Task objects", task_bytes / 2 ** 20, task_bytes / task_count),
+        ("TaskColumns", column_bytes / 2 ** 20, column_bytes / task_count),
+    ]
+    print_table(f"Memory, {task_count} tasks", ("layout", "MiB", "bytes/task"), rows)
+    del columns, tasks
+    return rows
+
+###############################################################################
+# Task server load test
+###############################################################################
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+async def load_client(port, email, ops, latencies):
+    """
+    One simulated thin client: logs in over its own connection, then sends
+    ops requests (mostly edits, some creations and filters), each waiting
+    for its reply. Change events from other sessions are read and skipped.
+    """
+    reader, writer = await asyncio.open_connection(
+        "127.0.0.1", port, limit=tmc.SERVER_LINE_LIMIT
+    )
+    request_id = 0
+
+    async def call(op, **params):
+        nonlocal request_id
+        request_id += 1
+        start = time.perf_counter()
+        writer.write(tmc.encode_message(dict(params, op=op, id=request_id)))
+        while True:
+            message = json.loads(await reader.readline())
+            if message.get("id") == request_id:
+                break
+        latencies.setdefault(op, []).append((time.perf_counter() - start) * 1000)
+        if not message["ok"]:
+            raise tmc.ServerError(message["error"])
+        return message
+
+    rng = random.Random(email)
+    task_count = len((await call("login", email=email, password="password1"))["tasks"])
+    for i in range(ops):
+        roll = rng.random()
+        if roll < 0.6:
+            task_index = rng.randrange(task_count)
+            task = dict(make_task_dicts(1, seed=i)[0], progress=rng.randrange(101))
+            await call("put_task", task_index=task_index, task=task)
+        elif roll < 0.8:
+            await call("create_task", task=make_task_dicts(1, seed=i)[0])
+            task_count += 1
+        else:
+            await call("filter", criteria={"max_priority": "3", "assignees": "ali"})
+    writer.close()
+    await writer.wait_closed()
+
+def bench_server(client_counts=(10, 100, 300), ops=20, clients_per_user=4, tasks_per_user=200):
+    """
+    Load test of the local task server: client_counts concurrent
+    connections, each logging in and sending ops requests, with
+    clients_per_user sessions sharing an account so every edit is also
+    pushed to other clients. Passwords use a cheap scrypt cost so the test
+    measures the server rather than the KDF.
+    """
+    saved_n = tmc.SCRYPT_N
+    tmc.SCRYPT_N = 2 ** 10
+    rows = []
+    try:
+        for client_count in client_counts:
+            user_count = max(1, client_count // clients_per_user)
+            data = make_data(user_count, tasks_per_user)
+            for user in data["users"]:
+                user["password"] = tmc.hash_password(user["password"])
+            with tempfile.TemporaryDirectory() as tmp:
+                filename = os.path.join(tmp, "users_and_tasks.json")
+                tmc.compact_data(data, filename)
+                server = tmc.TaskServer(filename)
+                ready = threading.Event()
+                thread = threading.Thread(
+                    target=lambda: asyncio.run(server.serve("127.0.0.1", 0, ready.set)), daemon=True
+                )
+                thread.start()
+                ready.wait()
+
+                latencies = {}
+
+                async def run_clients():
+                    await asyncio.gather(*[
+                        load_client(server.port, f"user{c % user_count}@example.com", ops, latencies)
+                        for c in range(client_count)
+                    ])
+
+                start = time.perf_counter()
+                asyncio.run(run_clients())
+                elapsed = time.perf_counter() - start
+                server.stop()
+                thread.join()
+
+                requests = client_count * ops
+                rows.append((client_count, requests / elapsed,
+                             percentile(latencies["login"], 0.5),
+                             percentile(latencies["put_task"], 0.5),
+                             percentile(latencies["put_task"], 0.99),
+                             percentile(latencies.get("filter", []), 0.99)))
+    finally:
+        tmc.SCRYPT_N = saved_n
+    print_table(f"Task server, {ops} requests per client (ms unless noted)",
+                ("clients", "requests/s", "login p50", "edit p50", "edit p99", "filter p99"), rows)
+    return rows
+
+BENCHMARKS = {
+    "login": bench_login,
+    "filter": bench_filter,
+    "save": bench_save,
+    "load": bench_load,
+    "startup": bench_startup,
+    "sort": bench_sort,
+    "render": bench_render,
+    "calendar": bench_calendar,
+    "search": bench_search,
+    "aggregates": bench_aggregates,
+    "dependencies": bench_dependencies,
+    "memory": bench_memory,
+    "server": bench_server,
+}
+
+###############################################################################
+# Results
+###############################################################################
+def run_benchmarks(names):
+    """
+    Runs the named benchmarks and returns their tables with enough about
+    the machine to tell whether two runs are comparable.
+    """
+    results = {}
+    for name in names:
+        del RESULTS[:]
+        BENCHMARKS[name]()
+        results[name] = list(RESULTS)
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "benchmarks": results,
+    }
+
+def compare_results(baseline, current):
+    """
+    Prints current / baseline for every timing both runs have. Tables and
+    rows are matched by position, since a benchmark always produces the
+    same ones (titles may include a measured time); counts (ints) that
+    differ are shown as well, as they mean the inputs differ.
+    """
+    for name, tables in current["benchmarks"].items():
+        for table, old in zip(tables, baseline["benchmarks"].get(name, [])):
+            if old["columns"] != table["columns"]:
+                continue
+            print(f"{table['title']}: current / baseline")
+            for row, old_row in zip(table["rows"], old["rows"]):
+                label = " ".join(str(value) for value in row if not isinstance(value, (float, type(None))))
+                cells = []
+                for column, value, old_value in zip(table["columns"], row, old_row):
+                    if isinstance(value, float) and isinstance(old_value, float) and old_value > 0:
+                        cells.append(f"{column} {value / old_value:.2f}x")
+                    elif isinstance(value, int) and value != old_value:
+                        cells.append(f"{column} {old_value} -> {value}")
+                print(f"  {label}: {', '.join(cells) or 'no timings'}")
+            print()
+
+def json_safe(results):
+    """
+    results with skipped (NaN) measurements as None, which JSON can hold.
+    """
+    for tables in results["benchmarks"].values():
+        for table in tables:
+            table["rows"] = [[None if value != value else value for value in row] for row in table["rows"]]
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Task Management Calendar benchmarks")
+    parser.add_argument("names", nargs="*", metavar="NAME",
+                        help=f"benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument("--json", metavar="FILE", help="also write the results to FILE as JSON")
+    parser.add_argument("--compare", metavar="FILE", help="compare against results saved with --json")
+    args = parser.parse_args()
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(unknown)}")
+
+    results = json_safe(run_benchmarks(args.names or list(BENCHMARKS)))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare_results(json.load(f), results)
@@ -0,0 +1,1829 @@
+"""
+Tests for the Task Management Calendar storage and batch code.
+
+Run with:  python -m unittest test_TaskManagementCalendar
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import types
+import unittest
+from unittest import mock
+
+import benchmarks
+import TaskManagementCalendar as tmc
+
+def make_task(name, priority=1):
+    return tmc.Task(name, "2025-01-01", "Not Started", priority, 0, [])
+
+def task_names(data, user_index=0):
+    return [task.name for task in data["users"][user_index]["tasks"]]
+
+def have_display():
+    try:
+        tmc.tk.Tk().destroy()
+    except tmc.tk.TclError:
+        return False
+    return True
+
+HAVE_DISPLAY = have_display()
+
+class StubVar:
+    """
+    A StringVar, or an Entry as far as get() goes.
+    """
+    def __init__(self, value=""):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+class StubWidget:
+    def __init__(self):
+        self.options = {}
+
+    def config(self, **options):
+        self.options.update(options)
+
+def headless_task_view(data, filename):
+    """
+    A TaskViewFrame with the list and saved-view state set up as in
+    TaskViewFrame.__init__ around stub widgets (see benchmarks.make_task_view),
+    on a stub app whose writer saves to filename.
+    """
+    tasks = data["users"][0]["tasks"]
+    view = tmc.TaskViewFrame.__new__(tmc.TaskViewFrame)
+    view.master = types.SimpleNamespace(persistence=tmc.PersistenceWorker(data, filename, debounce=0),
+                                        client=None)
+    view.data = data
+    view.user_index = 0
+    view.sort_keys = ["priority"]
+    view.filtered_tasks = view.ranked_rows = view.db_rows = view.active_view = None
+    view.sorted_index = tmc.SortedTaskIndex(tasks, view.sort_keys)
+    view.filter_index = tmc.TaskFilterIndex(tasks)
+    view.views = tmc.SavedViewCache(tasks, lambda f: [(i, tasks[i]) for i in view.filter_index.select(f)],
+                                    lambda i, task: view.sorted_index.key_of(i))
+    view.views.set_views(data["users"][0].get("views", []))
+    view.indexes = [view.sorted_index, view.filter_index, view.views]
+    view.view_var = StubVar(tmc.ALL_TASKS_VIEW)
+    view.dropdown_view = StubWidget()
+    view.task_list = task_list = tmc.VirtualTaskList.__new__(tmc.VirtualTaskList)
+    task_list.get_task = view.get_task
+    task_list.height = 15
+    task_list.rows = []
+    task_list.offset = 0
+    task_list.rendered = {}
+    task_list.tree = benchmarks.StubTreeview()
+    task_list.scrollbar = benchmarks.StubScrollbar()
+    view.refresh_task_list()
+    return view
+
+def headless_filter_window(view, **criteria):
+    """
+    A FilterWindow over view with criteria (end_date, status, max_priority,
+    min_progress, assignees, view_name) typed in; destroyed is set when it
+    closes.
+    """
+    window = tmc.FilterWindow.__new__(tmc.FilterWindow)
+    window.parent_frame = view
+    window.data = view.data
+    window.user_index = view.user_index
+    window.entry_end_date = StubVar(criteria.get("end_date", ""))
+    window.status_var = StubVar(criteria.get("status", ""))
+    window.entry_priority = StubVar(criteria.get("max_priority", ""))
+    window.entry_progress = StubVar(criteria.get("min_progress", ""))
+    window.entry_assignee = StubVar(criteria.get("assignees", ""))
+    window.entry_view_name = StubVar(criteria.get("view_name", ""))
+    window.destroyed = False
+    window.destroy = lambda: setattr(window, "destroyed", True)
+    return window
+
+class StorageTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def new_store(self, filename, task_count=0):
+        """
+        A store holding one account with tasks t0..t<task_count - 1>.
+        """
+        data = tmc.load_data(filename)
+        user = {"email": "me@example.com", "password": "password1",
+                "tasks": [make_task(f"t{i}") for i in range(task_count)]}
+        data["users"].append(user)
+        tmc.save_data(data, filename)
+        return tmc.load_data(filename)
+
+###############################################################################
+# Journal
+###############################################################################
+class JournalTests(StorageTestCase):
+    def test_journal_replays_on_load(self):
+        filename = self.path("data.json")
+        data = self.new_store(filename, 2)
+        task = make_task("new")
+        data["users"][0]["tasks"].append(task)
+        tmc.save_data(data, filename, tmc.put_task_change(0, 2, task))
+        self.assertTrue(os.path.exists(filename + tmc.JOURNAL_SUFFIX))
+        self.assertEqual(task_names(tmc.load_data(filename)), ["t0", "t1", "new"])
+
+    def test_compact_folds_journal_into_snapshot(self):
+        filename = self.path("data.json")
+        data = self.new_store(filename, 1)
+        data["users"][0]["tasks"][0] = task = make_task("edited")
+        tmc.save_data(data, filename, tmc.put_task_change(0, 0, task))
+        tmc.compact_data(data, filename)
+        self.assertFalse(os.path.exists(filename + tmc.JOURNAL_SUFFIX))
+        self.assertEqual(task_names(tmc.load_data(filename)), ["edited"])
+
+    def test_lazy_load_matches_full_load(self):
+        filename = self.path("data.json")
+        data = self.new_store(filename, 3)
+        data["users"][0]["tasks"][1] = task = make_task("edited")
+        tmc.save_data(data, filename, tmc.put_task_change(0, 1, task))
+        lazy = tmc.load_data(filename, lazy=True)
+        self.assertIsInstance(lazy["users"][0], tmc.LazyUser)
+        self.assertEqual(task_names(lazy), task_names(tmc.load_data(filename)))
+
+    def test_unreadable_index_falls_back_to_full_load(self):
+        filename = self.path("data.json")
+        self.new_store(filename, 2)
+        with open(filename + tmc.INDEX_SUFFIX, "w", encoding="utf-8") as f:
+            f.write('{"snapshot": [0, 0], "users": []}')
+        self.assertIsNone(tmc.load_lazy(filename))
+        self.assertEqual(task_names(tmc.load_data(filename, lazy=True)), ["t0", "t1"])
+
+    def test_corrupt_snapshot_is_refused(self):
+        filename = self.path("data.json")
+        data = self.new_store(filename, 1)
+        task = make_task("new")
+        data["users"][0]["tasks"].append(task)
+        tmc.save_data(data, filename, tmc.put_task_change(0, 1, task))
+        for text in ["{not json", '{"users": [{"email": "me@example.com"}]}', "[]", "\xff"]:
+            with open(filename, "w", encoding="latin-1") as f:
+                f.write(text)
+            with self.assertRaisesRegex(tmc.DataFileError, "could not be read"):
+                tmc.load_data(filename)
+            with open(filename, "r", encoding="latin-1") as f:
+                self.assertEqual(f.read(), text)
+        # Nor does a batch operation touch it
+        args = argparse.Namespace(data=filename, user="me@example.com", import_file=None, export_file=None,
+                                  set=["status=Completed"], delete=False, where=[], all=True,
+                                  batch_size=tmc.IMPORT_BATCH_SIZE)
+        with contextlib.redirect_stderr(io.StringIO()) as stderr:
+            self.assertEqual(tmc.run_headless(args), 2)
+        self.assertIn("could not be read", stderr.getvalue())
+        self.assertEqual(os.path.getsize(filename), 1)
+
+    def test_missing_or_empty_file_starts_empty(self):
+        filename = self.path("data.json")
+        self.assertEqual(tmc.load_data(filename), {"users": []})
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write("\n")
+        self.assertEqual(tmc.load_data(filename), {"users": []})
+
+    def test_records_for_missing_users_are_ignored(self):
+        data = {"users": []}
+        tmc.apply_change(data, tmc.put_task_change(3, 0, make_task("orphan")))
+        tmc.apply_change(data, tmc.set_password_change(0, "password1"))
+        self.assertEqual(data, {"users": []})
+
+    def test_stale_journal_is_skipped_after_compaction(self):
+        # A crash after the snapshot was replaced but before the journal
+        # was removed leaves records the snapshot already holds.
+        filename = self.path("data.json")
+        data = self.new_store(filename, 5)
+        tasks = data["users"][0]["tasks"]
+        tasks.append(make_task("t5"))
+        tmc.save_data(data, filename, tmc.put_task_change(0, 5, tasks[5]))
+        change = tmc.delete_tasks_change(0, [0], len(tasks))
+        tmc.delete_tasks(tasks, [0])
+        tmc.save_data(data, filename, change)
+        with open(filename + tmc.JOURNAL_SUFFIX, "rb") as f:
+            journal = f.read()
+        tmc.compact_data(data, filename)
+        with open(filename + tmc.JOURNAL_SUFFIX, "wb") as f:
+            f.write(journal)
+        expected = ["t1", "t2", "t3", "t4", "t5"]
+        self.assertEqual(task_names(tmc.load_data(filename)), expected)
+        self.assertEqual(task_names(tmc.load_data(filename, lazy=True)), expected)
+
+###############################################################################
+# SQLite store
+###############################################################################
+class SqliteTests(StorageTestCase):
+    def migrated(self, tasks):
+        """
+        Tasks saved to a JSON store, migrated to SQLite and loaded back.
+        """
+        json_filename = self.path("data.json")
+        data = self.new_store(json_filename)
+        data["users"][0]["tasks"].extend(tasks)
+        data["users"][0]["views"] = [{"name": "mine", "criteria": {"assignees": "ann"}}]
+        tmc.compact_data(data, json_filename)
+        db_filename = self.path("data.db")
+        self.assertEqual(tmc.migrate_json_to_sqlite(json_filename, db_filename), 1)
+        return tmc.load_data(db_filename)
+
+    def test_migration_keeps_every_field(self):
+        tasks = benchmarks.make_tasks(50, seed=5)
+        report = tmc.Task("report", "2025-01-31", "In Progress", 2, 10, ["Ann", "Bob"],
+                          tmc.Recurrence("monthly", count=12), depends_on=(3, 7))
+        tasks.append(report.with_override(tmc.date_ordinal("2025-02-28"), "Completed", 100))
+        tasks.append(tmc.Task("no date", "someday", "Not Started", 1, 0, []))
+        user = self.migrated(tasks)["users"][0]
+        self.assertEqual((user["email"], user["password"]), ("me@example.com", "password1"))
+        self.assertEqual(user["views"], [{"name": "mine", "criteria": {"assignees": "ann"}}])
+        self.assertEqual(list(user["tasks"]), tasks)
+        self.assertEqual([t.to_dict() for t in user["tasks"]], [t.to_dict() for t in tasks])
+        self.assertEqual(user["tasks"].dependencies(), [(50, (3, 7))])
+
+    def test_migration_refuses_a_populated_database(self):
+        self.migrated([make_task("a")])
+        with self.assertRaisesRegex(ValueError, "already contains users"):
+            tmc.migrate_json_to_sqlite(self.path("data.json"), self.path("data.db"))
+
+    def test_query_matches_in_memory_filter_and_sort(self):
+        tasks = benchmarks.make_tasks(300, seed=7)
+        stored = self.migrated(tasks)["users"][0]["tasks"]
+        criteria = [{}, {"end_date": "2025-06-30"}, {"status": "In Progress"},
+                    {"max_priority": "2", "min_progress": "40"}, {"assignees": "a, bo"},
+                    {"end_date": "2025-09-30", "status": "Not Started", "assignees": "e"}]
+        orders = [(), ("priority",), ("end_date", "name"), ("status", "progress", "priority"),
+                  ("assignees",)]
+        for fields in criteria:
+            task_filter = tmc.TaskFilter(**fields)
+            expected = tmc.matching_tasks(tasks, task_filter)
+            self.assertEqual(tmc.matching_tasks(stored, task_filter), expected)
+            for order_by in orders:
+                ranked = sorted(expected, key=lambda pair: tmc.task_sort_key(pair[1], order_by) + (pair[0],))
+                with self.subTest(criteria=fields, order_by=order_by):
+                    self.assertEqual([i for i, _ in stored.query(**task_filter.criteria(), order_by=order_by)],
+                                     [i for i, _ in ranked])
+        self.assertEqual(stored.positions(("name",)),
+                         sorted(range(len(tasks)), key=lambda i: (tasks[i].name.casefold(), i)))
+
+    def test_delete_renumbers_positions_and_dependencies(self):
+        tasks = [make_task(f"t{i}") for i in range(6)]
+        tasks[5] = tmc.Task("t5", "2025-01-01", "Not Started", 1, 0, [], depends_on=(1, 4))
+        tasks[3] = tmc.Task("t3", "2025-01-01", "Not Started", 1, 0, [], depends_on=(2,))
+        filename = self.path("data.db")
+        data = self.migrated(tasks)
+        tmc.delete_tasks(data["users"][0]["tasks"], [0, 2])
+        tmc.save_data(data, filename, tmc.delete_tasks_change(0, [0, 2], 6))
+        stored = tmc.load_data(filename)["users"][0]["tasks"]
+        tmc.delete_tasks(tasks, [0, 2])
+        self.assertEqual(list(stored), tasks)
+        self.assertEqual([stored[i].name for i in range(len(stored))], ["t1", "t3", "t4", "t5"])
+        self.assertEqual(stored.dependencies(), [(3, (0, 2))])
+        stored.append(make_task("new"))
+        self.assertEqual((len(stored), stored[-1].name, stored.positions()), (5, "new", [0, 1, 2, 3, 4]))
+
+###############################################################################
+# Account lookup
+###############################################################################
+class EmailIndexTests(unittest.TestCase):
+    def test_lookup_ignores_case_and_first_account_wins(self):
+        users = [{"email": email, "password": "password1", "tasks": []}
+                 for email in ["Ann@Example.com", "bob@example.com", "ANN@example.COM", "Straße@example.com"]]
+        index = tmc.build_email_index(users)
+        self.assertEqual(index, {"ann@example.com": 0, "bob@example.com": 1, "strasse@example.com": 3})
+        for email in ["ann@EXAMPLE.com", "BOB@example.com", "nobody@example.com"]:
+            self.assertEqual(index.get(email.casefold()), benchmarks.legacy_find_user(users, email))
+        self.assertEqual(index.get("STRASSE@example.com".casefold()), 3)
+
+###############################################################################
+# Task objects and columns
+###############################################################################
+class TaskStorageTests(unittest.TestCase):
+    def test_task_round_trips_through_dict(self):
+        for end_date in ["2025-03-09", "2025-3-9", "someday", ""]:
+            d = {"name": "a", "end_date": end_date, "status": "In Progress", "priority": 2,
+                 "progress": 40, "assignees": ["Ann", "Bob"]}
+            task = tmc.Task.from_dict(d)
+            self.assertEqual(task.to_dict(), d)
+            self.assertEqual(tmc.Task.from_dict(json.loads(json.dumps(task, default=tmc.encode_task))), task)
+        # Only non-canonical text is kept besides the ordinal
+        canonical, loose = (tmc.Task.from_dict(dict(d, end_date=text)) for text in ("2025-03-09", "2025-3-9"))
+        self.assertEqual((canonical.end_ord, canonical.end_text), (tmc.date(2025, 3, 9).toordinal(), None))
+        self.assertEqual((loose.end_ord, loose.end_text), (canonical.end_ord, "2025-3-9"))
+        self.assertEqual(tmc.Task.from_dict(dict(d, end_date="someday")).end_ord, None)
+
+    def test_tasks_are_slotted_and_share_strings(self):
+        first, second = (tmc.Task("a", "2025-01-01", "".join(["In ", "Progress"]), 1, 0, ["".join(["A", "nn"])])
+                         for _ in range(2))
+        self.assertFalse(hasattr(first, "__dict__"))
+        self.assertIs(first.status, second.status)
+        self.assertIs(first.assignees[0], second.assignees[0])
+        self.assertIsInstance(first.assignees, tuple)
+
+    def test_columns_follow_the_task_list(self):
+        tasks = [make_task("a", priority=3), tmc.Task("b", "bad", "Blocked", 10 ** 30, 50, [])]
+        columns = tmc.TaskColumns(tasks)
+        self.assertEqual(list(columns.priority), [3, tmc.TaskColumns.INT_MAX])
+        self.assertEqual(list(columns.end_ord), [tmc.date(2025, 1, 1).toordinal(), 0])
+        self.assertEqual([columns.status_names[code] for code in columns.status], ["Not Started", "Blocked"])
+        tasks[0] = tmc.Task("a", "2025-02-01", "Completed", 1, 100, [])
+        columns.update(0)
+        tasks.append(tmc.Task("c", "2025-01-05", "Blocked", 2, 5, []))
+        columns.update(2)
+        fresh = tmc.TaskColumns(tasks)
+        for name in ("priority", "progress", "end_ord", "status"):
+            self.assertEqual(getattr(columns, name), getattr(fresh, name), name)
+        self.assertEqual(len(columns), 3)
+
+###############################################################################
+# Lazy loading
+###############################################################################
+class LazyLoadTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.filename = self.path("data.json")
+        data = tmc.load_data(self.filename)
+        for u in range(3):
+            tasks = benchmarks.make_tasks(20, seed=u)
+            tasks.append(tmc.Task("r", "2025-1-6", "Not Started", 1, 0, ["Ann"], tmc.Recurrence("weekly"),
+                                  depends_on=(0,)))
+            data["users"].append({"email": f"u{u}@example.com", "password": "password1", "tasks": tasks,
+                                  "views": [{"name": "v", "criteria": {"status": "Completed"}}]})
+        tmc.compact_data(data, self.filename)
+
+    def assert_same_as_eager(self, lazy):
+        eager = tmc.load_data(self.filename)
+        self.assertEqual(lazy.get("seq"), eager.get("seq"))
+        for lazy_user, eager_user in zip(lazy["users"], eager["users"]):
+            self.assertEqual(dict(lazy_user, tasks=None), dict(eager_user, tasks=None))
+            self.assertEqual(lazy_user["tasks"], eager_user["tasks"])
+
+    def test_tasks_are_parsed_on_first_access(self):
+        lazy = tmc.load_data(self.filename, lazy=True)
+        self.assertTrue(all(isinstance(user, tmc.LazyUser) for user in lazy["users"]))
+        self.assertEqual(lazy["users"][1]["email"], "u1@example.com")
+        self.assertFalse(any(user.loaded for user in lazy["users"]))
+        self.assertEqual(len(lazy["users"][1]["tasks"]), 21)
+        self.assertEqual([user.loaded for user in lazy["users"]], [False, True, False])
+        self.assert_same_as_eager(lazy)
+
+    def test_journal_records_wait_for_the_parse(self):
+        data = tmc.load_data(self.filename)
+        task = make_task("edited")
+        data["users"][2]["tasks"][5] = task
+        tmc.save_data(data, self.filename, tmc.put_task_change(2, 5, task))
+        tmc.save_data(data, self.filename, tmc.delete_tasks_change(2, [0], 21))
+        lazy = tmc.load_data(self.filename, lazy=True)
+        self.assertEqual(len(lazy["users"][2].deferred), 2)
+        self.assertEqual(lazy["users"][2]["tasks"][4].name, "edited")
+        self.assertEqual(lazy["users"][2]["tasks"][-1].depends_on, ())
+        self.assert_same_as_eager(lazy)
+
+    def test_snapshot_rewritten_elsewhere_is_reparsed(self):
+        lazy = tmc.load_data(self.filename, lazy=True)
+        data = tmc.load_data(self.filename)
+        data["users"][0]["tasks"].append(make_task("added"))
+        tmc.compact_data(data, self.filename)
+        self.assertEqual(lazy["users"][0]["tasks"][-1].name, "added")
+        self.assertEqual(tmc.load_data(self.filename, lazy=True)["users"][0]["tasks"], data["users"][0]["tasks"])
+
+###############################################################################
+# Sorting
+###############################################################################
+class SortedIndexTests(unittest.TestCase):
+    def assert_sorted(self, index, tasks):
+        expected = sorted(range(len(tasks)), key=lambda i: tmc.task_sort_key(tasks[i], index.sort_keys) + (i,))
+        self.assertEqual(list(index), expected)
+        self.assertEqual([index.index(i) for i in expected], list(range(len(tasks))))
+
+    def test_edits_keep_order(self):
+        tasks = benchmarks.make_tasks(300, seed=9)
+        index = tmc.SortedTaskIndex(tasks, ["status", "end_date", "name"])
+        self.assert_sorted(index, tasks)
+        last = index[-1]
+        tasks[last] = tmc.Task("aaa", "2000-01-01", "Not Started", 1, 0, [])
+        index.update(last)
+        self.assertEqual(index[0], last)
+        tasks.append(tmc.Task("zzz", "bad date", "Completed", 1, 0, []))
+        index.update(len(tasks) - 1)
+        self.assertEqual(index[-1], len(tasks) - 1)
+        for task_index in (5, 17, 120):
+            tasks[task_index] = tasks[task_index + 1]
+            index.update(task_index)
+        self.assert_sorted(index, tasks)
+
+    def test_ties_keep_task_order(self):
+        tasks = [make_task(f"t{i}", priority=i % 2) for i in range(6)]
+        index = tmc.SortedTaskIndex(tasks, ["priority"])
+        self.assertEqual(list(index), [0, 2, 4, 1, 3, 5])
+        tasks[4] = make_task("t4", priority=1)
+        index.update(4)
+        self.assertEqual(list(index), [0, 2, 1, 3, 4, 5])
+        index.set_order(["name"])
+        self.assertEqual(list(index), list(range(6)))
+        with self.assertRaises(ValueError):
+            index.index(6)
+
+###############################################################################
+# Calendar date index
+###############################################################################
+class DateIndexTests(unittest.TestCase):
+    def task(self, end_date):
+        return tmc.Task(end_date, end_date, "Not Started", 1, 0, [])
+
+    def assert_matches_scan(self, index, tasks, start, end):
+        start_ord, end_ord = tmc.date_ordinal(start), tmc.date_ordinal(end)
+        days = {}
+        for i, task in enumerate(tasks):
+            if task.recurrence is None and task.end_ord is not None and start_ord <= task.end_ord <= end_ord:
+                days.setdefault(task.end_ord, []).append(i)
+        self.assertEqual(index.between(start_ord, end_ord), sorted(days.items()))
+
+    def test_range_limits_are_inclusive(self):
+        tasks = [self.task(d) for d in ["2025-05-31", "2025-06-01", "2025-06-15", "2025-06-30", "2025-07-01",
+                                        "2025-06-15", "not a date"]]
+        index = tmc.DateBucketIndex(tasks)
+        june = index.between(tmc.date_ordinal("2025-06-01"), tmc.date_ordinal("2025-06-30"))
+        self.assertEqual([(tmc.ordinal_to_date(day), ids) for day, ids in june],
+                         [("2025-06-01", [1]), ("2025-06-15", [2, 5]), ("2025-06-30", [3])])
+        self.assertEqual(index.between(tmc.date_ordinal("2025-06-02"), tmc.date_ordinal("2025-06-14")), [])
+        self.assertEqual(index.between(tmc.date_ordinal("2025-07-01"), tmc.date_ordinal("2025-06-01")), [])
+        for start, end in [("2025-06-15", "2025-06-15"), ("2025-01-01", "2025-12-31"), ("2025-07-01", "2025-07-07")]:
+            self.assert_matches_scan(index, tasks, start, end)
+
+    def test_updates_refile_tasks(self):
+        tasks = benchmarks.make_tasks(200, seed=4)
+        index = tmc.DateBucketIndex(tasks)
+        for task_index, end_date in [(3, "2025-02-14"), (40, "bad"), (41, tasks[42].end_date), (7, "2025-02-14")]:
+            tasks[task_index] = self.task(end_date)
+            index.update(task_index)
+        tasks.append(self.task("2025-02-14"))
+        index.update(len(tasks) - 1)
+        tasks[10] = tmc.Task("r", "2025-02-14", "Not Started", 1, 0, [], tmc.Recurrence("daily"))
+        index.update(10)
+        self.assertEqual(index.recurring, {10})
+        self.assert_matches_scan(index, tasks, "2024-01-01", "2026-12-31")
+        fresh = tmc.DateBucketIndex(tasks)
+        self.assertEqual((index.buckets, index.days), (fresh.buckets, fresh.days))
+
+###############################################################################
+# Search
+###############################################################################
+def scan_search(tasks, query):
+    """
+    TaskSearchIndex.search() done the slow way, for comparison.
+    """
+    words = tmc.search_tokens(query)
+    if not words:
+        return []
+    exact, prefix, other = [], [], []
+    for i, task in enumerate(tasks):
+        name_tokens, assignee_tokens = tmc.task_search_tokens(task)
+        if not all(any(t.startswith(w) for t in name_tokens | assignee_tokens) for w in words):
+            continue
+        if words <= name_tokens:
+            exact.append(i)
+        elif all(any(t.startswith(w) for t in name_tokens) for w in words):
+            prefix.append(i)
+        else:
+            other.append(i)
+    return exact + prefix + other
+
+class SearchIndexTests(unittest.TestCase):
+    QUERIES = ["", "task", "TASK 1", "1", "task 12 al", "bob", "bo", "ali car", "plan", "plan bob",
+               "review ann", "zzz", "1 2", "grace task 3"]
+
+    def test_ranking(self):
+        tasks = [tmc.Task(name, "2025-01-01", "Not Started", 1, 0, assignees) for name, assignees in [
+            ("Planning review", ["Bob"]), ("Plan", []), ("Bobsled trip", []), ("Review plan", ["Ann"]),
+            ("Weekly plans", ["Bob"])]]
+        index = tmc.TaskSearchIndex(tasks)
+        self.assertEqual(index.search("plan"), [1, 3, 0, 4])
+        self.assertEqual(index.search("bob"), [2, 0, 4])
+        self.assertEqual(index.search("Plan BOB"), [0, 4])
+        self.assertEqual(index.search("review an"), [3])
+        self.assertEqual(index.search("  "), [])
+
+    def test_matches_scan_through_edits(self):
+        tasks = benchmarks.make_tasks(400, seed=6)
+        tasks[5] = tmc.Task("Plan review", "2025-01-01", "Not Started", 1, 0, ["Ann", "Bob"])
+        index = tmc.TaskSearchIndex(tasks)
+        for query in self.QUERIES:
+            self.assertEqual(index.search(query), scan_search(tasks, query), query)
+        # Tokens come and go with edits
+        tasks[5] = make_task("Quarterly zzz")
+        index.update(5)
+        tasks.append(tmc.Task("Review 12 alpha", "2025-01-01", "Not Started", 1, 0, ["Grace"]))
+        index.update(len(tasks) - 1)
+        self.assertNotIn("plan", index.vocabulary)
+        self.assertIn("zzz", index.vocabulary)
+        for query in self.QUERIES:
+            self.assertEqual(index.search(query), scan_search(tasks, query), query)
+        self.assertEqual(index.vocabulary, tmc.TaskSearchIndex(tasks).vocabulary)
+
+###############################################################################
+# Virtual task list
+###############################################################################
+class RecordingTreeview(benchmarks.StubTreeview):
+    """
+    A StubTreeview that also counts inserts and value updates and keeps the
+    focused row.
+    """
+    def __init__(self):
+        super().__init__()
+        self.drawn = 0
+        self.focused = ""
+
+    def insert(self, parent, index, iid, values):
+        self.drawn += 1
+        super().insert(parent, index, iid, values)
+
+    def item(self, iid, values):
+        self.drawn += 1
+        super().item(iid, values)
+
+    def selection_set(self, iid):
+        self.focused = iid
+
+    def focus(self, iid=None):
+        if iid is None:
+            return self.focused
+        self.focused = iid
+
+class RecordingScrollbar:
+    def set(self, first, last):
+        self.position = (first, last)
+
+class VirtualListTests(unittest.TestCase):
+    def setUp(self):
+        self.tasks = [make_task(f"t{i}") for i in range(100)]
+        task_list = self.task_list = tmc.VirtualTaskList.__new__(tmc.VirtualTaskList)
+        task_list.get_task = self.tasks.__getitem__
+        task_list.height = 10
+        task_list.rows = []
+        task_list.offset = 0
+        task_list.rendered = {}
+        task_list.tree = RecordingTreeview()
+        task_list.scrollbar = RecordingScrollbar()
+
+    def shown(self):
+        return [int(iid) for iid in self.task_list.tree.get_children()]
+
+    def test_only_rows_in_view_are_drawn(self):
+        task_list = self.task_list
+        task_list.set_rows(list(range(100)))
+        self.assertEqual(self.shown(), list(range(10)))
+        self.assertEqual(task_list.scrollbar.position, (0, 0.1))
+        task_list.scroll(3)
+        self.assertEqual(self.shown(), list(range(3, 13)))
+        # Only the three rows scrolled into view were drawn
+        self.assertEqual(task_list.tree.drawn, 13)
+        self.assertEqual(sorted(task_list.rendered, key=int), [str(i) for i in range(3, 13)])
+
+    def test_offset_is_clamped(self):
+        task_list = self.task_list
+        task_list.set_rows(list(range(100)))
+        task_list.scroll(1000)
+        self.assertEqual((task_list.offset, self.shown()[-1]), (90, 99))
+        self.assertEqual(task_list.scrollbar.position, (0.9, 1.0))
+        self.assertEqual(task_list.scroll(-1000), "break")
+        self.assertEqual(task_list.offset, 0)
+        task_list.on_scrollbar("moveto", "0.5")
+        self.assertEqual(task_list.offset, 50)
+        task_list.on_scrollbar("scroll", "1", "pages")
+        self.assertEqual(task_list.offset, 60)
+        task_list.on_scrollbar("scroll", "-2", "units")
+        self.assertEqual(task_list.offset, 58)
+        task_list.set_rows(list(range(5)))
+        self.assertEqual((task_list.offset, self.shown()), (0, list(range(5))))
+        task_list.set_rows([])
+        self.assertEqual((self.shown(), task_list.scrollbar.position), ([], (0, 1)))
+
+    def test_reorder_moves_rows_and_redraws_changed(self):
+        task_list = self.task_list
+        task_list.set_rows(list(range(100)))
+        drawn = task_list.tree.drawn
+        self.tasks[4] = make_task("renamed")
+        task_list.set_rows(list(range(9, -1, -1)) + list(range(10, 100)), changed=[4])
+        self.assertEqual(self.shown(), list(range(9, -1, -1)))
+        self.assertEqual(task_list.tree.drawn, drawn + 1)
+        self.assertEqual(task_list.tree.values["4"][0], "renamed")
+
+    def test_show_and_arrow_keys_scroll(self):
+        task_list = self.task_list
+        task_list.set_rows(list(range(100)))
+        task_list.show(75)
+        self.assertEqual((task_list.offset, task_list.tree.focused), (70, "75"))
+        task_list.tree.focus("79")
+        self.assertEqual(task_list.on_arrow_key(1), "break")
+        self.assertEqual((task_list.offset, task_list.tree.focused), (71, "80"))
+        task_list.tree.focus("75")
+        self.assertIsNone(task_list.on_arrow_key(1))
+        task_list.show(500)
+        self.assertEqual(task_list.offset, 71)
+
+###############################################################################
+# Background saves
+###############################################################################
+class PersistenceWorkerTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.filename = self.path("data.json")
+        self.data = self.new_store(self.filename, 3)
+        self.writes = []
+        append_journal = tmc.append_journal
+
+        def recording_append(lines, filename):
+            self.writes.append(list(lines))
+            return append_journal(lines, filename)
+
+        self.recording_append = recording_append
+        patcher = mock.patch.object(tmc, "append_journal", side_effect=recording_append)
+        self.append_journal = patcher.start()
+        self.addCleanup(patcher.stop)
+        # Long enough that nothing is written until flush()
+        self.worker = tmc.PersistenceWorker(self.data, self.filename, debounce=60)
+        self.addCleanup(self.worker.stop)
+
+    def edit(self, task_index, name):
+        tasks = self.data["users"][0]["tasks"]
+        with self.worker.lock:
+            tasks[task_index] = task = make_task(name)
+            self.worker.submit(tmc.put_task_change(0, task_index, task))
+
+    def test_edits_are_coalesced_into_one_write(self):
+        for i, name in enumerate(["a", "b", "c"]):
+            self.edit(i, name)
+        self.edit(0, "d")
+        self.assertEqual(self.writes, [])
+        self.assertTrue(self.worker.flush(5))
+        self.assertEqual(len(self.writes), 1)
+        self.assertEqual(len(self.writes[0]), 4)
+        self.assertEqual(task_names(tmc.load_data(self.filename)), ["d", "b", "c"])
+        self.assertTrue(self.worker.flush(5))
+        self.assertEqual(len(self.writes), 1)
+
+    def test_failed_write_is_kept_for_the_next_flush(self):
+        self.append_journal.side_effect = OSError("disk full")
+        self.edit(1, "x")
+        self.assertFalse(self.worker.flush(5))
+        self.assertIsInstance(self.worker.errors.get_nowait(), OSError)
+        self.append_journal.side_effect = self.recording_append
+        self.edit(2, "y")
+        self.assertTrue(self.worker.flush(5))
+        # Both edits, the failed one included, went out in the retry
+        self.assertEqual(len(self.writes[-1]), 2)
+        self.assertEqual(task_names(tmc.load_data(self.filename)), ["t0", "x", "y"])
+
+###############################################################################
+# Filter engine
+###############################################################################
+class FilterIndexTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tasks = benchmarks.make_tasks(400, seed=3)
+        # Unparsable dates are never before a cutoff
+        self.tasks.append(tmc.Task("bad date", "07/01/2025", "Not Started", 1, 0, ["Alice"]))
+        self.index = tmc.TaskFilterIndex(self.tasks)
+
+    def assert_matches_scan(self, **criteria):
+        task_filter = tmc.TaskFilter(**criteria)
+        expected = [i for i, task in enumerate(self.tasks) if task_filter.matches(task)]
+        self.assertEqual(self.index.select(task_filter), expected, criteria)
+        return expected
+
+    def test_select_matches_scan(self):
+        self.assertEqual(len(self.assert_matches_scan()), len(self.tasks))
+        cutoff = self.assert_matches_scan(end_date="2025-07-01")
+        self.assertTrue(0 < len(cutoff) < len(self.tasks))
+        self.assertNotIn(len(self.tasks) - 1, cutoff)
+        # The cutoff day itself is included
+        on_cutoff = [i for i, task in enumerate(self.tasks) if task.end_date == "2025-07-01"]
+        self.assertTrue(on_cutoff and set(on_cutoff) <= set(cutoff))
+        self.assert_matches_scan(status="In Progress", max_priority="4")
+        self.assert_matches_scan(min_progress="50")
+        # Assignee tokens are case-insensitive substrings, any one enough
+        tokens = self.assert_matches_scan(assignees="ALI, ank")
+        self.assertTrue(any("Frank" in self.tasks[i].assignees for i in tokens))
+        self.assert_matches_scan(assignees="nobody")
+        self.assert_matches_scan(end_date="2025-08-01", status="Completed", min_progress="100", assignees="bob")
+
+    def test_select_follows_updates(self):
+        self.tasks[5] = tmc.Task("moved", "2024-01-01", "Completed", 1, 100, ["Zed"])
+        self.index.update(5)
+        self.tasks.append(tmc.Task("new", "2024-01-02", "Completed", 1, 100, ["zedd"]))
+        self.index.update(len(self.tasks) - 1)
+        self.assertEqual(self.assert_matches_scan(assignees="zed"), [5, len(self.tasks) - 1])
+        self.assert_matches_scan(end_date="2024-06-01", status="Completed")
+
+    def test_invalid_numbers_match_nothing_in_the_window(self):
+        for criteria in ({"max_priority": "high"}, {"min_progress": "lots"}, {"end_date": "tomorrow"}):
+            with self.assertRaises(ValueError):
+                tmc.TaskFilter(**criteria)
+        filename = self.path("data.json")
+        data = self.new_store(filename, 3)
+        view = headless_task_view(data, filename)
+        self.addCleanup(view.master.persistence.stop)
+        window = headless_filter_window(view, max_priority="high")
+        with mock.patch.object(tmc.messagebox, "showinfo") as showinfo:
+            window.apply_filter()
+        showinfo.assert_called_once()
+        self.assertEqual(view.filtered_tasks, [])
+        self.assertEqual(list(view.task_list.rows), [])
+        window = headless_filter_window(view, max_priority="1")
+        window.apply_filter()
+        self.assertEqual(list(view.task_list.rows), [0, 1, 2])
+
+###############################################################################
+# Instrumentation
+###############################################################################
+class InstrumentationTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.saved = tmc.INSTRUMENTS
+        tmc.INSTRUMENTS = tmc.Instrumentation(enabled=True, samples=100)
+        self.addCleanup(setattr, tmc, "INSTRUMENTS", self.saved)
+
+    def test_percentiles_over_ring_buffer(self):
+        for ms in range(1, 201):
+            tmc.INSTRUMENTS.record("op", float(ms), {"bytes": 10})
+        row = tmc.INSTRUMENTS.summary()["op"]
+        # Only the last 100 samples (101..200) are kept
+        self.assertEqual(row["count"], 100)
+        self.assertEqual((row["p50"], row["p99"], row["max"]), (151.0, 200.0, 200.0))
+        self.assertEqual(row["bytes"], 10)
+
+    def test_timed_hot_paths_and_trace_export(self):
+        filename = self.path("data.json")
+        data = self.new_store(filename, 2)
+        task = make_task("new")
+        data["users"][0]["tasks"].append(task)
+        tmc.save_data(data, filename, tmc.put_task_change(0, 2, task))
+        summary = tmc.INSTRUMENTS.summary()
+        self.assertIn("load_data", summary)
+        self.assertGreater(summary["journal_append"]["bytes"], 0)
+
+        trace = self.path("trace.jsonl")
+        count = tmc.INSTRUMENTS.export_trace(trace)
+        with open(trace, encoding="utf-8") as f:
+            samples = [json.loads(line) for line in f]
+        self.assertEqual(len(samples), count)
+        self.assertEqual(samples, sorted(samples, key=lambda sample: sample["time"]))
+        self.assertIn("journal_append", {sample["name"] for sample in samples})
+
+    def test_filter_window_open_is_timed(self):
+        filename = self.path("data.json")
+        view = headless_task_view(self.new_store(filename, 2), filename)
+        self.addCleanup(view.master.persistence.stop)
+        idle = []
+        # The window as far as timing goes; the real one needs a display
+        window = types.SimpleNamespace(after_idle=idle.append)
+        with mock.patch.object(tmc, "FilterWindow", return_value=window) as opened:
+            view.open_filter_window()
+        opened.assert_called_once_with(view)
+        self.assertNotIn("open_filter_window", tmc.INSTRUMENTS.summary())
+        for callback in idle:
+            callback()
+        self.assertEqual(tmc.INSTRUMENTS.summary()["open_filter_window"]["count"], 1)
+
+    @unittest.skipUnless(HAVE_DISPLAY, "needs a display")
+    def test_real_filter_window_open_is_timed(self):
+        filename = self.path("data.json")
+        data = self.new_store(filename, 2)
+        root = tmc.tk.Tk()
+        self.addCleanup(root.destroy)
+        root.withdraw()
+        root.persistence = tmc.PersistenceWorker(data, filename, debounce=0)
+        self.addCleanup(root.persistence.stop)
+        root.client = None
+        tmc.TaskViewFrame(root, data, 0).open_filter_window()
+        root.update()
+        self.assertEqual(tmc.INSTRUMENTS.summary()["open_filter_window"]["count"], 1)
+
+    def test_nothing_recorded_when_disabled(self):
+        tmc.INSTRUMENTS.enabled = False
+        with tmc.timed("op"):
+            pass
+        self.assertEqual(tmc.INSTRUMENTS.summary(), {})
+
+###############################################################################
+# Passwords
+###############################################################################
+class PasswordTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        # Cheap costs: the checks are the same at any cost
+        for name, value in [("SCRYPT_N", 2 ** 4), ("PBKDF2_ITERATIONS", 10)]:
+            patcher = mock.patch.object(tmc, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def without_scrypt(self):
+        return mock.patch.object(tmc, "hashlib", types.SimpleNamespace(pbkdf2_hmac=tmc.hashlib.pbkdf2_hmac))
+
+    def test_scrypt_round_trip(self):
+        record = tmc.hash_password("password1")
+        self.assertTrue(record.startswith("scrypt$16$"))
+        self.assertEqual(tmc.check_password("password1", record), (True, None))
+        self.assertEqual(tmc.check_password("password2", record), (False, None))
+
+    def test_pbkdf2_round_trip(self):
+        with self.without_scrypt():
+            record = tmc.hash_password("password1")
+            self.assertTrue(record.startswith("pbkdf2_sha256$10$"))
+            self.assertEqual(tmc.check_password("password1", record), (True, None))
+            self.assertEqual(tmc.check_password("password2", record), (False, None))
+
+    def test_other_cost_is_rehashed(self):
+        record = tmc.hash_password("password1")
+        with mock.patch.object(tmc, "SCRYPT_N", 2 ** 5):
+            matches, upgraded = tmc.check_password("password1", record)
+        self.assertTrue(matches)
+        self.assertTrue(upgraded.startswith("scrypt$32$"))
+
+    def test_plaintext_is_upgraded(self):
+        matches, upgraded = tmc.check_password("password1", "password1")
+        self.assertTrue(matches)
+        self.assertTrue(tmc.is_password_hash(upgraded))
+        self.assertEqual(tmc.check_password("password1", upgraded), (True, None))
+        self.assertEqual(tmc.check_password("password2", "password1"), (False, None))
+
+    def test_damaged_record_is_reported(self):
+        good = tmc.hash_password("password1")
+        for record in ["scrypt$", "scrypt$16$8$1$c2FsdA==", "scrypt$x$8$1$c2FsdA==$aGFzaA==",
+                       "scrypt$3$8$1$c2FsdA==$aGFzaA==", good[:-6] + "!!!!!!", "pbkdf2_sha256$$c2FsdA==$aGFzaA=="]:
+            with self.assertRaisesRegex(ValueError, "damaged"):
+                tmc.check_password("password1", record)
+
+    def login_frame(self, filename, data):
+        frame = tmc.LoginFrame.__new__(tmc.LoginFrame)
+        frame.data = data
+        frame.winfo_exists = lambda: True
+        frame.set_busy = lambda message: None
+        frame.master = types.SimpleNamespace(persistence=tmc.PersistenceWorker(data, filename, debounce=0),
+                                             logged_in=[])
+        frame.master.show_task_view = frame.master.logged_in.append
+        self.addCleanup(frame.master.persistence.stop)
+        return frame
+
+    def login(self, frame, password):
+        record = frame.data["users"][0]["password"]
+        future = tmc.kdf_pool().submit(tmc.check_password, password, record)
+        future.exception()
+        with mock.patch.object(tmc, "messagebox") as messagebox:
+            frame.login_checked(0, record, future)
+        return messagebox
+
+    def test_login_stores_upgraded_plaintext(self):
+        filename = self.path("data.json")
+        frame = self.login_frame(filename, self.new_store(filename))
+        messagebox = self.login(frame, "password2")
+        messagebox.showerror.assert_called_once_with("Error", "Incorrect password.")
+        self.assertEqual(frame.master.logged_in, [])
+        self.login(frame, "password1")
+        self.assertEqual(frame.master.logged_in, [0])
+        frame.master.persistence.flush()
+        record = tmc.load_data(filename)["users"][0]["password"]
+        self.assertTrue(tmc.is_password_hash(record))
+        self.assertEqual(tmc.check_password("password1", record), (True, None))
+
+    def test_login_with_damaged_record_shows_error(self):
+        filename = self.path("data.json")
+        data = self.new_store(filename)
+        data["users"][0]["password"] = "scrypt$16$8$1$c2FsdA=="
+        frame = self.login_frame(filename, data)
+        messagebox = self.login(frame, "password1")
+        (title, message), _ = messagebox.showerror.call_args
+        self.assertIn("damaged", message)
+        self.assertEqual(frame.master.logged_in, [])
+
+    def test_server_login_with_damaged_record_fails(self):
+        filename = self.path("data.json")
+        data = self.new_store(filename)
+        data["users"][0]["password"] = "scrypt$16$8$1$c2FsdA=="
+        tmc.save_data(data, filename)
+        server = tmc.TaskServer(filename)
+        self.addCleanup(server.persistence.stop)
+
+        async def login():
+            server.loop = tmc.asyncio.get_running_loop()
+            line = json.dumps({"id": 1, "op": "login", "email": "me@example.com", "password": "password1"})
+            return await server.dispatch(tmc.TaskSession(None), line)
+
+        reply = tmc.asyncio.run(login())
+        self.assertFalse(reply["ok"])
+        self.assertIn("damaged", reply["error"])
+
+###############################################################################
+# Benchmark results
+###############################################################################
+class BenchmarkResultTests(unittest.TestCase):
+    def run_tiny(self, rows):
+        def tiny():
+            benchmarks.print_table("Tiny (ms)", ("tasks", "time", "other"), rows)
+        with mock.patch.dict(benchmarks.BENCHMARKS, {"tiny": tiny}), contextlib.redirect_stdout(io.StringIO()):
+            return benchmarks.json_safe(benchmarks.run_benchmarks(["tiny"]))
+
+    def test_skipped_measurements_become_null(self):
+        results = self.run_tiny([(10, 1.5, float("nan")), (100, float("nan"), 2.0)])
+        self.assertEqual(results["benchmarks"]["tiny"][0]["rows"], [[10, 1.5, None], [100, None, 2.0]])
+        self.assertEqual(json.loads(json.dumps(results, allow_nan=False)), results)
+        self.assertEqual(results["cpus"], os.cpu_count())
+
+    def test_compare_prints_ratios_and_changed_counts(self):
+        baseline = self.run_tiny([(10, 2.0, 4.0), (100, 1.0, float("nan"))])
+        current = self.run_tiny([(10, 1.0, 4.0), (200, 3.0, 1.0)])
+        current["benchmarks"]["other"] = baseline["benchmarks"]["tiny"]
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            benchmarks.compare_results(baseline, current)
+        self.assertEqual(out.getvalue().splitlines(), [
+            "Tiny (ms): current / baseline",
+            "  10: time 0.50x, other 1.00x",
+            "  200: tasks 100 -> 200, time 3.00x",
+            ""])
+        # Tables whose columns changed are not compared
+        current["benchmarks"]["tiny"][0]["columns"] = ["tasks", "time", "renamed"]
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            benchmarks.compare_results(baseline, current)
+        self.assertEqual(out.getvalue(), "")
+
+###############################################################################
+# Task server
+###############################################################################
+class ServerTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(tmc, "SCRYPT_N", 2 ** 4)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.filename = self.path("data.json")
+        self.new_store(self.filename, 2)
+        self.server = tmc.TaskServer(self.filename)
+        ready = tmc.threading.Event()
+        thread = tmc.threading.Thread(
+            target=lambda: tmc.asyncio.run(self.server.serve("127.0.0.1", 0, ready.set)), daemon=True
+        )
+        thread.start()
+        self.assertTrue(ready.wait(5))
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(self.server.stop)
+
+    def connect(self, password="password1"):
+        client = tmc.TaskClient("127.0.0.1", self.server.port)
+        self.addCleanup(client.stop)
+        client.logged_in(client.request("login", email="me@example.com", password=password).result(5))
+        return client
+
+    def test_edits_reach_other_sessions(self):
+        first, second = self.connect(), self.connect()
+        self.assertEqual([task.name for task in second.tasks], ["t0", "t1"])
+        first.request("put_task", task_index=1, task=make_task("renamed").to_dict()).result(5)
+        reply = first.request("create_task", task=make_task("added").to_dict()).result(5)
+        self.assertEqual(reply["change"]["task_index"], 2)
+        changes = [second.changes.get(timeout=5) for _ in range(2)]
+        self.assertEqual([(c["change"]["task_index"], c["change"]["task"]["name"]) for c in changes],
+                         [(1, "renamed"), (2, "added")])
+        self.assertEqual(second.request("tasks").result(5)["tasks"][1]["name"], "renamed")
+        self.assertTrue(first.stop() and second.stop())
+        self.assertTrue(self.server.persistence.flush(5))
+        self.assertEqual(task_names(tmc.load_data(self.filename)), ["t0", "renamed", "added"])
+
+    def test_bad_password_is_refused(self):
+        client = tmc.TaskClient("127.0.0.1", self.server.port)
+        self.addCleanup(client.stop)
+        future = client.request("login", email="me@example.com", password="password2")
+        with self.assertRaisesRegex(tmc.ServerError, "Incorrect password"):
+            future.result(5)
+        with self.assertRaisesRegex(tmc.ServerError, "log in first"):
+            client.request("put_task", task_index=0, task=make_task("x").to_dict()).result(5)
+
+    def test_invalid_edit_is_refused(self):
+        client = self.connect()
+        with self.assertRaisesRegex(tmc.ServerError, "no longer exists"):
+            client.request("put_task", task_index=5, task=make_task("x").to_dict()).result(5)
+        with self.assertRaises(tmc.ServerError):
+            client.request("create_task", task=dict(make_task("x").to_dict(), status="Done")).result(5)
+
+###############################################################################
+# Deadline reminders
+###############################################################################
+class FakeTimer:
+    """
+    Stands in for a Tk widget's after()/after_cancel(): keeps the pending
+    callbacks so a test can run the next one.
+    """
+    def __init__(self):
+        self.jobs = {}
+        self.next_id = 0
+
+    def after(self, ms, callback):
+        self.next_id += 1
+        self.jobs[self.next_id] = (ms, callback)
+        return self.next_id
+
+    def after_cancel(self, job):
+        del self.jobs[job]
+
+    def delay(self):
+        (ms, _), = self.jobs.values()
+        return ms
+
+    def run(self):
+        (job, (_, callback)), = self.jobs.items()
+        del self.jobs[job]
+        callback()
+
+class ReminderTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        # Noon on 2025-06-10
+        self.now = tmc.start_of_day(tmc.date(2025, 6, 10).toordinal()) + 12 * 3600
+        self.timer = FakeTimer()
+        self.notified = []
+
+    def task(self, end_date, status="Not Started"):
+        return tmc.Task(end_date, end_date, status, 1, 0, [])
+
+    def scheduler(self, tasks):
+        return tmc.ReminderScheduler(tasks, self.timer, self.notified.append, clock=lambda: self.now)
+
+    def test_past_reminders_are_delivered_once_at_start(self):
+        tasks = [self.task("2025-06-01"), self.task("2025-06-11"), self.task("2025-06-01", "Completed"),
+                 self.task("2025-07-01"), self.task("")]
+        scheduler = self.scheduler(tasks)
+        self.assertEqual(self.timer.delay(), 0)
+        self.timer.run()
+        self.assertEqual(sorted(self.notified[0]), [("due_soon", 1), ("overdue", 0)])
+        # Next: task 1 becomes overdue at midnight after its end date
+        self.assertEqual(scheduler.heap[0][:2], (tmc.start_of_day(tmc.date(2025, 6, 12).toordinal()), 1))
+        self.assertEqual(self.timer.delay(), tmc.REMINDER_MAX_SLEEP_MS)
+
+    def test_edits_reschedule_without_stale_reminders(self):
+        tasks = [self.task("2025-06-20")]
+        scheduler = self.scheduler(tasks)
+        tasks[0] = self.task("2025-06-12")
+        scheduler.update(0)
+        tasks.append(self.task("2025-06-30"))
+        scheduler.update(1)
+        # Task 0's reminders now start at midnight
+        self.assertEqual(scheduler.heap[0][:2], (self.now + 12 * 3600, 0))
+        # Wake up at each midnight through 2025-07-01
+        for ordinal in range(tmc.date(2025, 6, 11).toordinal(), tmc.date(2025, 7, 2).toordinal()):
+            self.now = tmc.start_of_day(ordinal)
+            self.timer.run()
+        fired = [reminder for due in self.notified for reminder in due]
+        self.assertEqual(fired, [("due_soon", 0), ("overdue", 0), ("due_soon", 1), ("overdue", 1)])
+        self.assertEqual(scheduler.heap, [])
+
+    def test_completing_a_task_cancels_its_reminders(self):
+        tasks = [self.task("2025-06-15")]
+        scheduler = self.scheduler(tasks)
+        tasks[0] = self.task("2025-06-15", "Completed")
+        scheduler.update(0)
+        self.assertEqual(self.timer.jobs, {})
+        self.assertEqual(scheduler.heap, [])
+
+    def test_sqlite_store_reads_only_open_tasks(self):
+        tasks = [self.task("2025-06-01"), self.task("2025-06-11"), self.task("2025-06-01", "Completed"),
+                 self.task("2025-07-01"), self.task("")]
+        filename = self.path("data.db")
+        data = tmc.load_data(filename)
+        data["users"].append({"email": "me@example.com", "password": "password1", "tasks": tasks})
+        tmc.save_data(data, filename)
+        stored = tmc.load_data(filename)["users"][0]["tasks"]
+        self.assertEqual([i for i, _ in stored.open_tasks()], [0, 1, 3])
+        with mock.patch.object(tmc.SqliteTaskList, "__iter__", side_effect=AssertionError):
+            heap = self.scheduler(stored).heap
+        self.assertEqual(sorted(heap), sorted(self.scheduler(tasks).heap))
+
+    def test_sleep_is_capped(self):
+        self.scheduler([self.task("2026-01-01")])
+        self.assertEqual(self.timer.delay(), tmc.REMINDER_MAX_SLEEP_MS)
+        self.timer.run()
+        self.assertEqual(self.notified, [])
+        self.assertEqual(len(self.timer.jobs), 1)
+
+    def test_recurring_task_reminds_one_occurrence_at_a_time(self):
+        weekly = tmc.Recurrence("weekly")
+        # Due 2025-06-02, 06-09, 06-16, ...; 06-09 was missed
+        tasks = [tmc.Task("gym", "2025-06-02", "Not Started", 1, 0, [], weekly)]
+        scheduler = self.scheduler(tasks)
+        self.timer.run()
+        self.assertEqual(self.notified, [[("overdue", 0)]])
+        self.assertEqual([entry[0] for entry in scheduler.heap],
+                         [tmc.start_of_day(tmc.date(2025, 6, 15).toordinal()),
+                          tmc.start_of_day(tmc.date(2025, 6, 17).toordinal())])
+        # Completing 06-16 moves on to 06-23
+        tasks[0] = tasks[0].with_override(tmc.date(2025, 6, 16).toordinal(), "Completed", 100)
+        scheduler.update(0)
+        self.assertEqual(self.timer.delay(), tmc.REMINDER_MAX_SLEEP_MS)
+        self.assertEqual(min(entry[0] for entry in scheduler.heap if scheduler.is_current(entry)),
+                         tmc.start_of_day(tmc.date(2025, 6, 22).toordinal()))
+
+###############################################################################
+# Recurring tasks
+###############################################################################
+def ordinals(*dates):
+    return [tmc.date_ordinal(d) for d in dates]
+
+class RecurrenceTests(StorageTestCase):
+    def dates(self, recurrence, first, start, end):
+        days = recurrence.dates(tmc.date_ordinal(first), tmc.date_ordinal(start), tmc.date_ordinal(end))
+        return [tmc.ordinal_to_date(day) for day in days]
+
+    def test_daily_and_weekly_windows(self):
+        every_3_days = tmc.Recurrence("daily", 3)
+        self.assertEqual(self.dates(every_3_days, "2025-01-01", "2025-03-01", "2025-03-07"),
+                         ["2025-03-02", "2025-03-05"])
+        weekly = tmc.Recurrence("weekly", count=3)
+        self.assertEqual(self.dates(weekly, "2025-01-01", "2024-12-01", "2025-12-31"),
+                         ["2025-01-01", "2025-01-08", "2025-01-15"])
+        self.assertEqual(self.dates(weekly, "2025-01-01", "2025-01-16", "2025-12-31"), [])
+
+    def test_monthly_clamps_to_month_end(self):
+        monthly = tmc.Recurrence("monthly", until_ord=tmc.date_ordinal("2025-05-31"))
+        self.assertEqual(self.dates(monthly, "2025-01-31", "2025-02-01", "2025-12-31"),
+                         ["2025-02-28", "2025-03-31", "2025-04-30", "2025-05-31"])
+        quarterly = tmc.Recurrence("monthly", 3, count=4)
+        self.assertEqual(self.dates(quarterly, "2024-11-15", "2025-05-01", "2030-01-01"),
+                         ["2025-05-15", "2025-08-15"])
+
+    def test_overrides_are_sparse(self):
+        task = tmc.Task("standup", "2025-06-02", "Not Started", 1, 0, [], tmc.Recurrence("daily"))
+        day = tmc.date_ordinal("2025-06-03")
+        done = task.with_override(day, "Completed", 100)
+        self.assertEqual(done.to_dict()["overrides"], {"2025-06-03": {"status": "Completed", "progress": 100}})
+        self.assertEqual([(o.end_date, o.status) for o in done.occurrences(day - 1, day + 1)],
+                         [("2025-06-02", "Not Started"), ("2025-06-03", "Completed"),
+                          ("2025-06-04", "Not Started")])
+        # Back to the series' values: the override goes away
+        self.assertNotIn("overrides", done.with_override(day, "Not Started", 0).to_dict())
+
+    def test_rule_and_overrides_survive_storage(self):
+        task = tmc.Task("report", "2025-01-31", "In Progress", 2, 10, ["Ann"],
+                        tmc.Recurrence("monthly", count=12))
+        task = task.with_override(tmc.date_ordinal("2025-02-28"), "Completed", 100)
+        for filename in ("data.json", "data.db"):
+            data = self.new_store(self.path(filename))
+            data["users"][0]["tasks"].append(task)
+            tmc.save_data(data, self.path(filename), tmc.put_task_change(0, 0, task))
+            if filename == "data.json":
+                tmc.compact_data(data, self.path(filename))
+            loaded = tmc.load_data(self.path(filename))["users"][0]["tasks"]
+            self.assertEqual(loaded[0], task)
+        # The series started before the window, but its March date is found
+        tasks = tmc.load_data(self.path("data.db"))["users"][0]["tasks"]
+        tasks.append(make_task("plain"))
+        pairs = list(tmc.occurrences_between(tasks.between(*ordinals("2025-03-01", "2025-03-31")),
+                                             *ordinals("2025-03-01", "2025-03-31")))
+        self.assertEqual([(i, o.end_date) for i, o in pairs], [(0, "2025-03-31")])
+
+    def test_date_index_keeps_recurring_tasks_apart(self):
+        tasks = [make_task("plain"), tmc.Task("r", "2024-12-30", "Not Started", 1, 0, [], tmc.Recurrence("weekly"))]
+        index = tmc.DateBucketIndex(tasks)
+        self.assertEqual((index.days, index.recurring), (ordinals("2025-01-01"), {1}))
+        tasks[0] = tmc.Task("now weekly", "2025-01-01", "Not Started", 1, 0, [], tmc.Recurrence("weekly"))
+        index.update(0)
+        self.assertEqual((index.days, index.recurring), ([], {0, 1}))
+
+    def test_import_validates_recurrence(self):
+        line = {"name": "x", "end_date": "2025-01-01", "status": "Not Started", "priority": 1,
+                "progress": 0, "assignees": []}
+        task = tmc.task_from_row(json.dumps(dict(line, recurrence={"freq": "weekly", "interval": 2},
+                                                 overrides={"2025-01-15": {"status": "Completed"}})))
+        self.assertEqual(task.overrides, {tmc.date_ordinal("2025-01-15"): {"status": "Completed"}})
+        for recurrence in ({"freq": "yearly"}, {"freq": "daily", "interval": 0},
+                           {"freq": "daily", "until": "2024-12-31"}):
+            with self.assertRaises(ValueError):
+                tmc.task_from_row(json.dumps(dict(line, recurrence=recurrence)))
+        with self.assertRaises(ValueError):
+            tmc.validate_recurrence("Weekly", "1", "2025-13-01", "")
+        self.assertEqual(tmc.validate_recurrence("Monthly", "", "", "6"), tmc.Recurrence("monthly", 1, None, 6))
+        self.assertIsNone(tmc.validate_recurrence("Never", "", "", ""))
+
+###############################################################################
+# Workload aggregates
+###############################################################################
+class AggregateTests(StorageTestCase):
+    def task(self, end_date, status="Not Started", progress=0, assignees=()):
+        return tmc.Task("t", end_date, status, 1, progress, assignees)
+
+    def assert_matches_recount(self, aggregates):
+        fresh = tmc.TaskAggregates(aggregates.tasks, aggregates.today)
+        for field in ("by_status", "by_assignee", "progress_sum", "open_by_day", "overdue"):
+            self.assertEqual(getattr(aggregates, field), getattr(fresh, field), field)
+
+    def test_edits_apply_deltas(self):
+        tasks = [self.task("2025-06-01", assignees=["Ann"]),
+                 self.task("2025-06-20", "In Progress", 50, ["Ann", "Bob"])]
+        aggregates = tmc.TaskAggregates(tasks, tmc.date_ordinal("2025-06-10"))
+        self.assertEqual((aggregates.overdue, aggregates.average_progress()), (1, 25.0))
+        self.assertEqual(aggregates.by_assignee, {"Ann": 2, "Bob": 1})
+
+        tasks[0] = self.task("2025-06-01", "Completed", 100, ["Cy"])
+        aggregates.update(0)
+        self.assertEqual(aggregates.touched, {"Ann", "Cy"})
+        self.assertEqual(aggregates.by_status, {"Completed": 1, "In Progress": 1})
+        self.assertEqual((aggregates.overdue, aggregates.average_progress()), (0, 75.0))
+        self.assertEqual(aggregates.by_assignee, {"Ann": 1, "Bob": 1, "Cy": 1})
+        tasks.append(self.task("2025-06-09"))
+        aggregates.update(2)
+        self.assertEqual(aggregates.overdue, 1)
+        self.assert_matches_recount(aggregates)
+
+    def test_overdue_rolls_forward_and_back(self):
+        tasks = [self.task("2025-06-10"), self.task("2025-06-12"), self.task("2025-06-12", "Completed")]
+        aggregates = tmc.TaskAggregates(tasks, tmc.date_ordinal("2025-06-10"))
+        self.assertEqual(aggregates.overdue, 0)
+        aggregates.advance(tmc.date_ordinal("2025-06-11"))
+        self.assertEqual(aggregates.overdue, 1)
+        aggregates.advance(tmc.date_ordinal("2025-06-20"))
+        self.assertEqual(aggregates.overdue, 2)
+        self.assert_matches_recount(aggregates)
+        aggregates.advance(tmc.date_ordinal("2025-06-01"))
+        self.assertEqual(aggregates.overdue, 0)
+
+    def test_sqlite_store_is_counted_without_tasks(self):
+        tasks = benchmarks.make_tasks(200, seed=11)
+        tasks.append(tmc.Task("r", "2025-01-06", "Not Started", 1, 0, ["Ann"], tmc.Recurrence("weekly")))
+        filename = self.path("data.db")
+        data = self.new_store(filename)
+        data["users"][0]["tasks"].extend(tasks)
+        tmc.save_data(data, filename)
+        stored = tmc.load_data(filename)["users"][0]["tasks"]
+        today = tmc.date_ordinal("2025-06-10")
+        aggregates = tmc.TaskAggregates(stored, today)
+        self.assertEqual(aggregates.counted, [tmc.TaskAggregates.entry(task) for task in tasks])
+        self.assertFalse(any(isinstance(entry, tmc.Task) for entry in aggregates.counted))
+        stored[3] = self.task("2025-06-01", "In Progress", 30, ["Zed"])
+        aggregates.update(3)
+        self.assertEqual(aggregates.touched, {"Zed"} | set(tasks[3].assignees))
+        self.assert_matches_recount(aggregates)
+        tasks[3] = stored[3]
+        self.assertEqual(aggregates.by_status, tmc.TaskAggregates(tasks, today).by_status)
+
+###############################################################################
+# Saved views
+###############################################################################
+class SavedViewTests(StorageTestCase):
+    VIEWS = [{"name": "urgent", "criteria": {"max_priority": "1"}},
+             {"name": "ann", "criteria": {"assignees": "ann"}},
+             {"name": "done", "criteria": {"status": "Completed"}}]
+
+    def task(self, name, priority=1, status="Not Started", assignees=()):
+        return tmc.Task(name, "2025-01-01", status, priority, 0, assignees)
+
+    def make_cache(self, tasks):
+        sorted_index = tmc.SortedTaskIndex(tasks, ["name"])
+        filter_index = tmc.TaskFilterIndex(tasks)
+        self.selects = []
+
+        def select(task_filter):
+            self.selects.append(task_filter)
+            return [(i, tasks[i]) for i in filter_index.select(task_filter)]
+
+        cache = tmc.SavedViewCache(tasks, select, lambda i, task: sorted_index.key_of(i))
+        cache.set_views(self.VIEWS)
+        return cache, [sorted_index, filter_index, cache]
+
+    def test_views_are_patched_not_rescanned(self):
+        tasks = [self.task("d", 1, assignees=["Ann"]), self.task("b", 2), self.task("a", 1, assignees=["Bo"])]
+        cache, indexes = self.make_cache(tasks)
+        self.assertEqual(cache.rows_of("urgent"), [2, 0])
+        self.assertEqual(cache.rows_of("ann"), [0])
+        done = cache.rows_of("done")
+        self.assertEqual(len(self.selects), 3)
+
+        def save(task_index, task):
+            if task_index == len(tasks):
+                tasks.append(task)
+            else:
+                tasks[task_index] = task
+            for index in indexes:
+                index.update(task_index)
+
+        save(1, self.task("c", 1))
+        save(3, self.task("e", 5, assignees=["Anna"]))
+        save(2, self.task("a", 1, "Completed", ["Bo"]))
+        # Switching views reuses the patched results
+        self.assertEqual(cache.rows_of("urgent"), [2, 1, 0])
+        self.assertEqual(cache.rows_of("ann"), [0, 3])
+        self.assertIs(cache.rows_of("done"), done)
+        self.assertEqual(done, [2])
+        self.assertEqual(len(self.selects), 3)
+
+        # A new sort order keeps the members and only re-sorts
+        indexes[0].set_order(["priority"])
+        cache.order_changed()
+        self.assertEqual(cache.rows_of("ann"), [0, 3])
+        self.assertEqual(len(self.selects), 3)
+
+    def test_sqlite_view_is_resorted_with_one_query(self):
+        filename = self.path("data.db")
+        data = self.new_store(filename)
+        tasks = [self.task("d", 1, assignees=["Ann"]), self.task("b", 2), self.task("a", 1, assignees=["Bo"]),
+                 self.task("c", 1)]
+        data["users"][0]["tasks"].extend(tasks)
+        tmc.save_data(data, filename)
+        stored = tmc.load_data(filename)["users"][0]["tasks"]
+        sort_keys = ["name"]
+        cache = tmc.SavedViewCache(stored, lambda f: stored.query(**f.criteria()),
+                                   lambda i, task: tmc.task_sort_key(task, sort_keys) + (i,))
+        cache.set_views(self.VIEWS)
+        self.assertEqual(cache.rows_of("urgent"), [2, 3, 0])
+        self.assertEqual(stored.pairs({3, 0}), [(0, tasks[0]), (3, tasks[3])])
+        sort_keys[:] = ["assignees", "name"]
+        cache.order_changed()
+        with mock.patch.object(tmc.SqliteTaskList, "__getitem__", side_effect=AssertionError):
+            self.assertEqual(cache.rows_of("urgent"), [3, 0, 2])
+
+    def test_changed_criteria_drop_only_that_view(self):
+        cache, _ = self.make_cache([self.task("a"), self.task("b", 3)])
+        cache.rows_of("urgent")
+        cache.rows_of("ann")
+        cache.set_views([dict(self.VIEWS[0], criteria={"max_priority": "3"}), self.VIEWS[1]])
+        self.assertEqual(set(cache.members), {"ann"})
+        self.assertEqual(cache.rows_of("urgent"), [0, 1])
+
+    def test_views_survive_every_store(self):
+        views = tmc.validate_views(self.VIEWS[:2])
+        for filename in ("data.json", "data.db", "data.d"):
+            path = self.path(filename)
+            data = self.new_store(path, 1)
+            tmc.save_data(data, path, tmc.set_user_views(data["users"], 0, views))
+            loaded = tmc.load_data(path)
+            self.assertEqual(loaded["users"][0]["views"], views, filename)
+            self.assertEqual(task_names(loaded), ["t0"])
+        # The journal record also reaches a snapshot and its lazy index
+        data = tmc.load_data(self.path("data.json"))
+        tmc.compact_data(data, self.path("data.json"))
+        lazy = tmc.load_lazy(self.path("data.json"))
+        self.assertEqual(lazy["users"][0]["views"], views)
+        self.assertFalse(lazy["users"][0].loaded)
+
+    def test_invalid_views_are_rejected(self):
+        for views in ([{"name": "", "criteria": {}}], [{"name": "x", "criteria": {"color": "red"}}],
+                      [{"name": "x", "criteria": {"max_priority": "high"}}],
+                      [{"name": tmc.ALL_TASKS_VIEW, "criteria": {}}], self.VIEWS[:1] * 2, {}):
+            with self.assertRaises(ValueError):
+                tmc.validate_views(views)
+        self.assertEqual(tmc.validate_views([{"name": " x ", "criteria": {"status": "", "max_priority": 2}}]),
+                         [{"name": "x", "criteria": {"max_priority": "2"}}])
+
+###############################################################################
+# Task view windows
+###############################################################################
+class TaskViewWindowTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.filename = self.path("data.json")
+        self.data = self.new_store(self.filename)
+        tasks = self.data["users"][0]["tasks"]
+        tasks.extend([make_task("a", 1), make_task("b", 3), make_task("c", 2)])
+        self.view = headless_task_view(self.data, self.filename)
+        self.addCleanup(self.view.master.persistence.stop)
+
+    def test_filter_window_saves_view_and_clears(self):
+        self.assertTrue(callable(getattr(tmc.FilterWindow, "clear_filter", None)))
+        window = headless_filter_window(self.view, max_priority="2", view_name="urgent")
+        window.save_view()
+        self.assertTrue(window.destroyed)
+        self.assertEqual(self.view.active_view, "urgent")
+        self.assertEqual(self.view.view_var.get(), "urgent")
+        self.assertEqual(list(self.view.task_list.rows), [0, 2])
+        self.assertTrue(self.view.master.persistence.flush())
+        self.assertEqual(tmc.load_data(self.filename)["users"][0]["views"],
+                         [{"name": "urgent", "criteria": {"max_priority": "2"}}])
+
+        window = headless_filter_window(self.view)
+        window.clear_filter()
+        self.assertTrue(window.destroyed)
+        self.assertIsNone(self.view.active_view)
+        self.assertIsNone(self.view.filtered_tasks)
+        self.assertEqual(self.view.view_var.get(), tmc.ALL_TASKS_VIEW)
+        self.assertEqual(list(self.view.task_list.rows), [0, 2, 1])
+
+    def test_invalid_view_name_keeps_window_open(self):
+        window = headless_filter_window(self.view, view_name=" ")
+        with mock.patch.object(tmc.messagebox, "showerror") as showerror:
+            window.save_view()
+        showerror.assert_called_once()
+        self.assertFalse(window.destroyed)
+
+    @unittest.skipUnless(HAVE_DISPLAY, "needs a display")
+    def test_real_filter_window(self):
+        root = tmc.tk.Tk()
+        self.addCleanup(root.destroy)
+        root.withdraw()
+        root.persistence = self.view.master.persistence
+        root.client = None
+        view = tmc.TaskViewFrame(root, self.data, 0)
+        window = tmc.FilterWindow(view)
+        window.entry_priority.insert(0, "2")
+        window.entry_view_name.insert(0, "urgent")
+        window.save_view()
+        self.assertEqual(view.active_view, "urgent")
+        tmc.FilterWindow(view).clear_filter()
+        self.assertIsNone(view.active_view)
+
+###############################################################################
+# Task history
+###############################################################################
+class HistoryTests(StorageTestCase):
+    EMAIL = "me@example.com"
+
+    def edit(self, log, tasks, task_index, action="edit", **fields):
+        """
+        Sets fields on tasks[task_index] (or creates it) the way the task view
+        does, returning the logged entry.
+        """
+        old = tasks[task_index] if task_index < len(tasks) else None
+        new = tmc.apply_fields(old, fields) if old is not None else make_task(fields["name"])
+        entry = tmc.put_history_entry(self.EMAIL, task_index, old, new)
+        if old is None:
+            tasks.append(new)
+        else:
+            tasks[task_index] = new
+        log.record(entry, action)
+        return entry
+
+    def test_diff_holds_only_changed_fields(self):
+        old = make_task("a")
+        new = tmc.apply_fields(old, {"status": "Completed", "progress": 100})
+        self.assertEqual(tmc.task_diff(old, new), ({"status": "Not Started", "progress": 0},
+                                                   {"status": "Completed", "progress": 100}))
+        self.assertIsNone(tmc.put_history_entry(self.EMAIL, 0, old, old))
+        recurring = tmc.Task.from_dict(dict(old.to_dict(), recurrence={"freq": "daily", "interval": 1}))
+        before, after = tmc.task_diff(old, recurring)
+        self.assertEqual(tmc.apply_fields(recurring, before), old)
+        self.assertEqual(tmc.apply_fields(old, after), recurring)
+
+    def test_bounds_evict_oldest(self):
+        log = tmc.OperationLog(self.EMAIL, max_entries=3)
+        tasks = [make_task("a")]
+        entries = [self.edit(log, tasks, 0, priority=p) for p in range(2, 7)]
+        self.assertEqual(list(log.entries), entries[2:])
+        self.assertEqual(list(log.undo_stack), entries[2:])
+        line_size = len(tmc.history_line(entries[-1]))
+        log = tmc.OperationLog(self.EMAIL, entries, max_bytes=2 * line_size)
+        self.assertEqual(len(log.entries), 2)
+        self.assertLessEqual(log.bytes, 2 * line_size)
+
+    def test_undo_redo_follow_deletes(self):
+        log = tmc.OperationLog(self.EMAIL)
+        tasks = [make_task(f"t{i}") for i in range(4)]
+        first = self.edit(log, tasks, 2, status="Completed")
+        self.assertEqual(log.current_index(first), 2)
+        log.record(tmc.delete_history_entry(self.EMAIL, [0], [tasks[0]]))
+        tmc.delete_tasks(tasks, [0])
+        self.assertEqual(log.current_index(first), 1)
+        self.assertIs(log.pop_undo(), first)
+        self.assertIs(log.pop_redo(), first)
+        log.record(tmc.delete_history_entry(self.EMAIL, [1], [tasks[1]]))
+        self.assertIsNone(log.current_index(first))
+        # A new edit clears what could be redone
+        log.pop_undo()
+        self.edit(log, tasks, 0, name="renamed")
+        self.assertIsNone(log.pop_redo())
+
+    def test_redone_creation_takes_its_edits_along(self):
+        log = tmc.OperationLog(self.EMAIL)
+        tasks = [make_task("t0")]
+        create = self.edit(log, tasks, 1, name="new")
+        edit = self.edit(log, tasks, 1, status="Completed")
+        self.assertIs(log.pop_undo(), edit)
+        self.assertIs(log.pop_undo(), create)
+        log.anchor_redo(create, 1)
+        log.record(tmc.delete_history_entry(self.EMAIL, [1], [tasks[1]]), "undo")
+        tmc.delete_tasks(tasks, [1])
+        self.edit(log, tasks, 1, "redo", name="new")
+        log.reanchor(log.pop_redo(), log.undo_stack[-1])
+        self.assertIs(log.pop_redo(), edit)
+        self.assertEqual(log.current_index(edit), 1)
+
+    def test_versions_replay_diffs(self):
+        log = tmc.OperationLog(self.EMAIL)
+        tasks = [make_task("t0")]
+        self.edit(log, tasks, 1, name="new")
+        self.edit(log, tasks, 1, status="In Progress")
+        self.edit(log, tasks, 0, priority=3)
+        self.edit(log, tasks, 1, progress=50)
+        log.record(tmc.delete_history_entry(self.EMAIL, [0], [tasks[0]]))
+        tmc.delete_tasks(tasks, [0])
+        versions = log.versions(0, tasks[0])
+        self.assertEqual([entry["kind"] for entry, _ in versions], ["edit", "edit", "create"])
+        self.assertEqual([(task.status, task.progress) for _, task in versions],
+                         [("In Progress", 50), ("In Progress", 0), ("Not Started", 0)])
+        # Without its creation, the oldest known version comes last
+        log = tmc.OperationLog(self.EMAIL, list(log.entries)[1:])
+        self.assertEqual([entry and entry["kind"] for entry, _ in log.versions(0, tasks[0])],
+                         ["edit", "edit", None])
+
+    def test_worker_appends_history_alongside_journal(self):
+        filename = self.path("data.json")
+        data = self.new_store(filename, 1)
+        worker = tmc.PersistenceWorker(data, filename, debounce=0)
+        log = tmc.OperationLog(self.EMAIL)
+        tasks = data["users"][0]["tasks"]
+        with worker.lock:
+            entry = self.edit(log, tasks, 0, name="edited")
+            worker.submit(tmc.put_task_change(0, 0, tasks[0]), [tmc.history_line(entry)])
+        self.assertTrue(worker.stop())
+        tmc.compact_data(data, filename)
+        self.assertEqual(tmc.read_history(filename + tmc.HISTORY_SUFFIX, self.EMAIL), [entry])
+        self.assertEqual(tmc.read_history(filename + tmc.HISTORY_SUFFIX, "other@example.com"), [])
+        # A torn last line is skipped
+        with open(filename + tmc.HISTORY_SUFFIX, "a", encoding="utf-8") as f:
+            f.write(tmc.history_line(entry)[:20])
+        self.assertEqual(tmc.read_history(filename + tmc.HISTORY_SUFFIX, self.EMAIL), [entry])
+
+    def test_history_file_is_cut_back(self):
+        path = self.path("data.json" + tmc.HISTORY_SUFFIX)
+        line = tmc.history_line(tmc.put_history_entry(self.EMAIL, 0, None, make_task("x" * 1000)))
+        tmc.append_history([line] * (tmc.HISTORY_FILE_MAX_BYTES // len(line) + 1), path)
+        self.assertLessEqual(os.path.getsize(path), tmc.HISTORY_FILE_MAX_BYTES // 2)
+        self.assertTrue(tmc.read_history(path, self.EMAIL))
+
+###############################################################################
+# Dependencies
+###############################################################################
+def dated_task(name, end_date, depends_on=()):
+    return tmc.Task(name, end_date, "Not Started", 1, 0, [], depends_on=depends_on)
+
+class DependencyTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        # a <- b <- d, a <- c <- d, e alone
+        self.tasks = [dated_task("a", "2025-03-10"), dated_task("b", "2025-03-05", [0]),
+                      dated_task("c", "2025-03-20", [0]), dated_task("d", "2025-03-15", [1, 2]),
+                      dated_task("e", "2025-01-01")]
+        self.graph = tmc.DependencyGraph(self.tasks)
+
+    def assert_matches_rebuild(self):
+        rebuilt = tmc.DependencyGraph(self.tasks)
+        for name in ("deps", "finish", "driver", "depth", "conflicts"):
+            self.assertEqual(getattr(self.graph, name), getattr(rebuilt, name), name)
+
+    def test_earliest_finish_and_critical_path(self):
+        graph = self.graph
+        self.assertEqual(graph.earliest_finish(3), tmc.date_ordinal("2025-03-20"))
+        self.assertEqual(graph.critical_path(3), [3, 2, 0])
+        self.assertEqual(graph.conflicts, {1, 3})
+        self.assertEqual(graph.depth[3], 2)
+        self.assertNotIn(4, graph.own)
+
+    def test_update_only_evaluates_downstream(self):
+        self.tasks[1] = dated_task("b", "2025-04-01", [0])
+        self.graph.update(1)
+        self.assertEqual(self.graph.evaluated, 2)
+        self.assertEqual(self.graph.critical_path(3), [3, 1, 0])
+        self.assertEqual(self.graph.touched, {1})
+        self.assert_matches_rebuild()
+        # An edit that doesn't move the earliest finish stops right there
+        self.tasks[0] = dated_task("a", "2025-03-01")
+        self.graph.update(0)
+        self.assertEqual(self.graph.evaluated, 3)
+        self.tasks[4] = dated_task("e", "2025-02-01")
+        self.graph.update(4)
+        self.assertEqual(self.graph.evaluated, 0)
+        self.assert_matches_rebuild()
+
+    def test_relinking_and_new_tasks(self):
+        self.tasks[3] = dated_task("d", "2025-03-15", [4])
+        self.graph.update(3)
+        self.assert_matches_rebuild()
+        self.tasks.append(dated_task("f", "2025-01-01", [3]))
+        self.graph.update(5)
+        self.assertEqual(self.graph.critical_path(5), [5, 3, 4])
+        self.tasks[5] = dated_task("f", "2025-01-01")
+        self.graph.update(5)
+        self.assert_matches_rebuild()
+
+    def test_random_edits_match_rebuild(self):
+        rng = __import__("random").Random(1)
+        for _ in range(200):
+            task_index = rng.randrange(len(self.tasks) + 1)
+            candidates = rng.sample(range(len(self.tasks)), rng.randint(0, 2))
+            if self.graph.cycle(task_index, candidates) is not None:
+                continue
+            day = f"2025-03-{rng.randint(1, 28):02d}"
+            task = dated_task(f"t{task_index}", day, sorted(candidates))
+            if task_index == len(self.tasks):
+                self.tasks.append(task)
+            else:
+                self.tasks[task_index] = task
+            self.graph.update(task_index)
+        self.assert_matches_rebuild()
+
+    def test_cycles_are_found(self):
+        self.assertIn(self.graph.cycle(0, [3]), ([3, 1, 0], [3, 2, 0]))
+        self.assertEqual(self.graph.cycle(0, [0]), [0])
+        self.assertIsNone(self.graph.cycle(4, [3]))
+        with self.assertRaises(ValueError):
+            tmc.check_dependencies(self.tasks, 0, (3,))
+        with self.assertRaises(ValueError):
+            tmc.check_dependencies(self.tasks, 0, (9,))
+        # A cycle in stored data is broken rather than followed forever
+        self.tasks[0] = dated_task("a", "2025-03-10", [3])
+        graph = tmc.DependencyGraph(self.tasks)
+        self.assertIsNone(graph.cycle(4, [3]))
+        self.assertLessEqual(len(graph.critical_path(3)), 3)
+        self.graph.update(0)
+        self.assertEqual(self.graph.deps.get(0, ()), ())
+
+    def test_names_resolve_to_indexes(self):
+        self.assertEqual(tmc.dependency_indexes(self.tasks, "c, a", 3), [0, 2])
+        self.assertEqual(tmc.dependency_indexes(self.tasks, " ", 3), [])
+        self.tasks.append(dated_task("a", "2025-01-01"))
+        for names, task_index in (("zz", 3), ("b", 1), ("a", 3)):
+            with self.assertRaises(ValueError):
+                tmc.dependency_indexes(self.tasks, names, task_index)
+
+    def test_deletes_renumber_dependencies(self):
+        self.assertEqual(tmc.Task.from_dict(self.tasks[3].to_dict()), self.tasks[3])
+        self.assertNotIn("depends_on", self.tasks[0].to_dict())
+        tmc.delete_tasks(self.tasks, [1])
+        self.assertEqual([task.depends_on for task in self.tasks], [(), (0,), (1,), ()])
+        filename = self.path("data.db")
+        data = self.new_store(filename)
+        tasks = data["users"][0]["tasks"]
+        tasks.extend(dated_task(t.name, t.end_date, t.depends_on) for t in self.tasks)
+        tmc.delete_tasks(tasks, [0])
+        self.assertEqual([task.depends_on for task in tasks], [(), (0,), ()])
+        self.assertEqual(tasks.dependencies(), [(1, (0,))])
+
+###############################################################################
+# Sharded store
+###############################################################################
+class ShardMergeTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.root = self.path("data.d")
+        self.new_store(self.root, 3)
+        # Two instances that both loaded t0, t1, t2
+        self.a = tmc.load_data(self.root)
+        self.b = tmc.load_data(self.root)
+        self.a["users"][0]["tasks"]
+        self.b["users"][0]["tasks"]
+
+    def delete(self, data, task_indexes):
+        tasks = data["users"][0]["tasks"]
+        change = tmc.delete_tasks_change(0, task_indexes, len(tasks))
+        tmc.delete_tasks(tasks, task_indexes)
+        tmc.save_changes(data, self.root, [change])
+
+    def edit(self, data, task_index, name):
+        data["users"][0]["tasks"][task_index] = task = make_task(name)
+        tmc.save_data(data, self.root, tmc.put_task_change(0, task_index, task))
+
+    def test_dependencies_follow_merge(self):
+        self.delete(self.b, [0])
+        tasks = self.a["users"][0]["tasks"]
+        tasks[2] = task = tasks[2].with_dependencies([1])
+        tmc.save_data(self.a, self.root, tmc.put_task_change(0, 2, task))
+        self.assertEqual([task.depends_on for task in tasks], [(), (0,)])
+        self.assertEqual([task.depends_on for task in tmc.load_data(self.root)["users"][0]["tasks"]], [(), (0,)])
+
+    def test_edit_survives_concurrent_delete(self):
+        self.delete(self.b, [0])
+        self.edit(self.a, 2, "t2 edited")
+        self.assertEqual(task_names(self.a), ["t1", "t2 edited"])
+        self.assertEqual(task_names(tmc.load_data(self.root)), ["t1", "t2 edited"])
+
+    def test_edit_of_deleted_task_is_rejected(self):
+        self.delete(self.b, [1])
+        with self.assertRaises(tmc.ShardConflictError) as caught:
+            self.edit(self.a, 1, "t1 edited")
+        self.assertIn("t1 edited", str(caught.exception))
+        self.assertEqual(task_names(tmc.load_data(self.root)), ["t0", "t2"])
+
+    def test_delete_merges_with_concurrent_edit_elsewhere(self):
+        self.edit(self.b, 2, "t2 edited")
+        self.delete(self.a, [0])
+        self.assertEqual(task_names(tmc.load_data(self.root)), ["t1", "t2 edited"])
+
+    def test_delete_of_edited_task_is_rejected(self):
+        self.edit(self.b, 0, "t0 edited")
+        with self.assertRaises(tmc.ShardConflictError) as caught:
+            self.delete(self.a, [0])
+        self.assertIn("t0 edited", str(caught.exception))
+        self.assertEqual(task_names(tmc.load_data(self.root)), ["t0 edited", "t1", "t2"])
+
+    def test_concurrent_creates_are_both_kept(self):
+        for data, name in ((self.a, "from a"), (self.b, "from b")):
+            task = make_task(name)
+            data["users"][0]["tasks"].append(task)
+            tmc.save_data(data, self.root, tmc.put_task_change(0, 3, task))
+        self.assertEqual(task_names(tmc.load_data(self.root)), ["t0", "t1", "t2", "from a", "from b"])
+
+###############################################################################
+# Headless batch operations
+###############################################################################
+class HeadlessTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.filename = self.path("data.json")
+        self.new_store(self.filename, 3)
+
+    def run_headless(self, **options):
+        args = argparse.Namespace(data=self.filename, user="me@example.com", import_file=None,
+                                  export_file=None, set=None, delete=False, where=[], all=False,
+                                  batch_size=tmc.IMPORT_BATCH_SIZE)
+        for key, value in options.items():
+            setattr(args, key, value)
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            return tmc.run_headless(args)
+
+    def test_delete_without_where_is_refused(self):
+        self.assertEqual(self.run_headless(delete=True), 2)
+        self.assertEqual(self.run_headless(set=["status=Completed"]), 2)
+        self.assertEqual(task_names(tmc.load_data(self.filename)), ["t0", "t1", "t2"])
+
+    def test_delete_where(self):
+        data = tmc.load_data(self.filename)
+        data["users"][0]["tasks"][1] = task = make_task("t1", priority=5)
+        tmc.save_data(data, self.filename, tmc.put_task_change(0, 1, task))
+        self.assertEqual(self.run_headless(delete=True, where=["max_priority=1"]), 0)
+        self.assertEqual(task_names(tmc.load_data(self.filename)), ["t1"])
+        history = tmc.read_history(self.filename + tmc.HISTORY_SUFFIX, "me@example.com")
+        self.assertEqual([(entry["kind"], entry["task_indexes"]) for entry in history], [("delete", [0, 2])])
+
+    def test_set_logs_history(self):
+        self.assertEqual(self.run_headless(set=["status=Completed"], all=True), 0)
+        history = tmc.read_history(self.filename + tmc.HISTORY_SUFFIX, "me@example.com")
+        self.assertEqual([(entry["task_index"], entry["before"], entry["after"]) for entry in history],
+                         [(i, {"status": "Not Started"}, {"status": "Completed"}) for i in range(3)])
+
+    def import_file(self, name, text):
+        path = self.path(name)
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+        data = tmc.load_data(self.filename)
+        count, errors = tmc.import_tasks(data, self.filename, 0, tmc.read_task_rows(path))
+        return count, [line_number for line_number, _ in errors]
+
+    def test_jsonl_import_reports_bad_lines(self):
+        task = '{"name": "a", "end_date": "2025-02-01", "status": "Not Started", "priority": 1, "progress": 0}'
+        text = "\n".join([task, "{torn", "[1, 2]", "", task.replace('"a"', '"b"'),
+                          '{"name": "c", "end_date": "2025-02-01", "status": "Done"}',
+                          task.replace("}", ', "assignees": 7}')]) + "\n"
+        self.assertEqual(self.import_file("tasks.jsonl", text), (2, [2, 3, 6, 7]))
+        self.assertEqual(task_names(tmc.load_data(self.filename)), ["t0", "t1", "t2", "a", "b"])
+
+    def test_csv_import_reports_bad_rows(self):
+        text = ("name,end_date,status,priority,progress,assignees\n"
+                "a,2025-02-01,Not Started,1,0,\"Ann, Bob\"\n"
+                "b,02/01/2025,Not Started,1,0,\n"
+                "c,2025-02-01,Not Started,high,0,\n"
+                "d,2025-02-01,Completed,2,100,\n")
+        self.assertEqual(self.import_file("tasks.csv", text), (2, [3, 4]))
+        data = tmc.load_data(self.filename)
+        self.assertEqual(task_names(data), ["t0", "t1", "t2", "a", "d"])
+        self.assertEqual(list(data["users"][0]["tasks"][3].assignees), ["Ann", "Bob"])
+
+    def test_import_into_sqlite_in_batches(self):
+        filename = self.path("data.db")
+        self.new_store(filename, 2)
+        rows = [(i, {"name": f"n{i}", "end_date": "2025-02-01", "status": "Not Started",
+                     "priority": "1", "progress": "0"}) for i in range(5)]
+        data = tmc.load_data(filename)
+        self.assertEqual(tmc.import_tasks(data, filename, 0, rows, batch_size=2), (5, []))
+        self.assertEqual(task_names(tmc.load_data(filename)), ["t0", "t1", "n0", "n1", "n2", "n3", "n4"])
+
+    def test_import_checks_dependencies(self):
+        row = lambda name, depends_on: json.dumps({"name": name, "end_date": "2025-02-01", "status": "Not Started",
+                                                    "priority": 1, "progress": 0, "depends_on": depends_on})
+        # Tasks 0-2 exist; the import appends 3, 4 and 5
+        text = "\n".join([row("a", [0]), "{torn", row("b", [3, 1]), row("c", [4])]) + "\n"
+        self.assertEqual(self.import_file("good.jsonl", text), (3, [2]))
+        tasks = tmc.load_data(self.filename)["users"][0]["tasks"]
+        self.assertEqual([(task.name, task.depends_on) for task in tasks[3:]], [("a", (0,)), ("b", (1, 3)), ("c", (4,))])
+        for depends_on in ([7], [9], [3, 99]):
+            text = "\n".join([row("x", [0]), row("y", depends_on)]) + "\n"
+            with self.assertRaisesRegex(ValueError, "^Line 2: .*Nothing was imported"):
+                self.import_file("bad.jsonl", text)
+        self.assertEqual(self.run_headless(import_file=self.path("bad.jsonl")), 2)
+        self.assertEqual(len(tmc.load_data(self.filename)["users"][0]["tasks"]), 6)
+
+    def test_import_dependency_cycle_is_rejected(self):
+        accepted = tmc.PendingTasks([make_task("t0"), make_task("t1")], [])
+        accepted.pending.append(tmc.Task("t2", "2025-01-01", "Not Started", 1, 0, [], depends_on=(3,)))
+        accepted.pending.append(tmc.Task("t3", "2025-01-01", "Not Started", 1, 0, [], depends_on=(0,)))
+        self.assertEqual((len(accepted), accepted[1].name, accepted[3].name), (4, "t1", "t3"))
+        with self.assertRaisesRegex(ValueError, "cycle"):
+            tmc.check_dependencies(accepted, 3, (2,))
+
+    def test_delete_all(self):
+        self.assertEqual(self.run_headless(delete=True, all=True), 0)
+        self.assertEqual(task_names(tmc.load_data(self.filename)), [])
+
+if __name__ == "__main__":
+    unittest.main()